@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ContextTrackerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "context_tracker"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import install_query_recorder
+        from .signals import connect_signals
+        connect_signals()
+        # The recorder only does work inside requests instrumented by RequestMetricsMiddleware
+        connection_created.connect(install_query_recorder, dispatch_uid='request_metrics_queries')
@@ -0,0 +1,60 @@
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .services.auth_service import AuthService
+from .services.caches import token_cache
+
+class MiddlewareAuthentication(BaseAuthentication):
+    """
+    Reuses the user authenticated by context_tracker.middleware.AuthenticationMiddleware
+    so DRF does not verify the same credentials a second time.
+    """
+    def authenticate(self, request):
+        user = getattr(request._request, 'authenticated_user', None)
+        if user is None:
+            return None
+        return user, getattr(request._request, 'authenticated_token', None)
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reuses the verified token and user from the
+    per-process token cache, so repeat requests skip the signature check
+    and the user lookup.
+    """
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        if isinstance(raw_token, bytes):
+            raw_token = raw_token.decode()
+
+        cached = token_cache.get_token(raw_token)
+        if cached is not None and cached['user'] is not None:
+            return cached['user'], cached['validated_token']
+
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user(validated_token)
+        token_cache.set_token(raw_token, dict(validated_token.payload), user=user, validated_token=validated_token)
+        return user, validated_token
+
+class APIKeyAuthentication(BaseAuthentication):
+    """
+    Authenticates integration clients by their X-API-KEY header. Owners are
+    resolved through the in-process API-key cache, so repeat calls cost no query.
+    """
+    auth_service = AuthService()
+
+    def authenticate(self, request):
+        api_key = request.headers.get('X-API-KEY')
+        if not api_key:
+            return None
+        owner = self.auth_service.resolve_api_key(api_key)
+        if owner['user'] is None:
+            raise AuthenticationFailed('Invalid API key')
+        return owner['user'], None
+
+    def authenticate_header(self, request):
+        return 'X-API-KEY'
@@ -0,0 +1,190 @@
+"""
+In-process HTTP drivers and statistics shared by the benchmark management commands.
+
+Requests go through the project's real WSGI and ASGI applications (middleware,
+URL routing, DRF) without a network hop, so results reflect application cost.
+"""
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+BENCHMARK_HOST = 'benchmark.local'
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def summarize(latencies, elapsed, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+    }
+
+class BenchmarkRequest:
+    def __init__(self, method, path, query=None, body=None, token=None, content_type='application/json'):
+        self.method = method
+        self.path = path
+        self.query_string = urlencode(query or {})
+        self.body = json.dumps(body).encode() if body is not None and not isinstance(body, bytes) else (body or b'')
+        self.token = token
+        self.content_type = content_type
+
+class Driver:
+    """
+    Drives a fresh handler for one interface. Create and run drivers inside
+    configured() so middleware and routing see the driver's URLconf.
+    """
+    name = None
+    urlconf = 'focusflow_api.urls'
+
+    @classmethod
+    def configured(cls):
+        return override_settings(ROOT_URLCONF=cls.urlconf)
+
+class WSGIDriver(Driver):
+    name = 'wsgi'
+
+    def __init__(self, application=None):
+        self.application = application or get_wsgi_application()
+
+    def send(self, request):
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'PATH_INFO': request.path,
+            'QUERY_STRING': request.query_string,
+            'SERVER_NAME': BENCHMARK_HOST,
+            'SERVER_PORT': '80',
+            'HTTP_HOST': BENCHMARK_HOST,
+            'CONTENT_TYPE': request.content_type,
+            'CONTENT_LENGTH': str(len(request.body)),
+            'wsgi.input': io.BytesIO(request.body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if request.token:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {request.token}'
+        status_holder = []
+
+        def start_response(status, headers, exc_info=None):
+            status_holder.append(int(status.split(' ', 1)[0]))
+
+        result = self.application(environ, start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status_holder[0], body
+
+    def run(self, requests, concurrency):
+        # Returns (latencies in ms, elapsed seconds, error count)
+        def timed(request):
+            started = time.perf_counter()
+            status, _ = self.send(request)
+            return (time.perf_counter() - started) * 1000, status
+
+        started = time.perf_counter()
+        if concurrency <= 1:
+            results = [timed(request) for request in requests]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(timed, requests))
+        elapsed = time.perf_counter() - started
+        return [latency for latency, _ in results], elapsed, sum(1 for _, status in results if status >= 400)
+
+class ASGIDriver(Driver):
+    name = 'asgi'
+    urlconf = 'focusflow_api.asgi_urls'
+
+    def __init__(self, application=None):
+        self.application = application or get_asgi_application()
+
+    async def send(self, request):
+        headers = [
+            (b'host', BENCHMARK_HOST.encode()),
+            (b'content-type', request.content_type.encode()),
+            (b'content-length', str(len(request.body)).encode()),
+        ]
+        if request.token:
+            headers.append((b'authorization', f'Bearer {request.token}'.encode()))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': request.method,
+            'scheme': 'http',
+            'path': request.path,
+            'raw_path': request.path.encode(),
+            'query_string': request.query_string.encode(),
+            'root_path': '',
+            'headers': headers,
+            'client': ('127.0.0.1', 0),
+            'server': (BENCHMARK_HOST, 80),
+        }
+        finished = asyncio.Event()
+        body_sent = False
+        status_holder = []
+        chunks = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': request.body, 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status_holder.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    finished.set()
+
+        await self.application(scope, receive, send)
+        finished.set()
+        return status_holder[0], b''.join(chunks)
+
+    def run(self, requests, concurrency):
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(request):
+                async with semaphore:
+                    started = time.perf_counter()
+                    status, _ = await self.send(request)
+                    return (time.perf_counter() - started) * 1000, status
+
+            return await asyncio.gather(*(timed(request) for request in requests))
+
+        started = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - started
+        return [latency for latency, _ in results], elapsed, sum(1 for _, status in results if status >= 400)
+
+class SyncViewASGIDriver(ASGIDriver):
+    # The WSGI URLconf's DRF views served over ASGI, each request on the sync thread pool
+    name = 'asgi-sync'
+    urlconf = 'focusflow_api.urls'
+
+DRIVERS = {driver.name: driver for driver in (WSGIDriver, ASGIDriver, SyncViewASGIDriver)}
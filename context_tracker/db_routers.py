@@ -0,0 +1,35 @@
+import random
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_HINTS = {'replica_ok': True}
+
+def replica_manager(model):
+    # Manager whose querysets may be served by a read replica (see ReadReplicaRouter)
+    return model._default_manager.db_manager(hints=REPLICA_HINTS)
+
+class ReadReplicaRouter:
+    """
+    Sends reads that opt in through REPLICA_HINTS to a random alias in
+    DATABASE_REPLICAS; everything else, and any read made while `default` is
+    inside a transaction, stays on `default`. Replicas may lag, so only reads
+    that tolerate slightly stale rows opt in.
+    """
+    def __init__(self, replicas=None):
+        self.replicas = list(replicas if replicas is not None else getattr(settings, 'DATABASE_REPLICAS', []))
+
+    def db_for_read(self, model, **hints):
+        if not hints.get('replica_ok') or not self.replicas:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in self.replicas
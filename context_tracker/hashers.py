@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from
+    PASSWORD_HASHING['PBKDF2_ITERATIONS'] (Django's default when unset). It
+    keeps the `pbkdf2_sha256` algorithm name, so existing hashes verify and
+    are re-hashed at the configured cost on the next successful login.
+    """
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASHING', {}).get('PBKDF2_ITERATIONS') or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,71 @@
+import io
+import pstats
+from collections import Counter
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...profiling import profiling_settings, read_collapsed, route_slug
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the profiles written by RequestProfilingMiddleware. By default the "
+        "sampled .collapsed stacks of every route are summed into one flamegraph-"
+        "ready file (each stack rooted at its route); --pstats instead merges the "
+        "cProfile dumps and prints the most expensive functions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', help="Profile directory (default: REQUEST_PROFILING['DIRECTORY']).")
+        parser.add_argument('--route', action='append', default=[],
+                            help='Only include this route, e.g. "log/" (repeatable).')
+        parser.add_argument('--output', help='Write the merged profile here instead of stdout.')
+        parser.add_argument('--pstats', action='store_true', help='Merge .pstats files instead of .collapsed stacks.')
+        parser.add_argument('--sort', default='cumulative', help='pstats sort key (with --pstats).')
+        parser.add_argument('--limit', type=int, default=40, help='Functions to print (with --pstats).')
+
+    def handle(self, *args, **options):
+        directory = Path(options['directory'] or profiling_settings().get('DIRECTORY', 'profiles'))
+        if not directory.is_dir():
+            raise CommandError(f'No profile directory at {directory}')
+        slugs = {route_slug(route) for route in options['route']}
+        route_directories = sorted(
+            path for path in directory.iterdir() if path.is_dir() and (not slugs or path.name in slugs)
+        )
+        if options['pstats']:
+            self.merge_pstats(route_directories, options)
+        else:
+            self.merge_collapsed(route_directories, options)
+
+    def merge_collapsed(self, route_directories, options):
+        merged = Counter()
+        files = 0
+        for route_directory in route_directories:
+            for path in sorted(route_directory.glob('*.collapsed')):
+                files += 1
+                for stack, count in read_collapsed(path).items():
+                    merged[f'{route_directory.name};{stack}'] += count
+        if not merged:
+            raise CommandError('No .collapsed profiles found')
+        text = ''.join(f'{stack} {count}\n' for stack, count in merged.most_common())
+        self.emit(text, options['output'])
+        self.stderr.write(f'Merged {sum(merged.values())} samples from {files} profiles')
+
+    def merge_pstats(self, route_directories, options):
+        paths = [str(path) for route_directory in route_directories for path in sorted(route_directory.glob('*.pstats'))]
+        if not paths:
+            raise CommandError('No .pstats profiles found')
+        report = io.StringIO()
+        stats = pstats.Stats(*paths, stream=report)
+        if options['output']:
+            stats.dump_stats(options['output'])
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(report.getvalue())
+        self.stderr.write(f'Merged {len(paths)} profiles')
+
+    def emit(self, text, output):
+        if output:
+            Path(output).write_text(text)
+        else:
+            self.stdout.write(text, ending='')
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from ...models import ContextEntry
+from ...repositories.context_entry_repository import ContextEntryRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Move context entries that ended more than the retention horizon ago "
+        "(CONTEXT_ARCHIVE['HORIZON_DAYS']) into the archive table, in batches. "
+        "History, range and export reads still return them."
+    )
+
+    def add_arguments(self, parser):
+        archive_settings = getattr(settings, 'CONTEXT_ARCHIVE', {})
+        parser.add_argument('--older-than-days', type=int, default=archive_settings.get('HORIZON_DAYS', 365))
+        parser.add_argument('--user', type=int, help='Only archive this user id.')
+        parser.add_argument('--batch-size', type=int, default=archive_settings.get('BATCH_SIZE', 1000))
+        parser.add_argument('--dry-run', action='store_true', help='Only count the entries that would move.')
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--older-than-days and --batch-size must be positive')
+        cutoff = now() - timedelta(days=options['older_than_days'])
+        if options['dry_run']:
+            queryset = ContextEntry.objects.filter(end_time__lt=cutoff)
+            if options['user'] is not None:
+                queryset = queryset.filter(user_id=options['user'])
+            self.stdout.write(f'{queryset.count()} entries ended before {cutoff.isoformat()}')
+            return
+        moved = ContextEntryRepository().archive_closed_before(cutoff, options['user'], options['batch_size'])
+        self.stdout.write(f'Archived {moved} entries that ended before {cutoff.isoformat()}')
@@ -0,0 +1,162 @@
+import itertools
+import json
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.timezone import now
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ...benchmarks import BENCHMARK_HOST, DRIVERS, BenchmarkRequest, WSGIDriver, summarize
+from ...models import ContextEntry
+from ...models.factories.context_entry_factory import ContextEntryFactory
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+def login_request(session, index):
+    return BenchmarkRequest('POST', '/login/', body={'username': session['username'], 'password': BENCHMARK_PASSWORD})
+
+def log_post_request(session, index):
+    return BenchmarkRequest('POST', '/log/', body={'activity': f'Benchmark {index % 20}', 'note': ''}, token=session['token'])
+
+def log_page_request(session, index):
+    return BenchmarkRequest('GET', '/log/', query={'limit': 100}, token=session['token'])
+
+def log_stream_request(session, index):
+    return BenchmarkRequest('GET', '/log/', token=session['token'])
+
+def log_put_request(session, index):
+    entry_id = next(session['entry_ids'])
+    return BenchmarkRequest('PUT', f'/log/{entry_id}/', body={'note': f'edit {index}'}, token=session['token'])
+
+def log_delete_request(session, index):
+    entry_id = next(session['deletable_ids'])
+    return BenchmarkRequest('DELETE', f'/log/{entry_id}/', token=session['token'])
+
+SCENARIOS = {
+    'login': login_request,
+    'log_post': log_post_request,
+    'log_page': log_page_request,
+    'log_stream': log_stream_request,
+    'log_put': log_put_request,
+    'log_delete': log_delete_request,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users and context entries, then drive the API in-process through the WSGI "
+        "and ASGI applications and report latency percentiles and throughput per endpoint, "
+        "interface and concurrency level, plus query counts, as JSON. 'asgi' serves the "
+        "async views, 'asgi-sync' the DRF views over ASGI. Writes to the configured "
+        "database; use a scratch one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--entries', type=int, default=1000, help='Entries seeded per user.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and interface.')
+        parser.add_argument('--concurrency', default='8', help='Comma-separated concurrency levels to sweep.')
+        parser.add_argument('--interfaces', default='wsgi,asgi')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+        parser.add_argument('--query-samples', type=int, default=3)
+        parser.add_argument('--output', help='Write the JSON report to this file as well.')
+
+    def handle(self, *args, **options):
+        interfaces = [name.strip() for name in options['interfaces'].split(',') if name.strip()]
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = [name for name in interfaces if name not in DRIVERS] + [name for name in scenarios if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown interface or scenario: {', '.join(unknown)}")
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--concurrency takes comma-separated integers')
+
+        # Every delete needs its own entry, across all interfaces and levels
+        deletes = options['requests'] * len(levels) * len(interfaces) + options['query_samples'] if 'log_delete' in scenarios else 0
+        sessions = self.seed(options['users'], options['entries'], -(-deletes // max(options['users'], 1)))
+        report = {
+            'users': options['users'],
+            'entries_per_user': options['entries'],
+            'concurrency': levels,
+            'database': connection.vendor,
+            'scenarios': {},
+        }
+
+        with override_settings(ALLOWED_HOSTS=[BENCHMARK_HOST]):
+            for scenario in scenarios:
+                build = SCENARIOS[scenario]
+                counter = itertools.count()
+                results = {}
+                for interface in interfaces:
+                    driver_class = DRIVERS[interface]
+                    results[interface] = {}
+                    with driver_class.configured():
+                        driver = driver_class()
+                        for level in levels:
+                            requests = [
+                                build(sessions[i % len(sessions)], next(counter)) for i in range(options['requests'])
+                            ]
+                            latencies, elapsed, errors = driver.run(requests, level)
+                            results[interface][str(level)] = summarize(latencies, elapsed, errors)
+                results['queries_per_request'] = self.count_queries(
+                    [build(sessions[0], next(counter)) for _ in range(options['query_samples'])]
+                )
+                report['scenarios'][scenario] = results
+                self.stderr.write(f'{scenario}: done')
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output)
+        self.stdout.write(output)
+
+    def seed(self, users, entries, deletable=0):
+        prefix = f'bench-api-{int(time.time() * 1000)}'
+        password = make_password(BENCHMARK_PASSWORD)
+        User.objects.bulk_create([User(username=f'{prefix}-{i}', password=password) for i in range(users)])
+        seeded = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+
+        # Closed entries reserved for deletion come first, then the history itself
+        total = deletable + entries
+        start = now() - timedelta(minutes=total)
+        batch = []
+        for user in seeded:
+            for i in range(total):
+                started = start + timedelta(minutes=i)
+                ended = started + timedelta(minutes=1) if i < total - 1 else None
+                batch.append(ContextEntryFactory.build(user.id, f'Activity {i % 20}', '', started, ended))
+                if len(batch) >= 5000:
+                    ContextEntry.objects.bulk_create(batch)
+                    batch = []
+        if batch:
+            ContextEntry.objects.bulk_create(batch)
+
+        sessions = []
+        for user in seeded:
+            closed_ids = list(
+                ContextEntry.objects.filter(user=user, end_time__isnull=False).order_by('id').values_list('id', flat=True)
+            )
+            sessions.append({
+                'username': user.username,
+                'token': str(RefreshToken.for_user(user).access_token),
+                'entry_ids': itertools.cycle(closed_ids[deletable:] or [0]),
+                'deletable_ids': itertools.cycle(closed_ids[:deletable] or [0]),
+            })
+        self.stderr.write(f'Seeded {len(seeded)} users with {entries} entries each')
+        return sessions
+
+    def count_queries(self, requests):
+        counts = []
+        with WSGIDriver.configured():
+            driver = WSGIDriver()
+            for request in requests:
+                with CaptureQueriesContext(connection) as queries:
+                    driver.send(request)
+                counts.append(len(queries.captured_queries))
+        return round(sum(counts) / len(counts), 2) if counts else None
@@ -0,0 +1,127 @@
+import json
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.utils.timezone import now
+
+from ...models import ContextEntry, Workspace
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed ContextEntry rows and compare query plans and timings of the hot "
+        "repository queries with and without the ContextEntry indexes. "
+        "Writes to the configured database; point DB_NAME at a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Entries to seed (e.g. 10000000).')
+        parser.add_argument('--users', type=int, default=1000, help='Users to spread the entries over.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query.')
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse previously seeded rows.')
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            if ContextEntry.objects.exists():
+                raise CommandError('ContextEntry table is not empty; use --skip-seed or a scratch database.')
+            self.seed(options['rows'], options['users'], options['batch_size'])
+
+        sample = ContextEntry.objects.order_by('id').values('user_id', 'workspace_id').first()
+        if sample is None:
+            raise CommandError('No ContextEntry rows to benchmark.')
+
+        queries = {
+            'get_active_context': lambda: ContextEntry.objects.filter(
+                user_id=sample['user_id'], end_time__isnull=True
+            )[:1],
+            'get_all_contexts (first page)': lambda: ContextEntry.objects.filter(
+                user_id=sample['user_id']
+            ).order_by('-start_time', '-id')[:100],
+            'workspace history (first page)': lambda: ContextEntry.objects.filter(
+                workspace_id=sample['workspace_id']
+            ).order_by('-start_time')[:100],
+        }
+
+        report = {'rows': ContextEntry.objects.count(), 'with_indexes': self.measure(queries, options['repeat'])}
+        self.drop_indexes()
+        try:
+            report['without_indexes'] = self.measure(queries, options['repeat'])
+        finally:
+            self.restore_indexes()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def seed(self, rows, users, batch_size):
+        prefix = f'bench-{int(time.time())}'
+        User.objects.bulk_create(
+            [User(username=f'{prefix}-{i}') for i in range(users)], batch_size=batch_size
+        )
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+        workspace = Workspace.objects.create(name=prefix, owner_id=user_ids[0])
+
+        per_user = max(rows // len(user_ids), 1)
+        start = now() - timedelta(minutes=per_user)
+        batch = []
+        created = 0
+        for user_id in user_ids:
+            for i in range(per_user):
+                started = start + timedelta(minutes=i)
+                # The newest entry of each user stays open
+                ended = started + timedelta(minutes=1) if i < per_user - 1 else None
+                batch.append(ContextEntry(
+                    user_id=user_id, workspace_id=workspace.id, activity=f'Activity {i % 50}',
+                    start_time=started, end_time=ended,
+                ))
+                if len(batch) >= batch_size:
+                    ContextEntry.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+                    self.stdout.write(f'Seeded {created} entries', ending='\r')
+        if batch:
+            ContextEntry.objects.bulk_create(batch)
+            created += len(batch)
+        self.stdout.write(f'Seeded {created} entries')
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, build in queries.items():
+            plan = build().explain()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = {
+                'plan': plan,
+                'median_ms': round(timings[len(timings) // 2], 3),
+                'max_ms': round(timings[-1], 3),
+            }
+        return results
+
+    def measured_indexes(self):
+        # The partial open-entry constraint is a plain index too. Non-partial
+        # unique constraints stay: dropping one makes SQLite remake the table,
+        # which takes the indexes with it.
+        return list(ContextEntry._meta.indexes) + [
+            constraint for constraint in ContextEntry._meta.constraints if constraint.condition is not None
+        ]
+
+    def drop_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for index in self.measured_indexes():
+                if isinstance(index, models.Index):
+                    schema_editor.remove_index(ContextEntry, index)
+                else:
+                    schema_editor.remove_constraint(ContextEntry, index)
+
+    def restore_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for index in self.measured_indexes():
+                if isinstance(index, models.Index):
+                    schema_editor.add_index(ContextEntry, index)
+                else:
+                    schema_editor.add_constraint(ContextEntry, index)
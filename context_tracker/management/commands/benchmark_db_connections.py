@@ -0,0 +1,81 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ...benchmarks import BENCHMARK_HOST, BenchmarkRequest, WSGIDriver, summarize
+from ...models import ContextEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request database connections (CONN_MAX_AGE=0) with persistent "
+        "ones, with and without health checks, on short requests (status polls and a "
+        "history page) through the WSGI application. Runs against the configured "
+        "database; point DB_ENGINE/DB_HOST at a local PostgreSQL, or use "
+        "--connect-delay-ms to stand in for its connection setup cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path and mode.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--max-age', type=int, default=600, help='CONN_MAX_AGE of the persistent modes.')
+        parser.add_argument('--connect-delay-ms', type=float, default=0.0,
+                            help='Sleep this long whenever a connection is opened, to emulate a remote server.')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'bench-conn-{int(time.time() * 1000)}')
+        ContextEntry.objects.create(user=user, activity='Benchmark')
+        token = str(RefreshToken.for_user(user).access_token)
+        paths = {
+            'status': BenchmarkRequest('GET', '/status/', token=token),
+            'log_page': BenchmarkRequest('GET', '/log/', query={'limit': 20}, token=token),
+        }
+        modes = {
+            'per_request': (0, False),
+            'persistent': (options['max_age'], False),
+            'persistent_health_checks': (options['max_age'], True),
+        }
+        opened = []
+
+        def on_connect(sender, connection, **kwargs):
+            opened.append(connection.alias)
+            if options['connect_delay_ms']:
+                time.sleep(options['connect_delay_ms'] / 1000)
+
+        report = {
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'connect_delay_ms': options['connect_delay_ms'],
+            'modes': {},
+        }
+        originals = {alias: dict(connections.settings[alias]) for alias in connections}
+        connection_created.connect(on_connect, dispatch_uid='benchmark_db_connections')
+        try:
+            with override_settings(ALLOWED_HOSTS=[BENCHMARK_HOST]), WSGIDriver.configured():
+                driver = WSGIDriver()
+                for mode, (max_age, health_checks) in modes.items():
+                    for alias in connections:
+                        # Connection wrappers share these dicts, so every thread sees the change
+                        connections.settings[alias].update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+                        connections[alias].close()
+                    report['modes'][mode] = {}
+                    for name, request in paths.items():
+                        del opened[:]
+                        latencies, elapsed, errors = driver.run([request] * options['requests'], options['concurrency'])
+                        result = summarize(latencies, elapsed, errors)
+                        result['connections_opened'] = len(opened)
+                        report['modes'][mode][name] = result
+                    self.stderr.write(f'{mode}: done')
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark_db_connections')
+            for alias, settings_dict in originals.items():
+                connections.settings[alias].update(settings_dict)
+            user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,91 @@
+import json
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from ...services.context_service import context_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Time POST /log/batch/ ingestion of one offline batch (10k entries by default) "
+        "through ContextService, with the time spent in each write step. With "
+        "--budget, fail when the best run is slower. Writes to the configured "
+        "database; use a scratch one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs, each for a fresh user.')
+        parser.add_argument('--budget', type=float, help='Seconds the best run may take.')
+
+    def handle(self, *args, **options):
+        steps = {
+            'entries': (context_service.context_entry_repo, 'bulk_create_contexts'),
+            'activities': (context_service.activities, 'record'),
+            'rollups': (context_service.rollup_service, 'record_closed'),
+            'journal': (context_service.journal, 'record'),
+            'search_index': (context_service.search_index, 'record'),
+        }
+        runs = []
+        for run in range(options['repeat']):
+            user = User.objects.create_user(username=f'bench-ingest-{int(time.time() * 1000)}-{run}')
+            items = self.batch(options['entries'])
+            timings = defaultdict(float)
+            for name, (collaborator, method) in steps.items():
+                setattr(collaborator, method, self.timed(getattr(collaborator, method), timings, name))
+            try:
+                started = time.perf_counter()
+                result = context_service.ingest_contexts(user.id, items)
+                elapsed = time.perf_counter() - started
+            finally:
+                for collaborator, method in steps.values():
+                    delattr(collaborator, method)
+                self.cleanup(user)
+            if 'error' in result:
+                raise CommandError(result['error'])
+            runs.append({
+                'seconds': round(elapsed, 3),
+                'created': result['created'],
+                'steps': {name: round(seconds, 3) for name, seconds in timings.items()},
+            })
+            self.stderr.write(f'run {run + 1}: {elapsed:.3f}s')
+
+        best = min(run['seconds'] for run in runs)
+        report = {'database': connection.vendor, 'entries': options['entries'], 'best_seconds': best, 'runs': runs}
+        self.stdout.write(json.dumps(report, indent=2))
+        if options['budget'] is not None and best > options['budget']:
+            raise CommandError(f'Best run took {best:.3f}s, over the {options["budget"]}s budget')
+
+    def batch(self, count):
+        # Back-to-back entries ending now, crossing midnights like a long offline stretch
+        start = now().replace(microsecond=0) - timedelta(minutes=7 * count)
+        return [
+            {
+                'idempotency_key': f'bench-{index}',
+                'activity': f'Activity {index % 40}',
+                'note': 'Offline' if index % 3 else None,
+                'start_time': (start + timedelta(minutes=7 * index)).isoformat(),
+                'end_time': (start + timedelta(minutes=7 * index + 5)).isoformat(),
+            }
+            for index in range(count)
+        ]
+
+    def timed(self, method, timings, name):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings[name] += time.perf_counter() - started
+        return wrapper
+
+    def cleanup(self, user):
+        entry_ids = list(user.context_entries.values_list('id', flat=True))
+        context_service.search_index.record(deleted=entry_ids)
+        user.delete()
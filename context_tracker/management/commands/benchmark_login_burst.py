@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils.timezone import now
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ...benchmarks import BENCHMARK_HOST, BenchmarkRequest, WSGIDriver, summarize
+from ...models import ContextEntry
+from ...services.account_service import account_service
+from ...services.password_hashing import PasswordHashingPool
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure GET /log/ latency while a burst of logins (default 500/s) hits the same "
+        "process, with the configured bounded hashing pool and with an effectively "
+        "unbounded one, next to an idle baseline. Writes to the configured database; "
+        "use a scratch one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=500, help='Logins per second during the burst.')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per mode.')
+        parser.add_argument('--login-threads', type=int, default=64, help='Threads sending login requests.')
+        parser.add_argument('--probe-interval', type=float, default=0.01, help='Seconds between /log/ probes.')
+        parser.add_argument('--modes', default='idle,bounded,unbounded')
+
+    def handle(self, *args, **options):
+        prefix = f'bench-login-{int(time.time() * 1000)}'
+        user = User.objects.create_user(username=prefix, password=BENCHMARK_PASSWORD)
+        start = now() - timedelta(hours=1)
+        ContextEntry.objects.bulk_create([
+            ContextEntry(user=user, activity=f'Activity {i % 20}',
+                         start_time=start + timedelta(minutes=i), end_time=start + timedelta(minutes=i + 1))
+            for i in range(50)
+        ])
+        token = str(RefreshToken.for_user(user).access_token)
+        probe = BenchmarkRequest('GET', '/log/', query={'limit': 20}, token=token)
+        login = BenchmarkRequest('POST', '/login/', body={'username': prefix, 'password': BENCHMARK_PASSWORD})
+
+        configured_pool = account_service.hashing_pool
+        pools = {
+            'idle': None,
+            'bounded': configured_pool,
+            'unbounded': PasswordHashingPool(workers=options['login_threads'], max_pending=10 ** 6, timeout=60),
+        }
+        report = {
+            'rate': options['rate'],
+            'duration_s': options['duration'],
+            'pool': {'workers': configured_pool.workers, 'max_pending': configured_pool.max_pending},
+            'modes': {},
+        }
+        try:
+            with override_settings(ALLOWED_HOSTS=[BENCHMARK_HOST]), WSGIDriver.configured():
+                driver = WSGIDriver()
+                for mode in options['modes'].split(','):
+                    pool = pools[mode.strip()]
+                    if pool is not None:
+                        account_service.hashing_pool = pool
+                    report['modes'][mode] = self.run_mode(driver, probe, login, pool is not None, options)
+                    self.stderr.write(f'{mode}: done')
+        finally:
+            account_service.hashing_pool = configured_pool
+            user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_mode(self, driver, probe, login, burst, options):
+        statuses = Counter()
+        lock = threading.Lock()
+        finished = threading.Event()
+
+        def send_login():
+            status, _ = driver.send(login)
+            with lock:
+                statuses[status] += 1
+
+        def fire_burst():
+            total = int(options['rate'] * options['duration'])
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['login_threads']) as executor:
+                for index in range(total):
+                    delay = started + index / options['rate'] - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    executor.submit(send_login)
+            finished.set()
+
+        if burst:
+            # Probe until every login of the burst has been answered
+            threading.Thread(target=fire_burst, daemon=True).start()
+            running = lambda: not finished.is_set()
+        else:
+            deadline = time.perf_counter() + options['duration']
+            running = lambda: time.perf_counter() < deadline
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        while running():
+            request_started = time.perf_counter()
+            status, _ = driver.send(probe)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            errors += status >= 400
+            time.sleep(options['probe_interval'])
+        result = {'log': summarize(latencies, time.perf_counter() - started, errors)}
+        if burst:
+            result['logins'] = {str(status): count for status, count in sorted(statuses.items())}
+        return result
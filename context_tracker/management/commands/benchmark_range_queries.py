@@ -0,0 +1,88 @@
+import json
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils.timezone import now
+
+from ...benchmarks import summarize
+from ...models import ContextEntry
+from ...repositories.context_entry_repository import ContextEntryRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed one user with a long history (default 1M back-to-back entries) and "
+        "compare the single OR overlap query with the UNION of index ranges used by "
+        "GET /log/?from=&to=, for windows of different ages, with query plans. "
+        "Writes to the configured database; use a scratch one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1_000_000)
+        parser.add_argument('--entry-minutes', type=int, default=5, help='Length of each seeded entry.')
+        parser.add_argument('--window-hours', type=float, default=8)
+        parser.add_argument('--ages', default='0,30,365', help='Window start, in days before the newest entry.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'bench-range-{int(time.time() * 1000)}')
+        step = timedelta(minutes=options['entry_minutes'])
+        newest = now().replace(microsecond=0)
+        oldest = newest - step * options['entries']
+        try:
+            self.seed(user, oldest, step, options)
+            repository = ContextEntryRepository()
+            report = {
+                'database': connection.vendor,
+                'entries': options['entries'],
+                'window_hours': options['window_hours'],
+                'windows': {},
+            }
+            for age in options['ages'].split(','):
+                start = newest - timedelta(days=float(age))
+                end = start + timedelta(hours=options['window_hours'])
+                parts = repository.overlapping_querysets(user.id, start, end)
+                queries = {
+                    'or': ContextEntry.objects.filter(user_id=user.id, start_time__lt=end).filter(
+                        Q(end_time__gt=start) | Q(end_time__isnull=True)
+                    ).order_by('start_time', 'id'),
+                    'union': repository.union_in_range(parts),
+                }
+                report['windows'][f'{age}d'] = {
+                    name: self.measure(queryset, options['repeat']) for name, queryset in queries.items()
+                }
+                self.stderr.write(f'{age}d: done')
+        finally:
+            ContextEntry.objects.filter(user=user).delete()
+            user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def seed(self, user, oldest, step, options):
+        batch = []
+        for index in range(options['entries']):
+            start = oldest + step * index
+            # The newest entry stays open, as the current context does
+            end = start + step if index < options['entries'] - 1 else None
+            batch.append(ContextEntry(user=user, activity=f'Activity {index % 40}', start_time=start, end_time=end))
+            if len(batch) == options['batch_size']:
+                ContextEntry.objects.bulk_create(batch)
+                batch = []
+        ContextEntry.objects.bulk_create(batch)
+        self.stderr.write(f'Seeded {options["entries"]} entries')
+
+    def measure(self, queryset, repeat):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            request_started = time.perf_counter()
+            rows = len(sorted(queryset.all(), key=lambda entry: (entry.start_time, entry.id)))
+            latencies.append((time.perf_counter() - request_started) * 1000)
+        result = summarize(latencies, time.perf_counter() - started, 0)
+        result['rows'] = rows
+        result['plan'] = queryset.explain().splitlines()
+        return result
@@ -0,0 +1,65 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+
+from ... import renderers
+from ...models import ContextEntry
+from ...repositories.context_entry_repository import ContextEntryRepository
+from ...services.context_service import serialize_entry_row
+from ...views import stream_json_array
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON renderers and row-building strategies on a context-entry "
+        "list payload (100k rows by default). With --user, also time fetching "
+        "that user's history as model instances versus values_list tuples."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case; the best is reported.')
+        parser.add_argument('--user', type=int, help='Also benchmark the database fetch for this user id.')
+
+    def handle(self, *args, **options):
+        start = now() - timedelta(minutes=options['rows'])
+        tuples = [
+            (i, f'Activity {i % 50}', 'Note' if i % 3 else '', start + timedelta(minutes=i), start + timedelta(minutes=i + 1))
+            for i in range(options['rows'])
+        ]
+        instances = [
+            ContextEntry(id=entry_id, activity=activity, note=note, start_time=started, end_time=ended)
+            for entry_id, activity, note, started, ended in tuples
+        ]
+        rows = [serialize_entry_row(row) for row in tuples]
+
+        cases = {
+            'build: model instances -> dicts': lambda: [
+                {'id': str(entry.id), 'activity': entry.activity, 'note': entry.note,
+                 'start_time': entry.start_time, 'end_time': entry.end_time} for entry in instances
+            ],
+            'build: values_list tuples -> dicts': lambda: [serialize_entry_row(row) for row in tuples],
+            'render: DRF JSONRenderer': lambda: JSONRenderer().render(rows),
+            'render: FastJSONRenderer': lambda: renderers.FastJSONRenderer().render(rows),
+            'render: stream_json_array': lambda: b''.join(stream_json_array(rows)),
+        }
+        if options['user'] is not None:
+            repo = ContextEntryRepository()
+            cases['fetch: model instances'] = lambda: list(repo.get_all_contexts(options['user']))
+            cases['fetch: values_list tuples'] = lambda: repo.get_context_rows(options['user'])
+
+        report = {'rows': options['rows'], 'orjson': renderers.orjson is not None, 'cases': {}}
+        for name, run in cases.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                result = run()
+                timings.append((time.perf_counter() - started) * 1000)
+            report['cases'][name] = {'best_ms': round(min(timings), 3)}
+            if isinstance(result, bytes):
+                report['cases'][name]['bytes'] = len(result)
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ...repositories.api_key_repository import APIKeyRepository
+
+
+class Command(BaseCommand):
+    help = "Issue a new API key for a user, replacing any existing one. The key is printed once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"User '{options['username']}' does not exist")
+        api_key = APIKeyRepository().create_api_key(user)
+        self.stdout.write(api_key.raw_key)
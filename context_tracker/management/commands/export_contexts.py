@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.export_service import EXPORT_FORMATS, export_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Export a user's or workspace's context entries to a local file as CSV, NDJSON, "
+        "Parquet or Arrow (the last two need pyarrow), streaming rows in chunks."
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--user', type=int, help='Export this user id.')
+        target.add_argument('--workspace', type=int, help='Export this workspace id.')
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--from', dest='date_from', help='Earliest start_time (date or ISO timestamp).')
+        parser.add_argument('--to', dest='date_to', help='Latest start_time, exclusive; a date includes that day.')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', required=True, help='File to write.')
+
+    def handle(self, *args, **options):
+        result = export_service.export(
+            options['export_format'],
+            user_id=options['user'],
+            workspace_id=options['workspace'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            compress=options['gzip'],
+        )
+        if 'error' in result:
+            raise CommandError(result['error'])
+        written = 0
+        with open(options['output'], 'wb') as handle:
+            for chunk in result['chunks']:
+                handle.write(chunk)
+                written += len(chunk)
+        self.stdout.write(f"Wrote {written} bytes to {options['output']}")
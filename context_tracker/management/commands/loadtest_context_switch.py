@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from ...models import ContextEntry
+from ...services.context_service import context_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer ContextService.log_context from many threads for the same user and "
+        "check that exactly one entry is left open. Runs against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--switches', type=int, default=200, help='Context switches per thread.')
+        parser.add_argument('--username', default='loadtest-switch-user')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=options['username'])
+        ContextEntry.objects.filter(user=user).delete()
+
+        errors = []
+        latencies = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['threads'])
+
+        def worker(thread_index):
+            try:
+                start_barrier.wait()
+                for i in range(options['switches']):
+                    started = time.perf_counter()
+                    try:
+                        context_service.log_context(user.id, f'Thread {thread_index} task {i}', '')
+                    except Exception as exc:
+                        with lock:
+                            errors.append(repr(exc))
+                        continue
+                    with lock:
+                        latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        open_entries = ContextEntry.objects.filter(user=user, end_time__isnull=True).count()
+        report = {
+            'vendor': connection.vendor,
+            'threads': options['threads'],
+            'switches': len(latencies),
+            'errors': len(errors),
+            'sample_errors': errors[:5],
+            'switches_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+            'p50_ms': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)], 3) if latencies else None,
+            'open_entries': open_entries,
+            'consistent': open_entries == 1,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
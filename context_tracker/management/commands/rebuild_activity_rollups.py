@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...repositories.context_entry_repository import ContextEntryRepository
+from ...services.rollup_service import RollupService
+
+
+class Command(BaseCommand):
+    help = "Recompute DailyActivityRollup rows from closed context entries, reading them in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only rebuild this user id.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        entries = ContextEntryRepository().iter_closed_contexts(options['user'], options['chunk_size'])
+        with transaction.atomic():
+            count = RollupService().rebuild(entries, options['user'], options['chunk_size'])
+        self.stdout.write(f'Rebuilt {count} rollup rows')
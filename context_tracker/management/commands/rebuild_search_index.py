@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...repositories.context_entry_repository import ContextEntryRepository
+from ...services.search_index import SearchIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search index from every context entry, hot and "
+        "archived. Only needed for entries written outside ContextService."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        entries = ContextEntryRepository().iter_searchable_contexts(options['chunk_size'])
+        with transaction.atomic():
+            count = SearchIndex().rebuild(entries, options['chunk_size'])
+        self.stdout.write(f'Indexed {count} entries')
@@ -0,0 +1,141 @@
+"""
+Per-request instrumentation (see RequestMetricsMiddleware) and the in-process
+histograms behind the /metrics endpoint.
+
+Each request gets a RequestMetrics in a context variable. Database queries are
+timed by an execute wrapper installed on every connection as it is opened;
+because the sample lives in a context variable, queries that async views run
+through sync_to_async are attributed to the right request as well.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+current_request = ContextVar('current_request_metrics', default=None)
+
+def metrics_settings():
+    return getattr(settings, 'REQUEST_METRICS', {})
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+
+def record_query(execute, sql, params, many, context):
+    # Execute wrapper; a no-op outside instrumented requests
+    sample = current_request.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.sql_time += time.perf_counter() - started
+        sample.query_count += 1
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created handler; connections are reopened, so install only once per wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+@contextmanager
+def timed_serialization():
+    sample = current_request.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if sample is not None:
+            sample.serialization_time += time.perf_counter() - started
+
+def format_labels(labels):
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in labels)
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram, one series per label set.
+    """
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels, value):
+        # Caller holds the registry lock
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            label_text = format_labels(labels)
+            prefix = label_text + ',' if label_text else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+class MetricsRegistry:
+    """
+    Aggregates finished requests per method and route for this process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {
+                'duration': Histogram('focusflow_request_duration_seconds', 'Time to produce the response.', SECONDS_BUCKETS),
+                'queries': Histogram('focusflow_request_db_queries', 'SQL queries run per request.', QUERY_COUNT_BUCKETS),
+                'sql': Histogram('focusflow_request_db_seconds', 'Time spent in SQL per request.', SECONDS_BUCKETS),
+                'auth': Histogram('focusflow_request_auth_seconds', 'Time spent authenticating per request.', SECONDS_BUCKETS),
+                'serialization': Histogram('focusflow_request_serialization_seconds', 'Time spent encoding JSON per request.', SECONDS_BUCKETS),
+                'size': Histogram('focusflow_response_size_bytes', 'Size of non-streaming response bodies.', SIZE_BUCKETS),
+            }
+            self.responses = {}
+
+    def observe(self, record):
+        labels = (('method', record['method']), ('route', record['route']))
+        with self._lock:
+            histograms = self.histograms
+            histograms['duration'].observe(labels, record['duration_ms'] / 1000)
+            histograms['queries'].observe(labels, record['db_queries'])
+            histograms['sql'].observe(labels, record['db_ms'] / 1000)
+            histograms['auth'].observe(labels, record['auth_ms'] / 1000)
+            histograms['serialization'].observe(labels, record['serialization_ms'] / 1000)
+            if record['response_bytes'] is not None:
+                histograms['size'].observe(labels, record['response_bytes'])
+            key = labels + (('status', record['status']),)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self):
+        with self._lock:
+            lines = ['# HELP focusflow_responses_total Responses by method, route and status.',
+                     '# TYPE focusflow_responses_total counter']
+            lines.extend(f'focusflow_responses_total{{{format_labels(key)}}} {count}'
+                         for key, count in sorted(self.responses.items()))
+            for histogram in self.histograms.values():
+                lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
@@ -1,24 +1,218 @@
-import jwt
+import cProfile
+import logging
+import random
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
 from django.http import JsonResponse
-from django.conf import settings
-from .models import APIKey
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.permissions import AllowAny
+from . import metrics, profiling
+from .renderers import dumps
 from .services.auth_service import AuthService
 
+request_logger = logging.getLogger('context_tracker.requests')
+
+def view_requires_auth(callback):
+    # DRF views declare their policy through permission_classes; plain Django views are left alone
+    view_class = getattr(callback, 'view_class', None) or getattr(callback, 'cls', None)
+    permission_classes = getattr(view_class, 'permission_classes', None)
+    if not permission_classes:
+        return False
+    return any(permission is not AllowAny for permission in permission_classes)
+
+def compile_route_policies(patterns, prefix='^'):
+    # Flatten the URLconf into (compiled regex, requires_auth) pairs, once
+    policies = []
+    for pattern in patterns:
+        regex = prefix + pattern.pattern.regex.pattern.lstrip('^')
+        if isinstance(pattern, URLResolver):
+            policies.extend(compile_route_policies(pattern.url_patterns, regex))
+        elif isinstance(pattern, URLPattern):
+            policies.append((re.compile(regex), view_requires_auth(pattern.callback)))
+    return policies
+
 class AuthenticationMiddleware:
+    """
+    Authenticates requests to protected DRF routes exactly once.
+
+    Route policies are derived from each view's permission_classes when the
+    middleware is created. The authenticated user is attached to the request
+    for DRF (see MiddlewareAuthentication) and the time spent is exposed as
+    request.auth_duration and a Server-Timing entry.
+
+    Under ASGI the middleware runs natively async, so the chain is not pushed
+    onto the sync thread pool before reaching async views.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.auth_service = AuthService()
+        self.route_policies = compile_route_policies(get_resolver().url_patterns)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def requires_auth(self, path):
+        path = path.lstrip('/')
+        for regex, requires_auth in self.route_policies:
+            if regex.match(path):
+                return requires_auth
+        return False
+
+    def should_authenticate(self, request):
+        # Skip non-protected routes; without credentials, leave the decision to the view
+        if not self.requires_auth(request.path_info or request.path):
+            return False
+        return bool(request.headers.get('Authorization') or request.headers.get('X-API-KEY'))
+
+    def attach(self, request, auth_result, user, started):
+        # Attach user_id to the request, and the user for DRF to reuse
+        request.user_id = auth_result.get('user_id')
+        if user is not None:
+            request.authenticated_user = user
+            request.authenticated_token = auth_result.get('token')
+        request.auth_duration = time.perf_counter() - started
 
     def __call__(self, request):
-        # Skip authentication for non-protected routes
-        if request.path not in ['/log/', '/stop/', '/status/', '/entries/']:
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.should_authenticate(request):
             return self.get_response(request)
 
-        # Validate credentials using AuthService
+        started = time.perf_counter()
         auth_result = self.auth_service.validate_credentials(request.headers)
         if not auth_result['is_valid']:
             return JsonResponse({'error': auth_result['error']}, status=auth_result['status'])
+        self.attach(request, auth_result, self.auth_service.get_user(auth_result), started)
 
-        # Attach user_id to the request if valid
-        request.user_id = auth_result.get('user_id')
-        return self.get_response(request)
\ No newline at end of file
+        response = self.get_response(request)
+        response['Server-Timing'] = f'auth;dur={request.auth_duration * 1000:.3f}'
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_authenticate(request):
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        auth_result = await self.auth_service.avalidate_credentials(request.headers)
+        if not auth_result['is_valid']:
+            return JsonResponse({'error': auth_result['error']}, status=auth_result['status'])
+        self.attach(request, auth_result, await self.auth_service.aget_user(auth_result), started)
+
+        response = await self.get_response(request)
+        response['Server-Timing'] = f'auth;dur={request.auth_duration * 1000:.3f}'
+        return response
+
+class RequestMetricsMiddleware:
+    """
+    Opt-in (REQUEST_METRICS['ENABLED']) per-request instrumentation: query
+    count, SQL time, auth time, JSON serialization time, response size and
+    total time. Each request adds them to the Server-Timing header, logs them
+    as one JSON line on the `context_tracker.requests` logger and feeds the
+    histograms served by /metrics.
+
+    Place it first in MIDDLEWARE so the queries and time of the other
+    middleware are included. Streaming responses are measured up to the
+    point the response starts.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.metrics_settings().get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sample = metrics.RequestMetrics()
+        token = metrics.current_request.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        return self.finish(request, response, sample)
+
+    async def __acall__(self, request):
+        sample = metrics.RequestMetrics()
+        token = metrics.current_request.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        return self.finish(request, response, sample)
+
+    def finish(self, request, response, sample):
+        resolver_match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'route': resolver_match.route if resolver_match else 'unmatched',
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - sample.started) * 1000, 3),
+            'db_queries': sample.query_count,
+            'db_ms': round(sample.sql_time * 1000, 3),
+            'auth_ms': round(getattr(request, 'auth_duration', 0.0) * 1000, 3),
+            'serialization_ms': round(sample.serialization_time * 1000, 3),
+            'response_bytes': None if response.streaming else len(response.content),
+        }
+        timings = [
+            f'db;dur={record["db_ms"]:.3f};desc="{record["db_queries"]} queries"',
+            f'ser;dur={record["serialization_ms"]:.3f}',
+            f'total;dur={record["duration_ms"]:.3f}',
+        ]
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+        metrics.registry.observe(record)
+        request_logger.info(dumps(record).decode(), extra={'request_metrics': record})
+        return response
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in (REQUEST_PROFILING['ENABLED']) profiling of a sampled fraction of
+    requests with cProfile, and of any request slower than
+    SLOW_THRESHOLD_MS with the statistical stack sampler; see
+    context_tracker.profiling. `manage.py aggregate_profiles` merges the
+    files it writes.
+
+    Sync-only: under ASGI Django runs it, and the views behind it, on a
+    worker thread, so keep it off outside profiling sessions there.
+    """
+    def __init__(self, get_response):
+        config = profiling.profiling_settings()
+        if not config.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get('SAMPLE_RATE', 0.0)
+        self.slow_threshold_ms = config.get('SLOW_THRESHOLD_MS')
+        self.sampler = profiling.get_sampler(config.get('SAMPLING_INTERVAL_MS', 5) / 1000)
+        self.writer = profiling.ProfileWriter(config['DIRECTORY'], config.get('MAX_FILES_PER_ROUTE', 200))
+
+    def __call__(self, request):
+        profiler = cProfile.Profile() if random.random() < self.sample_rate else None
+        thread_id = self.sampler.register() if self.slow_threshold_ms is not None else None
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            samples = self.sampler.unregister(thread_id) if thread_id is not None else None
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.route if resolver_match else 'unmatched'
+        if profiler is not None:
+            self.writer.write_pstats(profiler, route, request.method, duration_ms)
+        if samples is not None and duration_ms >= self.slow_threshold_ms:
+            self.writer.write_collapsed(samples, route, request.method, duration_ms)
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:20
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.utils.timezone
+
+
+def close_duplicate_open_entries(apps, schema_editor):
+    # Keep only the newest open entry per user so the unique constraint can be created
+    ContextEntry = apps.get_model('context_tracker', 'ContextEntry')
+    open_entries = ContextEntry.objects.filter(end_time__isnull=True)
+    duplicated_users = (
+        open_entries.values('user_id').annotate(open_count=Count('id')).filter(open_count__gt=1)
+    )
+    for row in duplicated_users:
+        user_open = open_entries.filter(user_id=row['user_id']).order_by('-start_time', '-id')
+        newest = user_open.first()
+        user_open.exclude(id=newest.id).update(end_time=newest.start_time)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context_tracker', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_entries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='contextentry',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['user', '-start_time', '-id'], name='ctx_entry_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['workspace', '-start_time'], name='ctx_entry_workspace_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contextentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('user',), name='ctx_entry_one_open_per_user'),
+        ),
+    ]
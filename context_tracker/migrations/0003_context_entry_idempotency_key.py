@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context_tracker', '0002_context_entry_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contextentry',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='contextentry',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='ctx_entry_user_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    APIKey = apps.get_model('context_tracker', 'APIKey')
+    for api_key in APIKey.objects.all():
+        api_key.prefix = api_key.key[:8]
+        api_key.key_digest = hashlib.sha256(api_key.key.encode()).hexdigest()
+        api_key.save(update_fields=['prefix', 'key_digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context_tracker', '0003_context_entry_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='prefix',
+            field=models.CharField(default='', editable=False, max_length=8),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='apikey',
+            name='key',
+        ),
+        migrations.AlterField(
+            model_name='apikey',
+            name='prefix',
+            field=models.CharField(db_index=True, editable=False, max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='apikey',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
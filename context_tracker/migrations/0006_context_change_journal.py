@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def journal_existing_entries(apps, schema_editor):
+    # Seed each user's journal with one upsert per existing entry, so syncing from 0 returns the whole timeline
+    ContextEntry = apps.get_model('context_tracker', 'ContextEntry')
+    ContextChange = apps.get_model('context_tracker', 'ContextChange')
+    ContextChangeSequence = apps.get_model('context_tracker', 'ContextChangeSequence')
+    sequences = {}
+    batch = []
+    entries = ContextEntry.objects.filter(user__isnull=False).order_by('user_id', 'id').values_list('user_id', 'id')
+    for user_id, entry_id in entries.iterator(chunk_size=2000):
+        sequences[user_id] = sequences.get(user_id, 0) + 1
+        batch.append(ContextChange(user_id=user_id, seq=sequences[user_id], entry_id=entry_id, operation='upsert'))
+        if len(batch) >= 2000:
+            ContextChange.objects.bulk_create(batch)
+            batch = []
+    ContextChange.objects.bulk_create(batch)
+    ContextChangeSequence.objects.bulk_create(
+        [ContextChangeSequence(user_id=user_id, last_seq=last_seq) for user_id, last_seq in sequences.items()],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('context_tracker', '0005_daily_activity_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContextChangeSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='context_change_sequence', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContextChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField()),
+                ('entry_id', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='context_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='contextchange',
+            constraint=models.UniqueConstraint(fields=('user', 'seq'), name='ctx_change_user_seq'),
+        ),
+        migrations.RunPython(journal_existing_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context_tracker', '0006_context_change_journal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['user', 'end_time', 'start_time'], name='ctx_entry_user_end_idx'),
+        ),
+    ]
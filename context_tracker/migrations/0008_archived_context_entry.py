@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('context_tracker', '0007_context_entry_end_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedContextEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('activity', models.CharField(max_length=255)),
+                ('note', models.TextField(blank=True, null=True)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_context_entries', to=settings.AUTH_USER_MODEL)),
+                ('workspace', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_context_entries', to='context_tracker.workspace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-start_time', '-id'], name='ctx_archive_user_start_idx'), models.Index(fields=['user', 'end_time'], name='ctx_archive_user_end_idx'), models.Index(fields=['workspace', 'start_time'], name='ctx_archive_workspace_idx'), models.Index(condition=models.Q(('idempotency_key__isnull', False)), fields=['user', 'idempotency_key'], name='ctx_archive_idempotency_idx')],
+            },
+        ),
+    ]
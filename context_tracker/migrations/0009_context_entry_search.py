@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Full-text index used by SearchRepository; other backends fall back to LIKE
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE context_tracker_entrysearch USING fts5("
+        "owner, activity, note, tokenize = 'unicode61 remove_diacritics 2')",
+        "INSERT INTO context_tracker_entrysearch (rowid, owner, activity, note) "
+        "SELECT id, 'u' || user_id, activity, COALESCE(note, '') FROM context_tracker_contextentry "
+        "WHERE user_id IS NOT NULL UNION ALL "
+        "SELECT id, 'u' || user_id, activity, COALESCE(note, '') FROM context_tracker_archivedcontextentry "
+        "WHERE user_id IS NOT NULL",
+    ],
+    'postgresql': [
+        "CREATE TABLE context_tracker_entrysearch ("
+        "entry_id bigint PRIMARY KEY, user_id integer NOT NULL, document tsvector NOT NULL)",
+        "CREATE INDEX ctx_search_document_idx ON context_tracker_entrysearch USING GIN (document)",
+        "CREATE INDEX ctx_search_user_idx ON context_tracker_entrysearch (user_id)",
+        "INSERT INTO context_tracker_entrysearch (entry_id, user_id, document) "
+        "SELECT id, user_id, setweight(to_tsvector('english', activity), 'A') || "
+        "setweight(to_tsvector('english', COALESCE(note, '')), 'B') FROM ("
+        "SELECT id, user_id, activity, note FROM context_tracker_contextentry WHERE user_id IS NOT NULL UNION ALL "
+        "SELECT id, user_id, activity, note FROM context_tracker_archivedcontextentry WHERE user_id IS NOT NULL"
+        ") AS entries",
+    ],
+}
+
+def create_search_index(apps, schema_editor):
+    for statement in CREATE.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute("DROP TABLE context_tracker_entrysearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context_tracker', '0008_archived_context_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
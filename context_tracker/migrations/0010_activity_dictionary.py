@@ -0,0 +1,84 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, OuterRef, Subquery
+
+
+def build_activity_dictionary(apps, schema_editor):
+    # One Activity per distinct (user, workspace, name) over hot and archived
+    # entries, then point every entry at its row with one UPDATE per table and scope
+    Activity = apps.get_model('context_tracker', 'Activity')
+    uses = {}
+    for model_name in ('ContextEntry', 'ArchivedContextEntry'):
+        model = apps.get_model('context_tracker', model_name)
+        rows = (
+            model.objects.filter(user__isnull=False)
+            .values('user_id', 'workspace_id', 'activity')
+            .annotate(count=Count('id'), last_used_at=Max('start_time'))
+            .order_by()
+        )
+        for row in rows.iterator(chunk_size=5000):
+            key = (row['user_id'], row['workspace_id'], row['activity'])
+            count, last_used_at = uses.get(key, (0, None))
+            uses[key] = (count + row['count'], max(filter(None, [last_used_at, row['last_used_at']])))
+    Activity.objects.bulk_create([
+        Activity(user_id=user_id, workspace_id=workspace_id, name=name, usage_count=count, last_used_at=last_used_at)
+        for (user_id, workspace_id, name), (count, last_used_at) in uses.items()
+    ], batch_size=1000)
+
+    for model_name in ('ContextEntry', 'ArchivedContextEntry'):
+        model = apps.get_model('context_tracker', model_name)
+        personal = Activity.objects.filter(user=OuterRef('user'), workspace__isnull=True, name=OuterRef('activity'))
+        shared = Activity.objects.filter(user=OuterRef('user'), workspace=OuterRef('workspace'), name=OuterRef('activity'))
+        model.objects.filter(user__isnull=False, workspace__isnull=True).update(
+            activity_ref=Subquery(personal.values('id')[:1])
+        )
+        model.objects.filter(user__isnull=False, workspace__isnull=False).update(
+            activity_ref=Subquery(shared.values('id')[:1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('context_tracker', '0009_context_entry_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('usage_count', models.IntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL)),
+                ('workspace', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='context_tracker.workspace')),
+            ],
+            options={
+                'verbose_name_plural': 'activities',
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedcontextentry',
+            name='activity_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_context_entries', to='context_tracker.activity'),
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='activity_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='context_entries', to='context_tracker.activity'),
+        ),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(condition=models.Q(('workspace__isnull', True)), fields=('user', 'name'), name='activity_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(condition=models.Q(('workspace__isnull', False)), fields=('user', 'workspace', 'name'), name='activity_user_workspace_name'),
+        ),
+        migrations.RunPython(build_activity_dictionary, migrations.RunPython.noop),
+    ]
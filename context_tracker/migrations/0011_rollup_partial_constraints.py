@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:15
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_personal_duplicates(apps, schema_editor):
+    # Rows without a workspace were never constrained, so racing writers may have
+    # created several per key: fold each group into its oldest row
+    DailyActivityRollup = apps.get_model('context_tracker', 'DailyActivityRollup')
+    groups = (
+        DailyActivityRollup.objects.filter(workspace__isnull=True)
+        .values('user_id', 'date', 'activity')
+        .annotate(rows=Count('id'), keep=Min('id'), total_seconds=Sum('total_seconds'), entry_count=Sum('entry_count'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in groups:
+        duplicates = DailyActivityRollup.objects.filter(
+            user_id=group['user_id'], workspace__isnull=True, date=group['date'], activity=group['activity']
+        )
+        duplicates.exclude(id=group['keep']).delete()
+        duplicates.filter(id=group['keep']).update(
+            total_seconds=group['total_seconds'], entry_count=group['entry_count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context_tracker', '0010_activity_dictionary'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_personal_duplicates, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='dailyactivityrollup',
+            name='rollup_user_workspace_date_activity',
+        ),
+        migrations.AddConstraint(
+            model_name='dailyactivityrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('workspace__isnull', True)), fields=('user', 'date', 'activity'), name='rollup_user_date_activity'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyactivityrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('workspace__isnull', False)), fields=('user', 'workspace', 'date', 'activity'), name='rollup_user_workspace_date_activity'),
+        ),
+    ]
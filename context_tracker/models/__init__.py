@@ -1,2 +1,9 @@
+from django.contrib.auth.models import User
+from .workspace import Workspace
+from .activity import Activity
+from .api_key import APIKey
 from .context_entry import ContextEntry
-# Add other imports if necessary
+from .client import Client
+from .daily_activity_rollup import DailyActivityRollup
+from .context_change import ContextChange, ContextChangeSequence
+from .archived_context_entry import ArchivedContextEntry
@@ -0,0 +1,35 @@
+from django.db import models
+from django.contrib.auth.models import User
+from .workspace import Workspace
+
+class Activity(models.Model):
+    """
+    Per-user (and per-workspace) dictionary of activity names. ContextService
+    keeps `usage_count` at the number of entries using the name and
+    `last_used_at` at the latest start time it was used for; both feed the
+    autocomplete ranking.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="activities")
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="activities", null=True)
+    name = models.CharField(max_length=255)
+    usage_count = models.IntegerField(default=0)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "activities"
+        constraints = [
+            # Also serves the (user, name) lookups on the write paths
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                condition=models.Q(workspace__isnull=True),
+                name='activity_user_name',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'workspace', 'name'],
+                condition=models.Q(workspace__isnull=False),
+                name='activity_user_workspace_name',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,31 @@
+from django.db import models
+from django.contrib.auth.models import User
+import hashlib
+import secrets
+
+class APIKey(models.Model):
+    PREFIX_LENGTH = 8
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="api_key", null=True)
+    # Only a digest of the key is stored; the prefix narrows lookups without revealing the key
+    prefix = models.CharField(max_length=PREFIX_LENGTH, db_index=True, editable=False)
+    key_digest = models.CharField(max_length=64, unique=True, editable=False)
+
+    @staticmethod
+    def hash_key(raw_key):
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    def set_key(self, raw_key):
+        self.prefix = raw_key[:self.PREFIX_LENGTH]
+        self.key_digest = self.hash_key(raw_key)
+
+    def save(self, *args, **kwargs):
+        if not self.key_digest:
+            raw_key = secrets.token_urlsafe(48)  # Generate a secure 64-char API key
+            self.set_key(raw_key)
+            # The plain key is only available on the instance that created it
+            self.raw_key = raw_key
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"APIKey for {self.user.username}"
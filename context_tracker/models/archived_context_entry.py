@@ -0,0 +1,40 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+from .workspace import Workspace
+from .activity import Activity
+
+class ArchivedContextEntry(models.Model):
+    """
+    Closed ContextEntry rows moved out of the hot table by `archive_contexts`.
+    Rows keep their original id, so clients and the change journal still refer
+    to them, and the repository reads through to this table. Only the indexes
+    that history, range and export reads need are kept.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_context_entries", null=True)
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="archived_context_entries", null=True)
+    activity = models.CharField(max_length=255)
+    note = models.TextField(null=True, blank=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    archived_at = models.DateTimeField(default=now)
+    activity_ref = models.ForeignKey(Activity, on_delete=models.SET_NULL, related_name="archived_context_entries", null=True, blank=True,
+                                     db_index=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-start_time', '-id'], name='ctx_archive_user_start_idx'),
+            models.Index(fields=['user', 'end_time'], name='ctx_archive_user_end_idx'),
+            models.Index(fields=['workspace', 'start_time'], name='ctx_archive_workspace_idx'),
+            # Replayed offline entries are deduplicated against the archive too
+            models.Index(
+                fields=['user', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='ctx_archive_idempotency_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.activity} ({self.start_time}, archived)"
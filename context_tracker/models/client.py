@@ -0,0 +1,15 @@
+from django.db import models
+import secrets
+
+class Client(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    api_token = models.CharField(max_length=255, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        if not self.api_token:
+            self.api_token = secrets.token_urlsafe(48)  # Generate a secure API token
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
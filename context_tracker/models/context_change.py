@@ -0,0 +1,37 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+class ContextChange(models.Model):
+    """
+    Per-user journal of context-entry mutations. `seq` increases with every
+    change to the user's timeline; deletions are kept as tombstones so clients
+    can sync from their last seen sequence number.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OPERATION_CHOICES = [(UPSERT, 'Upsert'), (DELETE, 'Delete')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="context_changes")
+    seq = models.BigIntegerField()
+    entry_id = models.BigIntegerField()
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'seq'], name='ctx_change_user_seq'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} {self.entry_id} (#{self.seq})"
+
+class ContextChangeSequence(models.Model):
+    """
+    Last journal sequence number handed out per user. Writers bump it with an
+    UPDATE, which also serialises journal writes for that user until commit.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="context_change_sequence")
+    last_seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last_seq}"
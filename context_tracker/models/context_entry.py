@@ -1,8 +1,42 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+from .workspace import Workspace
+from .activity import Activity
 
 class ContextEntry(models.Model):
-    user_id = models.IntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="context_entries", null=True)
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="context_entries", null=True)
     activity = models.CharField(max_length=255)
-    note = models.TextField()
-    start_time = models.DateTimeField()
-    end_time = models.DateTimeField(null=True, blank=True)
\ No newline at end of file
+    note = models.TextField(null=True, blank=True)
+    start_time = models.DateTimeField(default=now)
+    end_time = models.DateTimeField(null=True, blank=True)
+    # Client-supplied key that makes replayed offline entries idempotent
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    # Dictionary row for `activity`, which is still stored on the entry for the read paths.
+    # Not indexed: entries are never looked up by it
+    activity_ref = models.ForeignKey(Activity, on_delete=models.SET_NULL, related_name="context_entries", null=True, blank=True,
+                                     db_index=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-start_time', '-id'], name='ctx_entry_user_start_idx'),
+            models.Index(fields=['workspace', '-start_time'], name='ctx_entry_workspace_start_idx'),
+            # Range queries: entries that started before a window and end inside or after it
+            models.Index(fields=['user', 'end_time', 'start_time'], name='ctx_entry_user_end_idx'),
+        ]
+        constraints = [
+            # Partial unique index: serves active-context lookups and allows one open entry per user
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(end_time__isnull=True),
+                name='ctx_entry_one_open_per_user',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                name='ctx_entry_user_idempotency_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.activity} ({self.start_time})"
@@ -0,0 +1,36 @@
+from django.db import models
+from django.contrib.auth.models import User
+from .workspace import Workspace
+
+class DailyActivityRollup(models.Model):
+    """
+    Time spent per user, workspace, day and activity, maintained incrementally
+    from closed ContextEntry rows. Entries spanning midnight count towards each day.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="activity_rollups")
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="activity_rollups", null=True)
+    date = models.DateField()
+    activity = models.CharField(max_length=255)
+    total_seconds = models.BigIntegerField(default=0)
+    entry_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='rollup_user_date_idx'),
+        ]
+        constraints = [
+            # NULLs never conflict, so personal rows need their own partial constraint
+            models.UniqueConstraint(
+                fields=['user', 'date', 'activity'],
+                condition=models.Q(workspace__isnull=True),
+                name='rollup_user_date_activity',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'workspace', 'date', 'activity'],
+                condition=models.Q(workspace__isnull=False),
+                name='rollup_user_workspace_date_activity',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.activity} on {self.date}: {self.total_seconds}s"
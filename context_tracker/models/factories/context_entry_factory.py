@@ -3,10 +3,23 @@ from django.utils.timezone import now
 
 class ContextEntryFactory:
     @staticmethod
-    def create(user_id, activity, note):
+    def create(user_id, activity, note, start_time=None, activity_id=None):
         return ContextEntry.objects.create(
             user_id=user_id,
             activity=activity,
+            activity_ref_id=activity_id,
             note=note,
-            start_time=now()
+            start_time=start_time or now()
+        )
+
+    @staticmethod
+    def build(user_id, activity, note, start_time=None, end_time=None, workspace_id=None):
+        # Unsaved instance, for bulk_create
+        return ContextEntry(
+            user_id=user_id,
+            workspace_id=workspace_id,
+            activity=activity,
+            note=note,
+            start_time=start_time or now(),
+            end_time=end_time
         )
@@ -0,0 +1,10 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+class Workspace(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="owned_workspaces")
+    members = models.ManyToManyField(User, related_name="workspaces")
+
+    def __str__(self):
+        return self.name
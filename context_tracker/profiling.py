@@ -0,0 +1,136 @@
+"""
+Request profiling used by RequestProfilingMiddleware and the aggregate_profiles
+command.
+
+Two profilers feed per-route files under REQUEST_PROFILING['DIRECTORY']:
+
+* A sampled fraction of requests runs under cProfile and is dumped as
+  `.pstats` (exact call counts, deterministic overhead).
+* Every request is watched by a shared statistical sampler that snapshots the
+  request thread's stack at a fixed interval. Requests slower than the
+  threshold keep their samples as `.collapsed` stacks ("a;b;c count" lines,
+  the input format of flamegraph.pl and speedscope). Fast requests only pay
+  for registering and unregistering their thread.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+
+def profiling_settings():
+    return getattr(settings, 'REQUEST_PROFILING', {})
+
+def frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':')
+
+def collapse_stack(frame, skip=0):
+    # Root-first "a;b;c" for a frame, leaving out the `skip` innermost frames
+    labels = []
+    while frame is not None:
+        if skip:
+            skip -= 1
+        else:
+            labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler:
+    """
+    One daemon thread that samples the stacks of registered threads every
+    `interval` seconds; it sleeps while nothing is registered.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._condition = threading.Condition()
+        self._samples = {}
+        self._thread = None
+
+    def register(self, thread_id=None):
+        thread_id = thread_id or threading.get_ident()
+        with self._condition:
+            self._samples[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-stack-sampler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return thread_id
+
+    def unregister(self, thread_id):
+        with self._condition:
+            return self._samples.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._samples:
+                    self._condition.wait()
+                frames = sys._current_frames()
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+def get_sampler(interval):
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(interval)
+        _sampler.interval = interval
+        return _sampler
+
+def route_slug(route):
+    return re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+
+class ProfileWriter:
+    """
+    Writes profiles to <directory>/<route slug>/ and stops writing for a route
+    once it holds `max_files` profiles.
+    """
+    _counter = 0
+    _lock = threading.Lock()
+
+    def __init__(self, directory, max_files=200):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def path_for(self, route, method, duration_ms, suffix):
+        route_directory = self.directory / route_slug(route)
+        route_directory.mkdir(parents=True, exist_ok=True)
+        if self.max_files and sum(1 for _ in route_directory.iterdir()) >= self.max_files:
+            return None
+        with self._lock:
+            ProfileWriter._counter += 1
+            counter = ProfileWriter._counter
+        name = f'{time.strftime("%Y%m%dT%H%M%S")}-{method}-{duration_ms:.0f}ms-{os.getpid()}-{counter}{suffix}'
+        return route_directory / name
+
+    def write_pstats(self, profiler, route, method, duration_ms):
+        path = self.path_for(route, method, duration_ms, '.pstats')
+        if path is not None:
+            profiler.dump_stats(path)
+        return path
+
+    def write_collapsed(self, samples, route, method, duration_ms):
+        path = self.path_for(route, method, duration_ms, '.collapsed') if samples else None
+        if path is not None:
+            path.write_text(''.join(f'{stack} {count}\n' for stack, count in samples.most_common()))
+        return path
+
+def read_collapsed(path):
+    samples = Counter()
+    with open(path) as handle:
+        for line in handle:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                samples[stack] += int(count)
+    return samples
@@ -0,0 +1,36 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .metrics import timed_serialization
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used instead
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_fallback_encoder = JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+def dumps(data):
+    """
+    Compact UTF-8 JSON bytes, matching DRF's JSONRenderer output (UTC datetimes
+    end in 'Z'). Uses orjson when installed; types it does not know go through
+    DRF's encoder.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_fallback_encoder.default, option=ORJSON_OPTIONS)
+    return _fallback_encoder.encode(data).encode('utf-8')
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed. Indented output
+    (e.g. `Accept: application/json; indent=4`) and installs without orjson fall
+    back to DRF's stdlib-based rendering.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with timed_serialization():
+            if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(data, accepted_media_type, renderer_context)
+            return dumps(data)
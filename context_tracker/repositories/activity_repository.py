@@ -0,0 +1,50 @@
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from ..models import Activity
+
+class ActivityRepository:
+    def scoped(self, user_id, workspace_id=None):
+        if workspace_id is None:
+            return Activity.objects.filter(user_id=user_id, workspace__isnull=True)
+        return Activity.objects.filter(user_id=user_id, workspace_id=workspace_id)
+
+    def get_ids(self, user_id, workspace_id, names):
+        return dict(self.scoped(user_id, workspace_id).filter(name__in=names).values_list('name', 'id'))
+
+    def record_uses(self, user_id, workspace_id, uses):
+        """
+        uses: {name: (count, last_used_at)}. Creates missing names, adds the
+        counts and moves last_used_at forward. Returns {name: activity id}.
+        """
+        ids = self.get_ids(user_id, workspace_id, list(uses))
+        missing = [name for name in uses if name not in ids]
+        if missing:
+            # A concurrent writer may create the same names; their row wins and is counted below
+            Activity.objects.bulk_create(
+                [Activity(user_id=user_id, workspace_id=workspace_id, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            ids.update(self.get_ids(user_id, workspace_id, missing))
+        for name, (count, last_used_at) in uses.items():
+            Activity.objects.filter(id=ids[name]).update(
+                usage_count=F('usage_count') + count,
+                last_used_at=Case(
+                    When(last_used_at__isnull=True, then=Value(last_used_at)),
+                    default=Greatest('last_used_at', Value(last_used_at)),
+                ),
+            )
+        return ids
+
+    def release_uses(self, user_id, workspace_id, counts):
+        # counts: {name: count}; usage never drops below zero
+        for name, count in counts.items():
+            self.scoped(user_id, workspace_id).filter(name=name).update(
+                usage_count=Greatest(F('usage_count') - count, Value(0))
+            )
+
+    def get_user_activities(self, user_id):
+        # (name, usage_count, last_used_at) across the user's personal and workspace scopes
+        return list(
+            Activity.objects.filter(user_id=user_id, usage_count__gt=0)
+            .values_list('name', 'usage_count', 'last_used_at')
+        )
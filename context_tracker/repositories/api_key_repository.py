@@ -0,0 +1,25 @@
+import hmac
+from ..models import APIKey
+
+class APIKeyRepository:
+    def candidates(self, raw_key):
+        # Narrow by the indexed prefix; callers compare digests in constant time
+        return APIKey.objects.select_related('user').filter(prefix=raw_key[:APIKey.PREFIX_LENGTH])
+
+    def get_api_key(self, raw_key):
+        digest = APIKey.hash_key(raw_key)
+        for candidate in self.candidates(raw_key):
+            if hmac.compare_digest(candidate.key_digest, digest):
+                return candidate
+        return None
+
+    async def aget_api_key(self, raw_key):
+        digest = APIKey.hash_key(raw_key)
+        async for candidate in self.candidates(raw_key):
+            if hmac.compare_digest(candidate.key_digest, digest):
+                return candidate
+        return None
+
+    def create_api_key(self, user):
+        APIKey.objects.filter(user=user).delete()
+        return APIKey.objects.create(user=user)
@@ -0,0 +1,43 @@
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils.timezone import now
+from ..models import ContextChange, ContextChangeSequence
+
+class ChangeJournalRepository:
+    def reserve(self, user_id, count):
+        # Hand out `count` consecutive sequence numbers and return the first.
+        # The counter UPDATE comes first so the write lock is taken before any read.
+        sequences = ContextChangeSequence.objects.filter(user_id=user_id)
+        if not sequences.update(last_seq=F('last_seq') + count):
+            try:
+                with transaction.atomic():
+                    ContextChangeSequence.objects.create(user_id=user_id, last_seq=count)
+                return 1
+            except IntegrityError:
+                sequences.update(last_seq=F('last_seq') + count)
+        return sequences.values_list('last_seq', flat=True).get() - count + 1
+
+    def record(self, user_id, changes):
+        # changes: [(entry_id, operation)], journaled in order. Rows go in with one
+        # executemany: a batch ingest journals every entry, and building and
+        # compiling model instances cost several times the inserts themselves.
+        first = self.reserve(user_id, len(changes))
+        connection = connections[router.db_for_write(ContextChange)]
+        changed_at = connection.ops.adapt_datetimefield_value(now())
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {ContextChange._meta.db_table} (user_id, seq, entry_id, operation, changed_at) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [(user_id, first + offset, entry_id, operation, changed_at)
+                 for offset, (entry_id, operation) in enumerate(changes)],
+            )
+
+    def get_changes_since(self, user_id, since, limit):
+        return list(
+            ContextChange.objects.filter(user_id=user_id, seq__gt=since)
+            .order_by('seq')
+            .values('seq', 'entry_id', 'operation')[:limit]
+        )
+
+    def get_last_seq(self, user_id):
+        return ContextChangeSequence.objects.filter(user_id=user_id).values_list('last_seq', flat=True).first() or 0
@@ -1,20 +1,272 @@
-from ..models import ContextEntry
+from django.db import connection, transaction
+from django.db.models import F, Q
+from ..db_routers import replica_manager
+from ..models import ArchivedContextEntry, ContextEntry, User
 from ..models.factories.context_entry_factory import ContextEntryFactory
 from .interfaces.context_entry_repository_interface import ContextEntryRepositoryInterface
 from django.utils.timezone import now
 
 class ContextEntryRepository(ContextEntryRepositoryInterface):
+    # Column order of the plain tuples returned by the list queries
+    ENTRY_FIELDS = ('id', 'activity', 'note', 'start_time', 'end_time')
+    # Columns shared by ContextEntry and ArchivedContextEntry, for model-instance unions;
+    # archived rows come back as read-only ContextEntry instances
+    ARCHIVE_FIELDS = (
+        'id', 'user_id', 'workspace_id', 'activity', 'note', 'start_time', 'end_time', 'idempotency_key',
+        'activity_ref_id',
+    )
+
     def create_context_entry(self, user_id, activity, note):
         return ContextEntryFactory.create(user_id=user_id, activity=activity, note=note)
 
-    def end_active_contexts(self, user_id):
-        return ContextEntry.objects.filter(user_id=user_id, end_time__isnull=True).update(end_time=now())
+    def end_active_contexts(self, user_id, end_time=None):
+        return ContextEntry.objects.filter(user_id=user_id, end_time__isnull=True).update(end_time=end_time or now())
+
+    def close_active_contexts(self, user_id, end_time):
+        # Call under lock_user_timeline. Returns the entries it closed, matched by
+        # id: other entries of the user may end at the same instant.
+        entries = list(ContextEntry.objects.filter(user_id=user_id, end_time__isnull=True))
+        if entries:
+            ContextEntry.objects.filter(id__in=[entry.id for entry in entries]).update(end_time=end_time)
+            for entry in entries:
+                entry.end_time = end_time
+        return entries
+
+    def lock_user_timeline(self, user_id):
+        # Must run inside a transaction; serialises writers to one user's timeline.
+        # SQLite has no row locks: a no-op UPDATE takes its write lock instead, so
+        # the reads that follow cannot fail with "database is locked" on upgrade.
+        if connection.features.has_select_for_update:
+            list(User.objects.select_for_update().filter(id=user_id).values_list('id', flat=True))
+        else:
+            User.objects.filter(id=user_id).update(last_login=F('last_login'))
+
+    def switch_context(self, user_id, activity, note, resolve_activity=None):
+        # Close the open entry and open the new one in a single transaction.
+        # Returns the new entry and the entries that were closed. resolve_activity,
+        # if given, maps the switch time to the activity's dictionary id.
+        with transaction.atomic(savepoint=False):
+            self.lock_user_timeline(user_id)
+            switched_at = now()
+            closed = self.close_active_contexts(user_id, switched_at)
+            activity_id = resolve_activity(switched_at) if resolve_activity else None
+            entry = ContextEntryFactory.create(
+                user_id=user_id, activity=activity, note=note, start_time=switched_at, activity_id=activity_id
+            )
+            return entry, closed
 
     def get_active_context(self, user_id):
         return ContextEntry.objects.filter(user_id=user_id, end_time__isnull=True).first()
 
+    async def aget_active_context(self, user_id):
+        return await ContextEntry.objects.filter(user_id=user_id, end_time__isnull=True).afirst()
+
+    # History and export reads below tolerate replica lag, so a read replica may serve
+    # them. Each one reads through to the archive (see archive_closed_before): the
+    # hot and archived querysets are combined with UNION ALL in a single query.
+    def timeline_querysets(self, user_id=None, manager=replica_manager):
+        querysets = [manager(ContextEntry).all(), manager(ArchivedContextEntry).all()]
+        if user_id is not None:
+            querysets = [queryset.filter(user_id=user_id) for queryset in querysets]
+        return querysets
+
+    def combine(self, querysets):
+        return querysets[0].union(*querysets[1:], all=True)
+
     def get_all_contexts(self, user_id):
-        return ContextEntry.objects.filter(user_id=user_id).order_by('-start_time')
+        return self.combine(
+            [queryset.only(*self.ARCHIVE_FIELDS) for queryset in self.timeline_querysets(user_id)]
+        ).order_by('-start_time')
+
+    def get_context_rows(self, user_id):
+        return list(
+            self.combine([queryset.values_list(*self.ENTRY_FIELDS) for queryset in self.timeline_querysets(user_id)])
+            .order_by('-start_time', '-id')
+        )
+
+    def contexts_page_queryset(self, user_id, after=None):
+        # Keyset pagination on (start_time, id), newest first
+        querysets = self.timeline_querysets(user_id)
+        if after is not None:
+            start_time, entry_id = after
+            querysets = [
+                queryset.filter(Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=entry_id))
+                for queryset in querysets
+            ]
+        return self.combine(
+            [queryset.values_list(*self.ENTRY_FIELDS) for queryset in querysets]
+        ).order_by('-start_time', '-id')
+
+    def get_contexts_page(self, user_id, limit, after=None):
+        return list(self.contexts_page_queryset(user_id, after)[:limit])
+
+    async def aget_contexts_page(self, user_id, limit, after=None):
+        return [row async for row in self.contexts_page_queryset(user_id, after)[:limit]]
+
+    def iter_contexts(self, user_id, chunk_size=2000):
+        return (
+            self.combine([queryset.values_list(*self.ENTRY_FIELDS) for queryset in self.timeline_querysets(user_id)])
+            .order_by('-start_time', '-id')
+            .iterator(chunk_size=chunk_size)
+        )
+
+    async def aiter_contexts(self, user_id, chunk_size=2000):
+        # Django 4.2 runs values_list() queries eagerly even from aiterator(), so go through values()
+        rows = (
+            self.combine([queryset.values(*self.ENTRY_FIELDS) for queryset in self.timeline_querysets(user_id)])
+            .order_by('-start_time', '-id')
+            .aiterator(chunk_size=chunk_size)
+        )
+        async for row in rows:
+            yield tuple(row[field] for field in self.ENTRY_FIELDS)
+
+    def iter_export_rows(self, user_id=None, workspace_id=None, start=None, end=None, chunk_size=2000):
+        # Export columns as tuples, oldest first, filtered on start_time in [start, end)
+        querysets = []
+        for queryset in self.timeline_querysets(user_id):
+            if workspace_id is not None:
+                queryset = queryset.filter(workspace_id=workspace_id)
+            if start is not None:
+                queryset = queryset.filter(start_time__gte=start)
+            if end is not None:
+                queryset = queryset.filter(start_time__lt=end)
+            querysets.append(queryset.values_list(
+                'id', 'user_id', 'workspace_id', 'activity', 'note', 'start_time', 'end_time'
+            ))
+        return self.combine(querysets).order_by('start_time', 'id').iterator(chunk_size=chunk_size)
+
+    def overlapping_querysets(self, user_id, start, end=None, manager=replica_manager):
+        """
+        Entries overlapping [start, end); open entries extend to infinity. The
+        condition is split into disjoint index ranges rather than one OR, which
+        could only scan every entry before `end`: entries starting inside the
+        window (user, start_time), entries that started earlier and end inside
+        it or after it (user, end_time, start_time), and the open entry.
+        Archived entries are closed, so they contribute all but the last range.
+        Parts select the columns both tables share, so they can be combined.
+        """
+        parts = []
+        for entries in self.timeline_querysets(user_id, manager):
+            entries = entries.only(*self.ARCHIVE_FIELDS)
+            started_before = entries.filter(start_time__lt=start)
+            if end is None:
+                parts += [entries.filter(start_time__gte=start), started_before.filter(end_time__gt=start)]
+            else:
+                parts += [
+                    entries.filter(start_time__gte=start, start_time__lt=end),
+                    started_before.filter(end_time__gt=start, end_time__lte=end),
+                    # Covers the whole window; an edited timeline can hold several
+                    started_before.filter(end_time__gt=end),
+                ]
+        parts.append(manager(ContextEntry).filter(
+            user_id=user_id, start_time__lt=start, end_time__isnull=True
+        ).only(*self.ARCHIVE_FIELDS))
+        return parts
+
+    def union_in_range(self, parts, limit=None):
+        # UNION ALL of disjoint parts, sorted here: an ORDER BY on the union makes
+        # SQLite read every part in start_time order, through the wrong index
+        return self.combine(parts)[:limit]
+
+    def get_contexts_in_range(self, user_id, start, end=None):
+        # Model instances for the write paths, so always read from the primary
+        parts = self.overlapping_querysets(user_id, start, end, lambda model: model.objects)
+        return sorted(self.union_in_range(parts), key=lambda entry: (entry.start_time, entry.id))
+
+    def context_rows_in_range_queryset(self, user_id, start, end=None, limit=None):
+        # ENTRY_FIELDS tuples, unordered; a timeline read, so replicas may serve it
+        parts = [part.values_list(*self.ENTRY_FIELDS) for part in self.overlapping_querysets(user_id, start, end)]
+        return self.union_in_range(parts, limit)
+
+    def get_context_rows_in_range(self, user_id, start, end=None, limit=None):
+        rows = list(self.context_rows_in_range_queryset(user_id, start, end, limit))
+        return sorted(rows, key=lambda row: (row[3], row[0]))
+
+    async def aget_context_rows_in_range(self, user_id, start, end=None, limit=None):
+        rows = [row async for row in self.context_rows_in_range_queryset(user_id, start, end, limit)]
+        return sorted(rows, key=lambda row: (row[3], row[0]))
+
+    def get_existing_idempotency_keys(self, user_id, keys, chunk_size=500):
+        keys = list(keys)
+        existing = set()
+        for offset in range(0, len(keys), chunk_size):
+            for model in (ContextEntry, ArchivedContextEntry):
+                existing.update(
+                    model.objects.filter(
+                        user_id=user_id, idempotency_key__in=keys[offset:offset + chunk_size]
+                    ).values_list('idempotency_key', flat=True)
+                )
+        return existing
+
+    def close_context(self, entry_id, end_time):
+        return ContextEntry.objects.filter(id=entry_id).update(end_time=end_time)
+
+    def bulk_create_contexts(self, user_id, entries, batch_size=1000):
+        created = ContextEntry.objects.bulk_create(
+            [ContextEntry(user_id=user_id, **entry) for entry in entries], batch_size=batch_size
+        )
+        if created and not connection.features.can_return_rows_from_bulk_insert:
+            # Backends that cannot return ids: look them up by idempotency key
+            ids = dict(
+                ContextEntry.objects.filter(
+                    user_id=user_id, idempotency_key__in=[entry.idempotency_key for entry in created]
+                ).values_list('idempotency_key', 'id')
+            )
+            for entry in created:
+                entry.id = ids.get(entry.idempotency_key)
+        return created
+
+    def iter_closed_contexts(self, user_id=None, chunk_size=2000):
+        for model in (ContextEntry, ArchivedContextEntry):
+            queryset = model.objects.filter(user__isnull=False, end_time__isnull=False)
+            if user_id is not None:
+                queryset = queryset.filter(user_id=user_id)
+            yield from queryset.only(
+                'user_id', 'workspace_id', 'activity', 'start_time', 'end_time'
+            ).order_by('id').iterator(chunk_size=chunk_size)
+
+    def iter_searchable_contexts(self, chunk_size=2000):
+        # Every entry, hot and archived, with the fields the search index needs
+        for model in (ContextEntry, ArchivedContextEntry):
+            yield from model.objects.filter(user__isnull=False).only(
+                'user_id', 'activity', 'note'
+            ).order_by('id').iterator(chunk_size=chunk_size)
+
+    def get_contexts_by_ids(self, user_id, entry_ids):
+        return list(self.combine([
+            queryset.filter(id__in=entry_ids).values_list(*self.ENTRY_FIELDS)
+            for queryset in self.timeline_querysets(user_id, lambda model: model.objects)
+        ]))
 
     def get_context_by_id_and_user(self, log_id, user_id):
-        return ContextEntry.objects.filter(id=log_id, user_id=user_id).first()
\ No newline at end of file
+        # Archived entries can still be edited and deleted; they stay in the archive
+        return (
+            ContextEntry.objects.filter(id=log_id, user_id=user_id).first()
+            or ArchivedContextEntry.objects.filter(id=log_id, user_id=user_id).first()
+        )
+
+    def delete_context_entry(self, log_id, user_id):
+        deleted, _ = ContextEntry.objects.filter(id=log_id, user_id=user_id).delete()
+        if not deleted:
+            deleted, _ = ArchivedContextEntry.objects.filter(id=log_id, user_id=user_id).delete()
+        return deleted
+
+    def archive_closed_before(self, cutoff, user_id=None, batch_size=1000):
+        """
+        Move entries that ended before `cutoff` into ArchivedContextEntry, one
+        transaction per batch so writers are only held up briefly. Entry ids
+        are kept; the journal and rollups are unaffected because the timeline
+        itself does not change. Returns the number of entries moved.
+        """
+        queryset = ContextEntry.objects.filter(end_time__lt=cutoff)
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+        moved = 0
+        while True:
+            with transaction.atomic():
+                batch = list(queryset.select_for_update().order_by('id').values(*self.ARCHIVE_FIELDS)[:batch_size])
+                if not batch:
+                    return moved
+                ArchivedContextEntry.objects.bulk_create([ArchivedContextEntry(**row) for row in batch])
+                ContextEntry.objects.filter(id__in=[row['id'] for row in batch]).delete()
+            moved += len(batch)
@@ -6,7 +6,19 @@ class ContextEntryRepositoryInterface(ABC):
         pass
 
     @abstractmethod
-    def end_active_contexts(self, user_id):
+    def end_active_contexts(self, user_id, end_time=None):
+        pass
+
+    @abstractmethod
+    def close_active_contexts(self, user_id, end_time):
+        pass
+
+    @abstractmethod
+    def lock_user_timeline(self, user_id):
+        pass
+
+    @abstractmethod
+    def switch_context(self, user_id, activity, note, resolve_activity=None):
         pass
 
     @abstractmethod
@@ -17,6 +29,74 @@ class ContextEntryRepositoryInterface(ABC):
     def get_all_contexts(self, user_id):
         pass
 
+    @abstractmethod
+    def get_context_rows(self, user_id):
+        pass
+
+    @abstractmethod
+    def get_contexts_page(self, user_id, limit, after=None):
+        pass
+
+    @abstractmethod
+    def iter_contexts(self, user_id, chunk_size=2000):
+        pass
+
+    @abstractmethod
+    def iter_export_rows(self, user_id=None, workspace_id=None, start=None, end=None, chunk_size=2000):
+        pass
+
+    @abstractmethod
+    def get_contexts_in_range(self, user_id, start, end=None):
+        pass
+
+    @abstractmethod
+    def get_context_rows_in_range(self, user_id, start, end=None, limit=None):
+        pass
+
+    @abstractmethod
+    async def aget_context_rows_in_range(self, user_id, start, end=None, limit=None):
+        pass
+
+    @abstractmethod
+    def get_existing_idempotency_keys(self, user_id, keys, chunk_size=500):
+        pass
+
+    @abstractmethod
+    def close_context(self, entry_id, end_time):
+        pass
+
+    @abstractmethod
+    def bulk_create_contexts(self, user_id, entries, batch_size=1000):
+        pass
+
+    @abstractmethod
+    def iter_closed_contexts(self, user_id=None, chunk_size=2000):
+        pass
+
+    @abstractmethod
+    def get_contexts_by_ids(self, user_id, entry_ids):
+        pass
+
     @abstractmethod
     def get_context_by_id_and_user(self, log_id, user_id):
         pass
+
+    @abstractmethod
+    def delete_context_entry(self, log_id, user_id):
+        pass
+
+    @abstractmethod
+    def archive_closed_before(self, cutoff, user_id=None, batch_size=1000):
+        pass
+
+    @abstractmethod
+    async def aget_active_context(self, user_id):
+        pass
+
+    @abstractmethod
+    async def aget_contexts_page(self, user_id, limit, after=None):
+        pass
+
+    @abstractmethod
+    def aiter_contexts(self, user_id, chunk_size=2000):
+        pass
@@ -0,0 +1,66 @@
+from django.db.models import Case, F, Value, When
+from ..db_routers import replica_manager
+from ..models import DailyActivityRollup
+
+class RollupRepository:
+    # Keys per statement; keeps the IN and CASE lists under SQLite's parameter limit
+    DELTA_BATCH_SIZE = 100
+
+    def apply_deltas(self, user_id, workspace_id, deltas):
+        # deltas: {(date, activity): (seconds, entry_count)}; rows that drop to zero entries are removed
+        keys = list(deltas)
+        for start in range(0, len(keys), self.DELTA_BATCH_SIZE):
+            self._apply_batch(user_id, workspace_id, {key: deltas[key] for key in keys[start:start + self.DELTA_BATCH_SIZE]})
+
+    def _apply_batch(self, user_id, workspace_id, deltas):
+        # One UPDATE adds the deltas to the existing rows in place, then the misses are created together
+        existing = {
+            (date, activity): rollup_id
+            for date, activity, rollup_id in DailyActivityRollup.objects.filter(
+                user_id=user_id, workspace_id=workspace_id,
+                date__in={date for date, _ in deltas}, activity__in={activity for _, activity in deltas},
+            ).values_list('date', 'activity', 'id')
+            if (date, activity) in deltas
+        }
+        if existing:
+            DailyActivityRollup.objects.filter(id__in=existing.values()).update(
+                total_seconds=F('total_seconds') + Case(
+                    *[When(id=rollup_id, then=Value(deltas[key][0])) for key, rollup_id in existing.items()]
+                ),
+                entry_count=F('entry_count') + Case(
+                    *[When(id=rollup_id, then=Value(deltas[key][1])) for key, rollup_id in existing.items()]
+                ),
+            )
+        DailyActivityRollup.objects.bulk_create([
+            DailyActivityRollup(user_id=user_id, workspace_id=workspace_id, date=date, activity=activity,
+                                total_seconds=seconds, entry_count=count)
+            for (date, activity), (seconds, count) in deltas.items()
+            if (date, activity) not in existing and count > 0
+        ])
+        emptied = [rollup_id for key, rollup_id in existing.items() if deltas[key][1] < 0]
+        if emptied:
+            DailyActivityRollup.objects.filter(id__in=emptied, entry_count__lte=0).delete()
+
+    def bulk_create_rollups(self, rollups, batch_size=1000):
+        return DailyActivityRollup.objects.bulk_create(
+            [DailyActivityRollup(**rollup) for rollup in rollups], batch_size=batch_size
+        )
+
+    def delete_rollups(self, user_id=None):
+        rollups = DailyActivityRollup.objects.all()
+        if user_id is not None:
+            rollups = rollups.filter(user_id=user_id)
+        return rollups.delete()
+
+    def get_rollups(self, user_id, date_from=None, date_to=None, workspace_id=None):
+        # Stats tolerate replica lag
+        rollups = replica_manager(DailyActivityRollup).filter(user_id=user_id)
+        if date_from is not None:
+            rollups = rollups.filter(date__gte=date_from)
+        if date_to is not None:
+            rollups = rollups.filter(date__lte=date_to)
+        if workspace_id is not None:
+            rollups = rollups.filter(workspace_id=workspace_id)
+        return rollups.order_by('date', 'activity').values(
+            'date', 'activity', 'workspace_id', 'total_seconds', 'entry_count'
+        )
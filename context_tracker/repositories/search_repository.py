@@ -0,0 +1,145 @@
+import re
+from abc import ABC, abstractmethod
+from django.db import connections, router
+from django.db.models import Q
+from ..models import ArchivedContextEntry, ContextEntry
+
+# Created by migration 0009 on SQLite (FTS5) and PostgreSQL (tsvector + GIN)
+SEARCH_TABLE = 'context_tracker_entrysearch'
+TEXT_SEARCH_CONFIG = 'english'
+MAX_TERMS = 16
+
+def search_terms(query):
+    # Words only, so user input never reaches the FTS query syntax
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+class SearchRepository(ABC):
+    """
+    Full-text index over ContextEntry.activity and note, one document per
+    entry id and scoped by user. Archived entries keep their ids, so the index
+    covers them without changes. Results are (entry_id, rank) pairs, best first.
+    """
+    def __init__(self, using=None):
+        self.using = using or router.db_for_write(ContextEntry)
+
+    def cursor(self):
+        return connections[self.using].cursor()
+
+    @abstractmethod
+    def index(self, entries):
+        pass
+
+    @abstractmethod
+    def remove(self, entry_ids):
+        pass
+
+    @abstractmethod
+    def search(self, user_id, terms, limit, offset=0):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+class SQLiteSearchRepository(SearchRepository):
+    # Each document carries an "owner" token, so the user filter is part of the
+    # MATCH and only that user's postings are intersected. The terms are limited
+    # to the text columns, or "u" would match every owner token.
+    def index(self, entries):
+        entries = [entry for entry in entries if entry.id is not None and entry.user_id is not None]
+        if not entries:
+            return
+        with self.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(entry.id,) for entry in entries]
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, owner, activity, note) VALUES (%s, %s, %s, %s)',
+                [(entry.id, f'u{entry.user_id}', entry.activity, entry.note or '') for entry in entries],
+            )
+
+    def remove(self, entry_ids):
+        with self.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(entry_id,) for entry_id in entry_ids])
+
+    def search(self, user_id, terms, limit, offset=0):
+        prefixes = ' '.join('"%s"*' % term for term in terms)
+        match = f'owner:u{user_id} AND {{activity note}}: ({prefixes})'
+        with self.cursor() as cursor:
+            # bm25 is lower for better matches; activity outweighs the note
+            cursor.execute(
+                f'SELECT rowid, -bm25({SEARCH_TABLE}, 0.0, 4.0, 1.0) AS score FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s ORDER BY bm25({SEARCH_TABLE}, 0.0, 4.0, 1.0), rowid DESC '
+                'LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return cursor.fetchall()
+
+    def clear(self):
+        with self.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+class PostgresSearchRepository(SearchRepository):
+    DOCUMENT = (
+        "setweight(to_tsvector('{config}', %s), 'A') || setweight(to_tsvector('{config}', %s), 'B')"
+    ).format(config=TEXT_SEARCH_CONFIG)
+
+    def index(self, entries):
+        entries = [entry for entry in entries if entry.id is not None and entry.user_id is not None]
+        if not entries:
+            return
+        with self.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (entry_id, user_id, document) VALUES (%s, %s, {self.DOCUMENT}) '
+                'ON CONFLICT (entry_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document',
+                [(entry.id, entry.user_id, entry.activity, entry.note or '') for entry in entries],
+            )
+
+    def remove(self, entry_ids):
+        with self.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE entry_id = ANY(%s)', [list(entry_ids)])
+
+    def search(self, user_id, terms, limit, offset=0):
+        query = ' & '.join(f'{term}:*' for term in terms)
+        with self.cursor() as cursor:
+            cursor.execute(
+                f"SELECT entry_id, ts_rank_cd(document, query) AS score "
+                f"FROM {SEARCH_TABLE}, to_tsquery('{TEXT_SEARCH_CONFIG}', %s) AS query "
+                'WHERE user_id = %s AND document @@ query ORDER BY score DESC, entry_id DESC LIMIT %s OFFSET %s',
+                [query, user_id, limit, offset],
+            )
+            return cursor.fetchall()
+
+    def clear(self):
+        with self.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+class LikeSearchRepository(SearchRepository):
+    # Other backends: no index, substring matches on both tables, newest first
+    def index(self, entries):
+        pass
+
+    def remove(self, entry_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, user_id, terms, limit, offset=0):
+        querysets = []
+        for model in (ContextEntry, ArchivedContextEntry):
+            queryset = model.objects.using(self.using).filter(user_id=user_id)
+            for term in terms:
+                queryset = queryset.filter(Q(activity__icontains=term) | Q(note__icontains=term))
+            querysets.append(queryset.values_list('id', 'start_time'))
+        rows = querysets[0].union(querysets[1], all=True).order_by('-start_time', '-id')[offset:offset + limit]
+        return [(entry_id, None) for entry_id, _ in rows]
+
+SEARCH_REPOSITORIES = {
+    'sqlite': SQLiteSearchRepository,
+    'postgresql': PostgresSearchRepository,
+}
+
+def get_search_repository(using=None):
+    using = using or router.db_for_write(ContextEntry)
+    return SEARCH_REPOSITORIES.get(connections[using].vendor, LikeSearchRepository)(using)
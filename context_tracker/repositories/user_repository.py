@@ -0,0 +1,43 @@
+from django.db.models import Q
+from django.db.models.functions import Lower
+from ..models import User
+
+class UserRepository:
+    def get_active_user(self, user_id):
+        if user_id is None:
+            return None
+        return User.objects.filter(id=user_id, is_active=True).first()
+
+    async def aget_active_user(self, user_id):
+        if user_id is None:
+            return None
+        return await User.objects.filter(id=user_id, is_active=True).afirst()
+
+    def resolve_users(self, user_ids, emails):
+        # (id, lower-cased email) of active users matching any id or email, in one query
+        return list(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(Q(id__in=user_ids) | Q(email_lower__in=emails), is_active=True)
+            .values_list('id', 'email_lower')
+        )
+
+    def get_user_by_username(self, username):
+        return User.objects.filter(**{User.USERNAME_FIELD: username}).first()
+
+    def username_exists(self, username):
+        return User.objects.filter(username=username).exists()
+
+    def create_user_with_password_hash(self, username, email, password_hash, first_name=None, last_name=None):
+        # create_user() without hashing: the hash was already made off the request thread
+        user = User(
+            username=User.normalize_username(username),
+            email=User.objects.normalize_email(email),
+            first_name=first_name or '',
+            last_name=last_name or '',
+            password=password_hash,
+        )
+        user.save()
+        return user
+
+    def set_password_hash(self, user_id, password_hash):
+        return User.objects.filter(id=user_id).update(password=password_hash)
@@ -1,4 +1,7 @@
-from ..models import Workspace
+from django.db.models import Count, Prefetch, Q
+from ..models import ContextEntry, DailyActivityRollup, User, Workspace
+
+WorkspaceMembership = Workspace.members.through
 
 class WorkspaceRepository:
     def create_workspace(self, name, owner):
@@ -10,5 +13,53 @@ class WorkspaceRepository:
     def add_member_to_workspace(self, workspace, user):
         workspace.members.add(user)
 
+    def get_member_ids(self, workspace_id, user_ids):
+        return set(
+            WorkspaceMembership.objects.filter(workspace_id=workspace_id, user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        )
+
+    def add_members(self, workspace_id, user_ids, batch_size=1000):
+        # Rows go straight into the through table; existing memberships are skipped by the unique constraint
+        WorkspaceMembership.objects.bulk_create(
+            [WorkspaceMembership(workspace_id=workspace_id, user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True, batch_size=batch_size
+        )
+
+    def remove_members(self, workspace_id, user_ids):
+        deleted, _ = WorkspaceMembership.objects.filter(workspace_id=workspace_id, user_id__in=user_ids).delete()
+        return deleted
+
     def get_user_workspaces(self, user):
-        return user.workspaces.all()
\ No newline at end of file
+        return user.workspaces.all()
+
+    def user_can_access(self, workspace_id, user_id):
+        return Workspace.objects.filter(
+            Q(owner_id=user_id) | Q(members__id=user_id), id=workspace_id
+        ).exists()
+
+    def get_dashboard_workspaces(self, user_id, day):
+        """
+        Workspaces the user owns or belongs to, with members and each member's
+        open entry and rollups for the day prefetched: four queries however
+        many workspaces and members there are. Entries and rollups are the
+        member's own, whichever workspace (if any) they were logged in.
+        Results carry `member_count` and `member_list`; members carry
+        `active_entries` and `day_rollups`.
+        """
+        # Filter through a subquery so the membership join does not skew member_count
+        accessible = Workspace.objects.filter(Q(owner_id=user_id) | Q(members__id=user_id)).values('id')
+        members = User.objects.only('id', 'username').order_by('username').prefetch_related(
+            Prefetch('context_entries', queryset=ContextEntry.objects.filter(end_time__isnull=True)
+                     .only('id', 'user_id', 'workspace_id', 'activity', 'note', 'start_time', 'end_time'),
+                     to_attr='active_entries'),
+            Prefetch('activity_rollups', queryset=DailyActivityRollup.objects.filter(date=day)
+                     .order_by('activity'), to_attr='day_rollups'),
+        )
+        return (
+            Workspace.objects.filter(id__in=accessible)
+            .select_related('owner')
+            .annotate(member_count=Count('members', distinct=True))
+            .prefetch_related(Prefetch('members', queryset=members, to_attr='member_list'))
+            .order_by('name')
+        )
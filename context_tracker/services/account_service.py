@@ -0,0 +1,50 @@
+from django.contrib.auth.signals import user_login_failed
+from ..repositories.user_repository import UserRepository
+from .password_hashing import HashingPoolBusy, password_pool
+
+BUSY_RESPONSE = {'error': 'Password hashing is at capacity, retry shortly', 'status': 503, 'retry_after': 1}
+
+class AccountService:
+    """
+    Username/password login and registration with all password hashing run
+    on the bounded hashing pool. Login follows ModelBackend: inactive users
+    are rejected and unknown usernames still pay for one hash, so response
+    times do not reveal which accounts exist.
+    """
+    def __init__(self, user_repo=None, hashing_pool=None):
+        self.user_repo = user_repo or UserRepository()
+        self.hashing_pool = hashing_pool or password_pool
+
+    def login(self, username, password, request=None):
+        if not username or not password:
+            return {'error': 'Invalid credentials', 'status': 401}
+        user = self.user_repo.get_user_by_username(username)
+        try:
+            if user is None:
+                self.hashing_pool.make_password(password)
+                matches = False
+            else:
+                matches, needs_rehash = self.hashing_pool.verify(password, user.password)
+                if matches and needs_rehash:
+                    user.password = self.hashing_pool.make_password(password)
+                    self.user_repo.set_password_hash(user.id, user.password)
+        except HashingPoolBusy:
+            return BUSY_RESPONSE
+        if not matches or not user.is_active:
+            user_login_failed.send(sender=__name__, credentials={'username': username}, request=request)
+            return {'error': 'Invalid credentials', 'status': 401}
+        return {'user': user}
+
+    def register(self, username, password, email, first_name=None, last_name=None):
+        if not all([username, password, email]):
+            return {'error': 'All fields are required', 'status': 400}
+        if self.user_repo.username_exists(username):
+            return {'error': 'Username already exists', 'status': 400}
+        try:
+            password_hash = self.hashing_pool.make_password(password)
+        except HashingPoolBusy:
+            return BUSY_RESPONSE
+        user = self.user_repo.create_user_with_password_hash(username, email, password_hash, first_name, last_name)
+        return {'user': user}
+
+account_service = AccountService()
@@ -0,0 +1,119 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from ..repositories.activity_repository import ActivityRepository
+from .caches import TTLCache
+
+def fold(text):
+    return ' '.join(text.casefold().split())
+
+def word_starts(name):
+    # "Code review" is found by "co", "code r" and "rev"
+    folded = fold(name)
+    return [folded[match.start():] for match in re.finditer(r'\S+', folded)]
+
+class ActivityPrefixIndex:
+    """
+    Sorted array of (key, position) over the folded name and every word
+    start of a user's activities. A lookup is one bisect plus a scan of
+    the matching keys; matches are ranked by frecency: usage count decayed
+    by the time since last use.
+    """
+    def __init__(self, activities, half_life_days=14):
+        merged = defaultdict(lambda: [0, None])
+        for name, count, last_used_at in activities:
+            usage = merged[name]
+            usage[0] += count
+            if last_used_at is not None and (usage[1] is None or last_used_at > usage[1]):
+                usage[1] = last_used_at
+        self.names = list(merged)
+        self.usage = [tuple(merged[name]) for name in self.names]
+        self.half_life = half_life_days * 86400
+        self.keys = sorted(
+            (key, position) for position, name in enumerate(self.names) for key in word_starts(name)
+        )
+
+    def score(self, position, at):
+        count, last_used_at = self.usage[position]
+        if last_used_at is None:
+            return 0.0
+        age = max((at - last_used_at).total_seconds(), 0)
+        return count * 0.5 ** (age / self.half_life)
+
+    def matches(self, prefix):
+        prefix = fold(prefix)
+        start = bisect_left(self.keys, (prefix,))
+        positions = set()
+        for key, position in self.keys[start:]:
+            if not key.startswith(prefix):
+                break
+            positions.add(position)
+        return positions
+
+    def suggest(self, prefix, limit, at=None):
+        at = at or now()
+        positions = self.matches(prefix) if prefix else range(len(self.names))
+        ranked = heapq.nlargest(
+            limit, positions, key=lambda position: (self.score(position, at), self.usage[position][1] or at, -position)
+        )
+        return [
+            {'name': self.names[position], 'usage_count': self.usage[position][0], 'last_used_at': self.usage[position][1]}
+            for position in ranked
+        ]
+
+ACTIVITY_SUGGESTIONS_SETTINGS = getattr(settings, 'ACTIVITY_SUGGESTIONS', {})
+
+# Per-process prefix indexes by user id. Writers in this process drop their
+# user's index on commit; other workers catch up within TTL seconds.
+activity_index_cache = TTLCache(
+    max_size=ACTIVITY_SUGGESTIONS_SETTINGS.get('MAX_SIZE', 10000),
+    max_ttl=ACTIVITY_SUGGESTIONS_SETTINGS.get('TTL', 300),
+)
+
+class ActivityDictionary:
+    """
+    Maintains the Activity rows behind ContextEntry.activity_ref and serves
+    autocomplete from cached prefix indexes. Call the write methods inside the
+    writer's transaction.
+    """
+    def __init__(self, activity_repo=None, index_cache=None):
+        self.activity_repo = activity_repo or ActivityRepository()
+        self.index_cache = index_cache or activity_index_cache
+
+    def record(self, user_id, uses, workspace_id=None):
+        # uses: iterable of (name, used_at). Returns {name: activity id}
+        merged = {}
+        for name, used_at in uses:
+            count, last_used_at = merged.get(name, (0, used_at))
+            merged[name] = (count + 1, max(last_used_at, used_at))
+        if not merged:
+            return {}
+        ids = self.activity_repo.record_uses(user_id, workspace_id, merged)
+        self.invalidate(user_id)
+        return ids
+
+    def release(self, user_id, names, workspace_id=None):
+        counts = Counter(names)
+        if counts:
+            self.activity_repo.release_uses(user_id, workspace_id, counts)
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id):
+        transaction.on_commit(lambda: self.index_cache.delete(user_id))
+
+    def get_index(self, user_id):
+        index = self.index_cache.get(user_id)
+        if index is None:
+            index = ActivityPrefixIndex(
+                self.activity_repo.get_user_activities(user_id),
+                ACTIVITY_SUGGESTIONS_SETTINGS.get('RECENCY_HALF_LIFE_DAYS', 14),
+            )
+            self.index_cache.set(user_id, index)
+        return index
+
+    def suggest(self, user_id, prefix, limit):
+        return self.get_index(user_id).suggest(prefix, limit)
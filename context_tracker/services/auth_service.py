@@ -1,27 +1,90 @@
 import jwt
 from django.conf import settings
 from ..repositories.api_key_repository import APIKeyRepository
+from ..repositories.user_repository import UserRepository
+from .caches import api_key_cache, token_cache
+from ..models import APIKey
 
 class AuthService:
     def __init__(self):
         self.api_key_repo = APIKeyRepository()
+        self.user_repo = UserRepository()
+
+    def resolve_api_key(self, api_key):
+        digest = APIKey.hash_key(api_key)
+        owner = api_key_cache.get(digest)
+        if owner is None:
+            owner = api_key_cache.set_owner(digest, self.api_key_owner(self.api_key_repo.get_api_key(api_key)))
+        return owner
+
+    async def aresolve_api_key(self, api_key):
+        digest = APIKey.hash_key(api_key)
+        owner = api_key_cache.get(digest)
+        if owner is None:
+            owner = api_key_cache.set_owner(digest, self.api_key_owner(await self.api_key_repo.aget_api_key(api_key)))
+        return owner
+
+    @staticmethod
+    def api_key_owner(record):
+        return record.user if record and record.user and record.user.is_active else None
+
+    def get_user(self, auth_result):
+        # Resolve the user behind a valid result, remembering it alongside a cached token
+        if auth_result.get('user') is not None:
+            return auth_result['user']
+        user = self.user_repo.get_active_user(auth_result.get('user_id'))
+        if user is not None and auth_result.get('token'):
+            token_cache.attach_user(auth_result['token'], user)
+        return user
+
+    async def aget_user(self, auth_result):
+        if auth_result.get('user') is not None:
+            return auth_result['user']
+        user = await self.user_repo.aget_active_user(auth_result.get('user_id'))
+        if user is not None and auth_result.get('token'):
+            token_cache.attach_user(auth_result['token'], user)
+        return user
 
     def validate_credentials(self, headers):
         auth_header = headers.get('Authorization')
         api_key = headers.get('X-API-KEY')
 
         if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            try:
-                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-                return {'is_valid': True, 'user_id': payload.get('user_id')}
-            except jwt.ExpiredSignatureError:
-                return {'is_valid': False, 'error': 'Unauthorized: Token has expired', 'status': 401}
-            except jwt.InvalidTokenError:
-                return {'is_valid': False, 'error': 'Unauthorized: Invalid token', 'status': 401}
+            return self.validate_token(auth_header.split(' ')[1])
+        elif api_key:
+            return self.api_key_result(self.resolve_api_key(api_key))
+        else:
+            return {'is_valid': False, 'error': 'Unauthorized: Missing credentials', 'status': 401}
+
+    async def avalidate_credentials(self, headers):
+        # Token checks never touch the database, so only the API-key lookup is awaited
+        auth_header = headers.get('Authorization')
+        api_key = headers.get('X-API-KEY')
+
+        if auth_header and auth_header.startswith('Bearer '):
+            return self.validate_token(auth_header.split(' ')[1])
         elif api_key:
-            if self.api_key_repo.get_api_key_by_user(api_key):
-                return {'is_valid': True}
-            return {'is_valid': False, 'error': 'Unauthorized: Invalid API key', 'status': 401}
+            return self.api_key_result(await self.aresolve_api_key(api_key))
         else:
-            return {'is_valid': False, 'error': 'Unauthorized: Missing credentials', 'status': 401}
\ No newline at end of file
+            return {'is_valid': False, 'error': 'Unauthorized: Missing credentials', 'status': 401}
+
+    def validate_token(self, token):
+        cached = token_cache.get_token(token)
+        if cached is not None:
+            return {'is_valid': True, 'user_id': cached['claims'].get('user_id'), 'user': cached['user'], 'token': token}
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+            if payload.get('token_type', 'access') != 'access':
+                return {'is_valid': False, 'error': 'Unauthorized: Invalid token', 'status': 401}
+            token_cache.set_token(token, payload)
+            return {'is_valid': True, 'user_id': payload.get('user_id'), 'user': None, 'token': token}
+        except jwt.ExpiredSignatureError:
+            return {'is_valid': False, 'error': 'Unauthorized: Token has expired', 'status': 401}
+        except jwt.InvalidTokenError:
+            return {'is_valid': False, 'error': 'Unauthorized: Invalid token', 'status': 401}
+
+    @staticmethod
+    def api_key_result(owner):
+        if owner['user_id'] is not None:
+            return {'is_valid': True, 'user_id': owner['user_id'], 'user': owner['user']}
+        return {'is_valid': False, 'error': 'Unauthorized: Invalid API key', 'status': 401}
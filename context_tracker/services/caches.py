@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU cache whose entries also expire at a fixed time.
+    Keeps hit/miss/eviction counters for diagnostics.
+    """
+    def __init__(self, max_size=10000, max_ttl=None, clock=time.time):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None, ttl=None):
+        if ttl is not None:
+            expires_at = self.clock() + ttl
+        if self.max_ttl is not None:
+            ceiling = self.clock() + self.max_ttl
+            expires_at = ceiling if expires_at is None else min(expires_at, ceiling)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            stale = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class VerifiedTokenCache(TTLCache):
+    """
+    Verified JWT claims (and, once resolved, the user) keyed by a digest of the raw token.
+    Entries live until the token's own `exp` claim, capped by MAX_TTL. Invalidation
+    only reaches this process; other workers catch up when MAX_TTL runs out.
+    """
+    def get_token(self, raw_token):
+        return self.get(token_digest(raw_token))
+
+    def set_token(self, raw_token, claims, user=None, validated_token=None):
+        value = {'claims': claims, 'user': user, 'validated_token': validated_token}
+        self.set(token_digest(raw_token), value, expires_at=claims.get('exp'))
+
+    def attach_user(self, raw_token, user):
+        cached = self.get(token_digest(raw_token))
+        if cached is not None:
+            cached['user'] = user
+
+    def invalidate_token(self, raw_token):
+        self.delete(token_digest(raw_token))
+
+    def invalidate_user(self, user_id):
+        return self.delete_where(lambda value: str(value['claims'].get('user_id')) == str(user_id))
+
+TOKEN_CACHE_SETTINGS = getattr(settings, 'TOKEN_CACHE', {})
+
+token_cache = VerifiedTokenCache(
+    max_size=TOKEN_CACHE_SETTINGS.get('MAX_SIZE', 10000),
+    max_ttl=TOKEN_CACHE_SETTINGS.get('MAX_TTL', 300),
+)
+
+class APIKeyCache(TTLCache):
+    """
+    Maps API-key digests to their owner. Unknown keys are cached too (with
+    user_id None) for a shorter time so repeated bad keys do not hit the database.
+    """
+    def __init__(self, ttl=300, negative_ttl=30, **kwargs):
+        super().__init__(**kwargs)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    def set_owner(self, digest, user):
+        value = {'user_id': user.id if user else None, 'user': user}
+        self.set(digest, value, ttl=self.ttl if user else self.negative_ttl)
+        return value
+
+    def invalidate_user(self, user_id):
+        return self.delete_where(lambda value: value['user_id'] == user_id)
+
+API_KEY_CACHE_SETTINGS = getattr(settings, 'API_KEY_CACHE', {})
+
+api_key_cache = APIKeyCache(
+    max_size=API_KEY_CACHE_SETTINGS.get('MAX_SIZE', 10000),
+    ttl=API_KEY_CACHE_SETTINGS.get('TTL', 300),
+    negative_ttl=API_KEY_CACHE_SETTINGS.get('NEGATIVE_TTL', 30),
+)
@@ -0,0 +1,22 @@
+from ..models import ContextChange
+from ..repositories.change_journal_repository import ChangeJournalRepository
+
+class ChangeJournal:
+    """
+    Records context-entry mutations in the per-user change journal. Call it
+    inside the writer's transaction so the journal commits with the change.
+    """
+    def __init__(self, journal_repo=None):
+        self.journal_repo = journal_repo or ChangeJournalRepository()
+
+    def record(self, user_id, upserted=(), deleted=()):
+        changes = [(entry.id, ContextChange.UPSERT) for entry in upserted if entry.id is not None]
+        changes += [(entry_id, ContextChange.DELETE) for entry_id in deleted]
+        if changes:
+            self.journal_repo.record(user_id, changes)
+
+    def changes_since(self, user_id, since, limit):
+        return self.journal_repo.get_changes_since(user_id, since, limit)
+
+    def last_seq(self, user_id):
+        return self.journal_repo.get_last_seq(user_id)
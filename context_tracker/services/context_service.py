@@ -1,5 +1,20 @@
+from ..models import ContextChange
 from ..repositories.context_entry_repository import ContextEntryRepository
-from datetime import datetime
+from .rollup_service import RollupService
+from .status_cache import StatusCache
+from .change_journal import ChangeJournal
+from .search_index import SearchIndex, search_terms
+from .activity_dictionary import ActivityDictionary
+from .events import CONTEXT_EVENTS_SETTINGS, ContextEventPublisher
+from .timeline import parse_bound, parse_timestamp, validate_batch_entry, clip_to_successors, trim_against
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from datetime import date, datetime
+import base64
+import copy
+import binascii
+import json
 
 class ServiceFactory:
     @staticmethod
@@ -8,38 +23,447 @@ class ServiceFactory:
 
     @staticmethod
     def get_context_service():
-        return ContextService(ServiceFactory.get_context_entry_repository())
+        return ContextService(
+            ServiceFactory.get_context_entry_repository(), RollupService(), StatusCache(),
+            ContextEventPublisher(), ChangeJournal(), SearchIndex(), ActivityDictionary()
+        )
+
+def encode_cursor(start_time, entry_id):
+    raw = json.dumps([start_time.isoformat(), entry_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        start_time, entry_id = json.loads(raw)
+        return datetime.fromisoformat(start_time), int(entry_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def status_record(entry):
+    return {
+        'entry_id': str(entry.id),
+        'user_id': entry.user_id,
+        'activity': entry.activity,
+        'note': entry.note,
+        'start_time': entry.start_time
+    }
+
+def serialize_entry_row(row):
+    # row is an (id, activity, note, start_time, end_time) tuple from the repository
+    entry_id, activity, note, start_time, end_time = row
+    return {
+        'id': str(entry_id),
+        'activity': activity,
+        'note': note,
+        'start_time': start_time,
+        'end_time': end_time
+    }
 
 class ContextService:
-    def __init__(self, context_entry_repo):
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    # Larger ranges are refused; /log/export/ streams any size
+    MAX_RANGE_ENTRIES = 10000
+    MAX_BATCH_SIZE = 10000
+    DEFAULT_SEARCH_LIMIT = 20
+    MAX_SEARCH_LIMIT = 100
+    DEFAULT_SUGGESTION_LIMIT = 10
+    MAX_SUGGESTION_LIMIT = 50
+    LONG_POLL_TIMEOUT = CONTEXT_EVENTS_SETTINGS.get('LONG_POLL_TIMEOUT', 25)
+    MAX_LONG_POLL_TIMEOUT = CONTEXT_EVENTS_SETTINGS.get('MAX_LONG_POLL_TIMEOUT', 60)
+
+    def __init__(self, context_entry_repo, rollup_service=None, status_cache=None, events=None, journal=None,
+                 search_index=None, activities=None):
         self.context_entry_repo = context_entry_repo
+        self.rollup_service = rollup_service or RollupService()
+        self.status_cache = status_cache or StatusCache()
+        self.events = events or ContextEventPublisher()
+        self.journal = journal or ChangeJournal()
+        self.search_index = search_index or SearchIndex()
+        self.activities = activities or ActivityDictionary()
 
     def log_context(self, user_id, activity, note):
-        # End any active contexts for the user
-        self.context_entry_repo.end_active_contexts(user_id)
-        # Create a new context entry
-        entry = self.context_entry_repo.create_context_entry(user_id, activity, note)
+        # End any active context and create the new entry atomically
+        with transaction.atomic():
+            entry, closed = self.context_entry_repo.switch_context(
+                user_id, activity, note,
+                resolve_activity=lambda switched_at: self.activities.record(user_id, [(activity, switched_at)])[activity]
+            )
+            self.rollup_service.record_closed(closed)
+            self.journal.record(user_id, upserted=closed + [entry])
+            self.search_index.record(upserted=[entry])
+            self.status_cache.replace(user_id, status_record(entry))
+            self.events.publish(user_id, 'ended', closed)
+            self.events.publish(user_id, 'created', [entry])
         return {'message': 'Context logged', 'entry_id': str(entry.id)}
 
+    def stop_user_context(self, user_id):
+        # End the active context, if any
+        with transaction.atomic():
+            self.context_entry_repo.lock_user_timeline(user_id)
+            stopped_at = now()
+            closed = self.context_entry_repo.close_active_contexts(user_id, stopped_at)
+            if not closed:
+                return {'message': 'No active context to stop', 'status': 400}
+            self.rollup_service.record_closed(closed)
+            self.journal.record(user_id, upserted=closed)
+            self.status_cache.replace(user_id, None)
+            self.events.publish(user_id, 'ended', closed)
+        return {'message': 'Context stopped'}
+
+    def get_user_status(self, user_id):
+        # Serve the active context from the status cache, reading through on a miss
+        hit, record = self.status_cache.get(user_id)
+        if not hit:
+            entry = self.context_entry_repo.get_active_context(user_id)
+            record = status_record(entry) if entry else None
+            self.status_cache.fill(user_id, record)
+        if record is None:
+            return {'message': 'No active context', 'status': 404}
+        return record
+
+    async def aget_user_status(self, user_id):
+        hit, record = await self.status_cache.aget(user_id)
+        if not hit:
+            entry = await self.context_entry_repo.aget_active_context(user_id)
+            record = status_record(entry) if entry else None
+            await self.status_cache.afill(user_id, record)
+        if record is None:
+            return {'message': 'No active context', 'status': 404}
+        return record
+
+    # Django has no async transactions, so the write paths run their sync,
+    # atomic versions in the ORM's thread
+    async def alog_context(self, user_id, activity, note):
+        return await sync_to_async(self.log_context)(user_id, activity, note)
+
+    async def astop_user_context(self, user_id):
+        return await sync_to_async(self.stop_user_context)(user_id)
+
+    async def aupdate_context(self, user_id, log_id, data):
+        return await sync_to_async(self.update_context)(user_id, log_id, data)
+
+    async def adelete_context(self, user_id, log_id):
+        return await sync_to_async(self.delete_context)(user_id, log_id)
+
     def get_user_contexts(self, user_id):
         # Retrieve all context entries for the user
-        entries = self.context_entry_repo.get_all_contexts(user_id)
-        return [
-            {
-                'id': str(entry.id),
-                'activity': entry.activity,
-                'note': entry.note,
-                'start_time': entry.start_time,
-                'end_time': entry.end_time
-            } for entry in entries
+        return [serialize_entry_row(row) for row in self.context_entry_repo.get_context_rows(user_id)]
+
+    def page_params(self, cursor, limit):
+        # Returns (limit, after, error)
+        try:
+            limit = int(limit) if limit is not None else self.DEFAULT_PAGE_SIZE
+        except (TypeError, ValueError):
+            return None, None, {'error': 'Invalid limit', 'status': 400}
+        if limit < 1:
+            return None, None, {'error': 'Invalid limit', 'status': 400}
+        limit = min(limit, self.MAX_PAGE_SIZE)
+
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                return None, None, {'error': 'Invalid cursor', 'status': 400}
+        return limit, after, None
+
+    def get_user_contexts_page(self, user_id, cursor=None, limit=None):
+        # Retrieve one keyset page of context entries, newest first
+        limit, after, error = self.page_params(cursor, limit)
+        if error:
+            return error
+        # Fetch one extra row to learn whether another page exists
+        rows = self.context_entry_repo.get_contexts_page(user_id, limit + 1, after=after)
+        return self.build_page(rows, limit)
+
+    async def aget_user_contexts_page(self, user_id, cursor=None, limit=None):
+        limit, after, error = self.page_params(cursor, limit)
+        if error:
+            return error
+        rows = await self.context_entry_repo.aget_contexts_page(user_id, limit + 1, after=after)
+        return self.build_page(rows, limit)
+
+    def build_page(self, rows, limit):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last_id, _, _, last_start, _ = rows[-1]
+            next_cursor = encode_cursor(last_start, last_id)
+        return {
+            'results': [serialize_entry_row(row) for row in rows],
+            'next_cursor': next_cursor
+        }
+
+    def range_params(self, date_from, date_to):
+        # Returns (start, end, error); dates cover whole days, `to` is exclusive
+        try:
+            start = parse_bound(date_from)
+            end = parse_bound(date_to, end=True)
+        except ValueError:
+            return None, None, {'error': 'Invalid range', 'status': 400}
+        if start is None:
+            return None, None, {'error': 'A range needs `from`', 'status': 400}
+        if end is not None and end <= start:
+            return None, None, {'error': '`to` must be after `from`', 'status': 400}
+        return start, end, None
+
+    def get_user_contexts_in_range(self, user_id, date_from, date_to=None):
+        """
+        Entries overlapping [from, to), oldest first, including one still open
+        when it started before `to`; a missing `to` means "until now".
+        """
+        start, end, error = self.range_params(date_from, date_to)
+        if error:
+            return error
+        rows = self.context_entry_repo.get_context_rows_in_range(user_id, start, end, limit=self.MAX_RANGE_ENTRIES + 1)
+        return self.build_range(rows)
+
+    async def aget_user_contexts_in_range(self, user_id, date_from, date_to=None):
+        start, end, error = self.range_params(date_from, date_to)
+        if error:
+            return error
+        rows = await self.context_entry_repo.aget_context_rows_in_range(
+            user_id, start, end, limit=self.MAX_RANGE_ENTRIES + 1
+        )
+        return self.build_range(rows)
+
+    def build_range(self, rows):
+        if len(rows) > self.MAX_RANGE_ENTRIES:
+            return {'error': f'More than {self.MAX_RANGE_ENTRIES} entries in range; narrow it or use /log/export/',
+                    'status': 400}
+        return {'results': [serialize_entry_row(row) for row in rows]}
+
+    def iter_user_contexts(self, user_id):
+        # Lazily yield every context entry for the user without materialising the history
+        for row in self.context_entry_repo.iter_contexts(user_id):
+            yield serialize_entry_row(row)
+
+    async def aiter_user_contexts(self, user_id):
+        async for row in self.context_entry_repo.aiter_contexts(user_id):
+            yield serialize_entry_row(row)
+
+    def ingest_contexts(self, user_id, items):
+        """
+        Write a batch of offline-buffered entries in one transaction.
+
+        Entries are validated in one pass, deduplicated by idempotency key and
+        clipped so they overlap neither each other nor the existing timeline.
+        An open entry older than the batch is closed where the batch begins.
+        """
+        if not isinstance(items, list):
+            return {'error': 'Expected a list of entries', 'status': 400}
+        if len(items) > self.MAX_BATCH_SIZE:
+            return {'error': f'Batch too large (max {self.MAX_BATCH_SIZE} entries)', 'status': 400}
+
+        results = [None] * len(items)
+        pending = []
+        seen_keys = set()
+        for index, item in enumerate(items):
+            entry, error = validate_batch_entry(item)
+            if error:
+                key = item.get('idempotency_key') if isinstance(item, dict) else None
+                results[index] = {'idempotency_key': key, 'status': 'invalid', 'error': error}
+            elif entry['idempotency_key'] in seen_keys:
+                results[index] = {'idempotency_key': entry['idempotency_key'], 'status': 'duplicate'}
+            else:
+                seen_keys.add(entry['idempotency_key'])
+                pending.append((index, entry))
+
+        try:
+            with transaction.atomic():
+                self.context_entry_repo.lock_user_timeline(user_id)
+                existing_keys = self.context_entry_repo.get_existing_idempotency_keys(user_id, seen_keys)
+                fresh = []
+                for index, entry in pending:
+                    if entry['idempotency_key'] in existing_keys:
+                        results[index] = {'idempotency_key': entry['idempotency_key'], 'status': 'duplicate'}
+                    else:
+                        fresh.append((index, entry))
+
+                fresh.sort(key=lambda pair: pair[1]['start_time'])
+                clip_to_successors([entry for _, entry in fresh])
+                to_create, closed = self._resolve_against_timeline(user_id, fresh, results)
+                activity_ids = self.activities.record(
+                    user_id, [(entry['activity'], entry['start_time']) for _, entry in to_create]
+                )
+                for _, entry in to_create:
+                    entry['activity_ref_id'] = activity_ids[entry['activity']]
+                created = self.context_entry_repo.bulk_create_contexts(
+                    user_id, [entry for _, entry in to_create]
+                )
+                self.rollup_service.record_closed(closed + created)
+                self.journal.record(user_id, upserted=closed + created)
+                self.search_index.record(upserted=created)
+                self.status_cache.invalidate(user_id)
+                self.events.publish(user_id, 'ended', closed)
+                self.events.publish(user_id, 'created', created)
+        except IntegrityError:
+            return {'error': 'Conflicting concurrent write, retry the batch', 'status': 409}
+
+        for (index, entry), instance in zip(to_create, created):
+            results[index] = {
+                'idempotency_key': entry['idempotency_key'],
+                'status': 'created',
+                'entry_id': str(instance.id) if instance.id is not None else None
+            }
+        return {'message': 'Batch ingested', 'created': len(created), 'results': results}
+
+    def _resolve_against_timeline(self, user_id, fresh, results):
+        if not fresh:
+            return [], []
+        window_start = fresh[0][1]['start_time']
+        closed = []
+        active = self.context_entry_repo.get_active_context(user_id)
+        if active and active.start_time < window_start:
+            # The offline switch happened after the open entry started, so it ends there
+            self.context_entry_repo.close_context(active.id, window_start)
+            active.end_time = window_start
+            closed.append(active)
+
+        starts, ends = [], []
+        for existing in self.context_entry_repo.get_contexts_in_range(user_id, window_start):
+            starts.append(existing.start_time)
+            ends.append(existing.end_time)
+
+        to_create = []
+        for index, entry in fresh:
+            if trim_against(entry, starts, ends):
+                to_create.append((index, entry))
+            else:
+                results[index] = {
+                    'idempotency_key': entry['idempotency_key'],
+                    'status': 'skipped',
+                    'error': 'Overlaps other entries'
+                }
+        return to_create, closed
+
+    def get_user_changes(self, user_id, since=None, limit=None):
+        """
+        Delta sync from the change journal: what changed after sequence number
+        `since`, one item per entry carrying its current state or a tombstone.
+        Clients store `next_since` and pass it on the next call.
+        """
+        try:
+            since = int(since) if since not in (None, '') else 0
+            limit = int(limit) if limit not in (None, '') else self.MAX_PAGE_SIZE
+        except (TypeError, ValueError):
+            return {'error': 'Invalid since or limit', 'status': 400}
+        if since < 0 or limit < 1:
+            return {'error': 'Invalid since or limit', 'status': 400}
+        limit = min(limit, self.MAX_PAGE_SIZE)
+
+        rows = self.journal.changes_since(user_id, since, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not rows:
+            # A position past the journal's end comes from another database; start over
+            last_seq = self.journal.last_seq(user_id)
+            reset = since > last_seq
+            return {'changes': [], 'next_since': last_seq if reset else since, 'has_more': False, 'reset': reset}
+
+        # Only the latest change per entry matters within a page
+        latest = {}
+        for row in rows:
+            latest.pop(row['entry_id'], None)
+            latest[row['entry_id']] = row
+        upserted = [entry_id for entry_id, row in latest.items() if row['operation'] == ContextChange.UPSERT]
+        entries = {row[0]: row for row in self.context_entry_repo.get_contexts_by_ids(user_id, upserted)}
+
+        changes = []
+        for entry_id, row in latest.items():
+            entry = entries.get(entry_id)
+            if entry is None:
+                changes.append({'seq': row['seq'], 'operation': ContextChange.DELETE, 'id': str(entry_id)})
+            else:
+                changes.append({'seq': row['seq'], 'operation': ContextChange.UPSERT, 'entry': serialize_entry_row(entry)})
+        return {'changes': changes, 'next_since': rows[-1]['seq'], 'has_more': has_more, 'reset': False}
+
+    def parse_event_position(self, after, timeout):
+        # Returns (after, timeout, error); timeout is clamped to MAX_LONG_POLL_TIMEOUT
+        try:
+            after = int(after) if after not in (None, '') else None
+            timeout = float(timeout) if timeout not in (None, '') else self.LONG_POLL_TIMEOUT
+        except (TypeError, ValueError):
+            return None, None, {'error': 'Invalid event position or timeout', 'status': 400}
+        return after, min(max(timeout, 0), self.MAX_LONG_POLL_TIMEOUT), None
+
+    def wait_for_events(self, user_id, after=None, timeout=None):
+        # Long-poll: context changes after `after`, waiting up to `timeout` seconds for the first one
+        after, timeout, error = self.parse_event_position(after, timeout)
+        if error:
+            return error
+        return self.events.broker.wait(user_id, after, timeout)
+
+    async def await_events(self, user_id, after=None, timeout=None):
+        after, timeout, error = self.parse_event_position(after, timeout)
+        if error:
+            return error
+        return await self.events.broker.await_events(user_id, after, timeout)
+
+    def search_user_contexts(self, user_id, query, limit=None, offset=None):
+        # Ranked full-text matches on activity and note, paginated by offset
+        try:
+            limit = int(limit) if limit not in (None, '') else self.DEFAULT_SEARCH_LIMIT
+            offset = int(offset) if offset not in (None, '') else 0
+        except (TypeError, ValueError):
+            return {'error': 'Invalid limit or offset', 'status': 400}
+        if limit < 1 or offset < 0:
+            return {'error': 'Invalid limit or offset', 'status': 400}
+        if not search_terms(query):
+            return {'error': 'Search needs `q`', 'status': 400}
+        limit = min(limit, self.MAX_SEARCH_LIMIT)
+
+        hits = self.search_index.search(user_id, query, limit + 1, offset)
+        has_more = len(hits) > limit
+        hits = hits[:limit]
+        rows = {row[0]: row for row in self.context_entry_repo.get_contexts_by_ids(user_id, [entry_id for entry_id, _ in hits])}
+        results = [
+            {**serialize_entry_row(rows[entry_id]), 'score': score}
+            for entry_id, score in hits if entry_id in rows
         ]
+        return {'results': results, 'next_offset': offset + limit if has_more else None}
+
+    def suggest_activities(self, user_id, prefix=None, limit=None):
+        # Autocomplete from the user's cached activity index; no query on a warm cache
+        try:
+            limit = int(limit) if limit not in (None, '') else self.DEFAULT_SUGGESTION_LIMIT
+        except (TypeError, ValueError):
+            return {'error': 'Invalid limit', 'status': 400}
+        if limit < 1:
+            return {'error': 'Invalid limit', 'status': 400}
+        limit = min(limit, self.MAX_SUGGESTION_LIMIT)
+        return {'results': self.activities.suggest(user_id, prefix or '', limit)}
+
+    def get_user_stats(self, user_id, date_from=None, date_to=None, workspace_id=None):
+        # Per-day, per-activity totals served from the rollup table only
+        try:
+            date_from = date.fromisoformat(date_from) if date_from else None
+            date_to = date.fromisoformat(date_to) if date_to else None
+            workspace_id = int(workspace_id) if workspace_id else None
+        except ValueError:
+            return {'error': 'Invalid stats filter', 'status': 400}
+        days = self.rollup_service.get_daily_stats(user_id, date_from, date_to, workspace_id)
+        return {'days': days}
 
     def delete_context(self, user_id, log_id):
         # Delete a specific context entry
         entry = self.context_entry_repo.get_context_by_id_and_user(log_id, user_id)
         if entry:
-            entry.delete()
-            return {'message': 'Log entry deleted successfully'}
+            # Start the transaction with the write so SQLite takes its lock up front;
+            # the row lock (a no-op on SQLite) serialises rollup writes with the other writers
+            with transaction.atomic():
+                self.context_entry_repo.lock_user_timeline(user_id)
+                if self.context_entry_repo.delete_context_entry(log_id, user_id):
+                    self.rollup_service.retract([entry])
+                    self.journal.record(user_id, deleted=[entry.id])
+                    self.search_index.record(deleted=[entry.id])
+                    self.activities.release(user_id, [entry.activity], entry.workspace_id)
+                    self.status_cache.invalidate(user_id)
+                    self.events.deleted(user_id, log_id)
+                    return {'message': 'Log entry deleted successfully'}
         return {'error': 'Log entry not found'}
 
     def update_context(self, user_id, log_id, data):
@@ -47,6 +471,7 @@ class ContextService:
         entry = self.context_entry_repo.get_context_by_id_and_user(log_id, user_id)
         if not entry:
             return {'error': 'Log entry not found'}
+        previous = copy.copy(entry)
 
         entry.activity = data.get('activity', entry.activity)
         entry.note = data.get('note', entry.note)
@@ -56,25 +481,29 @@ class ContextService:
 
         if start_time:
             try:
-                if start_time.endswith('Z'):
-                    start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                else:
-                    start_time = datetime.fromisoformat(start_time)
-                entry.start_time = start_time
+                entry.start_time = parse_timestamp(start_time)
             except ValueError:
                 pass
 
         if end_time:
             try:
-                if end_time.endswith('Z'):
-                    end_time = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                else:
-                    end_time = datetime.fromisoformat(end_time)
-                entry.end_time = end_time
+                entry.end_time = parse_timestamp(end_time)
             except ValueError:
                 pass
 
-        entry.save()
+        with transaction.atomic():
+            self.context_entry_repo.lock_user_timeline(user_id)
+            if entry.activity != previous.activity:
+                self.activities.release(user_id, [previous.activity], entry.workspace_id)
+                activity_ids = self.activities.record(user_id, [(entry.activity, entry.start_time)], entry.workspace_id)
+                entry.activity_ref_id = activity_ids[entry.activity]
+            entry.save()
+            # Swap the entry's old contribution to the daily rollups for its new one
+            self.rollup_service.replace(previous, entry)
+            self.journal.record(user_id, upserted=[entry])
+            self.search_index.record(upserted=[entry])
+            self.status_cache.invalidate(user_id)
+            self.events.publish(user_id, 'updated', [entry])
         return {'message': 'Log entry updated successfully'}
 
 context_service = ServiceFactory.get_context_service()
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+EVENT_TYPES = ('created', 'ended', 'updated', 'deleted')
+
+def entry_payload(entry):
+    return {
+        'id': str(entry.id) if entry.id is not None else None,
+        'activity': entry.activity,
+        'note': entry.note,
+        'start_time': entry.start_time,
+        'end_time': entry.end_time
+    }
+
+class EventBroker(ABC):
+    """
+    Per-user channel of context changes. Each published event gets an `id`
+    that increases within the broker; readers ask for events after the last
+    id they saw. `reset` tells a reader that events it missed are gone and
+    it should reload its state instead.
+    """
+    @abstractmethod
+    def publish(self, user_id, events):
+        pass
+
+    @abstractmethod
+    def events_after(self, user_id, after):
+        pass
+
+    @abstractmethod
+    def wait(self, user_id, after, timeout):
+        pass
+
+    @abstractmethod
+    async def await_events(self, user_id, after, timeout):
+        pass
+
+class InProcessBroker(EventBroker):
+    """
+    Broker for a single process: keeps the last `buffer_size` events per user
+    in memory and wakes waiting threads and event loops on publish. Buffers of
+    at most `max_users` users are kept, least recently published evicted
+    first; readers behind an evicted buffer get a reset. Deployments with
+    several workers need a shared broker implementing EventBroker.
+    """
+    def __init__(self, buffer_size=100, max_users=10000, clock=time.monotonic):
+        self.buffer_size = buffer_size
+        self.max_users = max_users
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._sequence = 0
+        # user_id -> [events, id of the newest event dropped from them]
+        self._buffers = OrderedDict()
+        # Newest event id in any evicted buffer; older positions cannot be served
+        self._evicted_through = 0
+        self._waiters = {}
+
+    def publish(self, user_id, events):
+        with self._condition:
+            if user_id not in self._buffers:
+                self._buffers[user_id] = [deque(), self._evicted_through]
+            self._buffers.move_to_end(user_id)
+            buffer = self._buffers[user_id]
+            for event in events:
+                self._sequence += 1
+                buffer[0].append({'id': self._sequence, **event})
+                if len(buffer[0]) > self.buffer_size:
+                    buffer[1] = buffer[0].popleft()['id']
+            while len(self._buffers) > self.max_users:
+                _, (evicted, dropped_through) = self._buffers.popitem(last=False)
+                self._evicted_through = max(self._evicted_through, evicted[-1]['id'] if evicted else dropped_through)
+            self._condition.notify_all()
+            waiters = list(self._waiters.get(user_id, ()))
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+
+    def events_after(self, user_id, after):
+        with self._condition:
+            return self._collect(user_id, after)
+
+    def _collect(self, user_id, after):
+        # Caller holds the lock. A missing `after` starts the reader at the current position.
+        if after is None:
+            return {'events': [], 'last_event_id': self._sequence, 'reset': False}
+        buffer, dropped_through = self._buffers.get(user_id, ((), self._evicted_through))
+        if after > self._sequence or after < dropped_through:
+            return {'events': [], 'last_event_id': self._sequence, 'reset': True}
+        events = [event for event in buffer if event['id'] > after]
+        return {'events': events, 'last_event_id': events[-1]['id'] if events else after, 'reset': False}
+
+    def wait(self, user_id, after, timeout):
+        deadline = self.clock() + timeout
+        with self._condition:
+            while True:
+                result = self._collect(user_id, after)
+                remaining = deadline - self.clock()
+                if result['events'] or result['reset'] or after is None or remaining <= 0:
+                    return result
+                self._condition.wait(remaining)
+
+    async def await_events(self, user_id, after, timeout):
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        waiter = (loop, ready)
+        with self._condition:
+            self._waiters.setdefault(user_id, set()).add(waiter)
+        try:
+            deadline = self.clock() + timeout
+            while True:
+                ready.clear()
+                result = self.events_after(user_id, after)
+                remaining = deadline - self.clock()
+                if result['events'] or result['reset'] or after is None or remaining <= 0:
+                    return result
+                try:
+                    await asyncio.wait_for(ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                waiters = self._waiters.get(user_id)
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[user_id]
+
+class ContextEventPublisher:
+    """
+    Publishes context changes to the broker once the surrounding transaction
+    commits, so subscribers never hear about writes that were rolled back.
+    """
+    def __init__(self, broker=None):
+        self._broker = broker
+
+    @property
+    def broker(self):
+        return self._broker or event_broker
+
+    def publish(self, user_id, event_type, entries):
+        events = [{'type': event_type, 'entry': entry_payload(entry)} for entry in entries]
+        if events:
+            transaction.on_commit(lambda: self.broker.publish(user_id, events))
+
+    def deleted(self, user_id, entry_id):
+        events = [{'type': 'deleted', 'entry': {'id': str(entry_id)}}]
+        transaction.on_commit(lambda: self.broker.publish(user_id, events))
+
+CONTEXT_EVENTS_SETTINGS = getattr(settings, 'CONTEXT_EVENTS', {})
+
+event_broker = import_string(
+    CONTEXT_EVENTS_SETTINGS.get('BROKER', 'context_tracker.services.events.InProcessBroker')
+)(**CONTEXT_EVENTS_SETTINGS.get('OPTIONS', {}))
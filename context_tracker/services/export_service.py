@@ -0,0 +1,195 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from ..renderers import dumps
+from ..repositories.context_entry_repository import ContextEntryRepository
+from ..repositories.workspace_repository import WorkspaceRepository
+from .timeline import parse_bound
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional; Parquet and Arrow exports are unavailable without it
+    pyarrow = None
+
+EXPORT_COLUMNS = ('id', 'user_id', 'workspace_id', 'activity', 'note', 'start_time', 'end_time')
+
+def csv_chunks(rows, chunk_rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def ndjson_chunks(rows, chunk_rows):
+    lines = []
+    for row in rows:
+        lines.append(dumps(dict(zip(EXPORT_COLUMNS, row))))
+        if len(lines) >= chunk_rows:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
+
+class ArrowSink:
+    """
+    Write-only file object for pyarrow writers. Bytes are handed out with
+    drain() as they are written, while tell() keeps counting from the start
+    of the file, as Parquet's footer offsets require.
+    """
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def arrow_schema():
+    return pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('user_id', pyarrow.int64()),
+        ('workspace_id', pyarrow.int64()),
+        ('activity', pyarrow.string()),
+        ('note', pyarrow.string()),
+        ('start_time', pyarrow.timestamp('us', tz='UTC')),
+        ('end_time', pyarrow.timestamp('us', tz='UTC')),
+    ])
+
+def arrow_batches(rows, chunk_rows, schema):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield pyarrow.record_batch([list(column) for column in zip(*batch)], schema=schema)
+            batch = []
+    if batch:
+        yield pyarrow.record_batch([list(column) for column in zip(*batch)], schema=schema)
+
+def parquet_chunks(rows, chunk_rows):
+    # One row group per chunk of rows
+    schema = arrow_schema()
+    sink = ArrowSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for batch in arrow_batches(rows, chunk_rows, schema):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def arrow_chunks(rows, chunk_rows):
+    # Arrow IPC stream format
+    schema = arrow_schema()
+    sink = ArrowSink()
+    writer = pyarrow.ipc.new_stream(sink, schema)
+    for batch in arrow_batches(rows, chunk_rows, schema):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+class ExportFormat:
+    def __init__(self, writer, content_type, extension, requires_pyarrow=False):
+        self.writer = writer
+        self.content_type = content_type
+        self.extension = extension
+        self.requires_pyarrow = requires_pyarrow
+
+EXPORT_FORMATS = {
+    'csv': ExportFormat(csv_chunks, 'text/csv', 'csv'),
+    'ndjson': ExportFormat(ndjson_chunks, 'application/x-ndjson', 'ndjson'),
+    'parquet': ExportFormat(parquet_chunks, 'application/vnd.apache.parquet', 'parquet', requires_pyarrow=True),
+    'arrow': ExportFormat(arrow_chunks, 'application/vnd.apache.arrow.stream', 'arrows', requires_pyarrow=True),
+}
+
+class ExportService:
+    """
+    Streams a user's or workspace's timeline as CSV, NDJSON, Parquet or Arrow.
+    Rows are read from a chunked server-side cursor and encoded chunk by
+    chunk, so memory use does not grow with the size of the timeline.
+    """
+    CHUNK_ROWS = 2000
+
+    def __init__(self, context_entry_repo=None, workspace_repo=None):
+        self.context_entry_repo = context_entry_repo or ContextEntryRepository()
+        self.workspace_repo = workspace_repo or WorkspaceRepository()
+
+    def export(self, export_format, user_id=None, workspace_id=None, date_from=None, date_to=None,
+               compress=False, requested_by=None):
+        """
+        Returns {'chunks', 'content_type', 'filename'}, or an error dict. With
+        `requested_by`, workspace exports are limited to the workspace's owner
+        and members; without it (management command) any timeline can be read.
+        """
+        spec = EXPORT_FORMATS.get(export_format)
+        if spec is None:
+            return {'error': f"Unknown export format (choose from {', '.join(EXPORT_FORMATS)})", 'status': 400}
+        if spec.requires_pyarrow and pyarrow is None:
+            return {'error': f'{export_format} export requires pyarrow', 'status': 400}
+        try:
+            start = parse_bound(date_from)
+            end = parse_bound(date_to, end=True)
+            workspace_id = int(workspace_id) if workspace_id not in (None, '') else None
+        except ValueError:
+            return {'error': 'Invalid export filter', 'status': 400}
+        if workspace_id is None and user_id is None:
+            return {'error': 'A user or workspace is required', 'status': 400}
+
+        if workspace_id is not None:
+            if requested_by is not None and not self.workspace_repo.user_can_access(workspace_id, requested_by):
+                return {'error': 'Workspace not found', 'status': 404}
+            rows = self.context_entry_repo.iter_export_rows(
+                workspace_id=workspace_id, start=start, end=end, chunk_size=self.CHUNK_ROWS
+            )
+            filename = f'workspace-{workspace_id}-timeline.{spec.extension}'
+        else:
+            rows = self.context_entry_repo.iter_export_rows(
+                user_id=user_id, start=start, end=end, chunk_size=self.CHUNK_ROWS
+            )
+            filename = f'user-{user_id}-timeline.{spec.extension}'
+
+        chunks = spec.writer(rows, self.CHUNK_ROWS)
+        content_type = spec.content_type
+        if compress:
+            chunks = gzip_chunks(chunks)
+            content_type = 'application/gzip'
+            filename += '.gz'
+        return {'chunks': chunks, 'content_type': content_type, 'filename': filename}
+
+export_service = ExportService()
@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+class HashingPoolBusy(Exception):
+    """
+    The pool already holds its maximum of pending hashes, or one did not
+    finish in time; the caller should answer 503.
+    """
+
+def verify(password, encoded):
+    # (matches, needs rehash with the preferred hasher); check_password calls the setter in that case
+    outdated = []
+    matches = check_password(password, encoded, setter=outdated.append)
+    return matches, bool(outdated)
+
+class PasswordHashingPool:
+    """
+    Runs password hashing on a fixed number of worker threads (hashlib's
+    PBKDF2 releases the GIL) so a burst of logins cannot take every CPU from
+    the rest of the API. At most `max_pending` hashes may be queued or running;
+    beyond that calls fail immediately with HashingPoolBusy rather than
+    queueing behind the burst. Only hashing runs in the pool; database access
+    stays on the request thread.
+    """
+    def __init__(self, workers=2, max_pending=16, timeout=5.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolBusy
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingPoolBusy
+
+    def verify(self, password, encoded):
+        return self.run(verify, password, encoded)
+
+    def make_password(self, password):
+        return self.run(make_password, password)
+
+PASSWORD_HASHING_SETTINGS = getattr(settings, 'PASSWORD_HASHING', {})
+
+password_pool = PasswordHashingPool(
+    workers=PASSWORD_HASHING_SETTINGS.get('WORKERS', 2),
+    max_pending=PASSWORD_HASHING_SETTINGS.get('MAX_PENDING', 16),
+    timeout=PASSWORD_HASHING_SETTINGS.get('TIMEOUT', 5.0),
+)
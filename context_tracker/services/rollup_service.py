@@ -0,0 +1,93 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from ..repositories.rollup_repository import RollupRepository
+
+class LocalDays:
+    """
+    Local-midnight boundaries for split_by_day, remembered between calls.
+    Entries of one batch mostly fall on the same few days, so most splits
+    need no timezone conversion.
+    """
+    def __init__(self):
+        self.day = None
+
+    def find(self, moment):
+        # (local date, start, next midnight) of the day containing `moment`
+        day = self.day
+        if day is None or not day[1] <= moment < day[2]:
+            local = timezone.localtime(moment)
+            start = timezone.make_aware(datetime.combine(local.date(), time.min), local.tzinfo)
+            end = timezone.make_aware(datetime.combine(local.date() + timedelta(days=1), time.min), local.tzinfo)
+            day = self.day = (local.date(), start, end)
+        return day
+
+def split_by_day(start_time, end_time, days=None):
+    # Split [start_time, end_time) at local midnights into (date, seconds) segments
+    days = days or LocalDays()
+    start = start_time
+    segments = []
+    while start < end_time:
+        date, _, next_midnight = days.find(start)
+        segment_end = min(end_time, next_midnight)
+        segments.append((date, round((segment_end - start).total_seconds())))
+        start = segment_end
+    return segments
+
+def entry_contributions(entry, sign=1, days=None):
+    # {(user_id, workspace_id): {(date, activity): (seconds, count)}} for a closed entry
+    contributions = defaultdict(dict)
+    if entry.user_id is None or entry.end_time is None or entry.end_time <= entry.start_time:
+        return contributions
+    for date, seconds in split_by_day(entry.start_time, entry.end_time, days):
+        contributions[(entry.user_id, entry.workspace_id)][(date, entry.activity)] = (sign * seconds, sign)
+    return contributions
+
+class RollupService:
+    def __init__(self, rollup_repo=None):
+        self.rollup_repo = rollup_repo or RollupRepository()
+
+    def record_closed(self, entries):
+        self._apply([(entry, 1) for entry in entries])
+
+    def retract(self, entries):
+        self._apply([(entry, -1) for entry in entries])
+
+    def replace(self, previous, current):
+        # Net out an edited entry's old and new contributions
+        self._apply([(previous, -1), (current, 1)])
+
+    def _apply(self, signed_entries):
+        merged = defaultdict(lambda: defaultdict(lambda: (0, 0)))
+        days = LocalDays()
+        for entry, sign in signed_entries:
+            for owner, deltas in entry_contributions(entry, sign, days).items():
+                for key, (seconds, count) in deltas.items():
+                    total_seconds, total_count = merged[owner][key]
+                    merged[owner][key] = (total_seconds + seconds, total_count + count)
+        for (user_id, workspace_id), deltas in merged.items():
+            changed = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+            if changed:
+                self.rollup_repo.apply_deltas(user_id, workspace_id, changed)
+
+    def rebuild(self, entries, user_id=None, chunk_size=5000):
+        # Recompute rollups from scratch; entries is an iterator over closed ContextEntry rows
+        self.rollup_repo.delete_rollups(user_id)
+        totals = defaultdict(lambda: [0, 0])
+        days = LocalDays()
+        for entry in entries:
+            for (owner_id, workspace_id), deltas in entry_contributions(entry, days=days).items():
+                for (date, activity), (seconds, count) in deltas.items():
+                    total = totals[(owner_id, workspace_id, date, activity)]
+                    total[0] += seconds
+                    total[1] += count
+        rollups = [
+            {'user_id': owner_id, 'workspace_id': workspace_id, 'date': date, 'activity': activity,
+             'total_seconds': seconds, 'entry_count': count}
+            for (owner_id, workspace_id, date, activity), (seconds, count) in totals.items()
+        ]
+        self.rollup_repo.bulk_create_rollups(rollups, batch_size=chunk_size)
+        return len(rollups)
+
+    def get_daily_stats(self, user_id, date_from=None, date_to=None, workspace_id=None):
+        return list(self.rollup_repo.get_rollups(user_id, date_from, date_to, workspace_id))
@@ -0,0 +1,40 @@
+from itertools import islice
+from ..repositories.search_repository import get_search_repository, search_terms
+
+class SearchIndex:
+    """
+    Keeps the full-text index over activity and note in step with the
+    timeline. Call it inside the writer's transaction so the index commits
+    with the change.
+    """
+    def __init__(self, search_repo=None):
+        self._search_repo = search_repo
+
+    @property
+    def search_repo(self):
+        # Resolved per call, so the backend follows the database in use
+        return self._search_repo or get_search_repository()
+
+    def record(self, upserted=(), deleted=()):
+        if upserted:
+            self.search_repo.index(upserted)
+        if deleted:
+            self.search_repo.remove(deleted)
+
+    def rebuild(self, entries, chunk_size=2000):
+        # Replace the whole index with `entries`; run it inside a transaction
+        search_repo = self.search_repo
+        search_repo.clear()
+        entries = iter(entries)
+        count = 0
+        while chunk := list(islice(entries, chunk_size)):
+            search_repo.index(chunk)
+            count += len(chunk)
+        return count
+
+    def search(self, user_id, query, limit, offset=0):
+        # Returns (entry_id, score) pairs, best match first; empty for a query without words
+        terms = search_terms(query)
+        if not terms:
+            return []
+        return self.search_repo.search(user_id, terms, limit, offset)
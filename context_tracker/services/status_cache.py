@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+class StatusCache:
+    """
+    Read-through cache of each user's active-context record, stored in a
+    Django cache backend (locmem by default, Redis-compatible when configured).
+
+    Writers drop the key straight away and refresh it once their transaction
+    commits, so readers never see uncommitted state. Readers fill a miss only
+    if the key is still absent, so a stale read cannot replace a newer record.
+    """
+    KEY_PREFIX = 'context-status'
+
+    def __init__(self, alias='default', timeout=None):
+        self.alias = alias
+        self.timeout = timeout if timeout is not None else getattr(settings, 'STATUS_CACHE_TIMEOUT', 300)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, user_id):
+        return f'{self.KEY_PREFIX}:{user_id}'
+
+    def get(self, user_id):
+        # Returns (hit, record); a record of None means "no active context"
+        cached = self.cache.get(self.key(user_id))
+        if cached is None:
+            return False, None
+        return True, cached['entry']
+
+    async def aget(self, user_id):
+        cached = await self.cache.aget(self.key(user_id))
+        if cached is None:
+            return False, None
+        return True, cached['entry']
+
+    def fill(self, user_id, record):
+        # A writer's on-commit set() between the reader's query and this fill wins
+        self.cache.add(self.key(user_id), {'entry': record}, self.timeout)
+
+    async def afill(self, user_id, record):
+        await self.cache.aadd(self.key(user_id), {'entry': record}, self.timeout)
+
+    def set(self, user_id, record):
+        self.cache.set(self.key(user_id), {'entry': record}, self.timeout)
+
+    def invalidate(self, user_id):
+        self.cache.delete(self.key(user_id))
+        transaction.on_commit(lambda: self.cache.delete(self.key(user_id)))
+
+    def replace(self, user_id, record):
+        self.cache.delete(self.key(user_id))
+        transaction.on_commit(lambda: self.set(user_id, record))
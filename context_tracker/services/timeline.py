@@ -0,0 +1,90 @@
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+
+ACTIVITY_MAX_LENGTH = 255
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+def parse_timestamp(value):
+    # Accept ISO 8601 strings (including a trailing 'Z') or datetimes; naive values are taken as UTC
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        parsed = datetime.fromisoformat(value)
+    else:
+        raise ValueError('Invalid timestamp')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def parse_bound(value, end=False):
+    # Dates cover the whole day, so an end date is exclusive from the following midnight
+    if not value:
+        return None
+    if len(value) == 10:
+        day = date.fromisoformat(value)
+        return datetime.combine(day + timedelta(days=1) if end else day, time.min, tzinfo=timezone.utc)
+    return parse_timestamp(value)
+
+def validate_batch_entry(item):
+    # Returns (entry, error); entry holds the normalised fields of a valid item
+    if not isinstance(item, dict):
+        return None, 'Entry must be an object'
+
+    key = item.get('idempotency_key') or item.get('idempotencyKey')
+    if not isinstance(key, str) or not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return None, 'idempotency_key is required (max 64 characters)'
+
+    activity = item.get('activity')
+    if not isinstance(activity, str) or not activity or len(activity) > ACTIVITY_MAX_LENGTH:
+        return None, 'activity is required (max 255 characters)'
+
+    note = item.get('note', '')
+    if note is not None and not isinstance(note, str):
+        return None, 'note must be a string'
+
+    start_time = item.get('start_time') or item.get('startTime')
+    end_time = item.get('end_time') or item.get('endTime')
+    if not start_time:
+        return None, 'start_time is required'
+    try:
+        start_time = parse_timestamp(start_time)
+        end_time = parse_timestamp(end_time) if end_time else None
+    except ValueError:
+        return None, 'Invalid timestamp'
+    if end_time is not None and end_time <= start_time:
+        return None, 'end_time must be after start_time'
+
+    return {
+        'idempotency_key': key,
+        'activity': activity,
+        'note': note,
+        'start_time': start_time,
+        'end_time': end_time,
+    }, None
+
+def clip_to_successors(entries):
+    # Entries sorted by start_time; each one ends no later than the next one starts
+    for current, following in zip(entries, entries[1:]):
+        if current['end_time'] is None or current['end_time'] > following['start_time']:
+            current['end_time'] = following['start_time']
+
+def trim_against(entry, starts, ends):
+    # Shrink [start, end) so it does not overlap the fixed, start-sorted intervals.
+    # An end of None means the interval is still open. Returns False if nothing is left.
+    start, end = entry['start_time'], entry['end_time']
+    index = bisect_right(starts, start) - 1
+    index = max(index, 0)
+    while index < len(starts) and starts[index] <= start:
+        if ends[index] is None or ends[index] > start:
+            if ends[index] is None:
+                return False
+            start = ends[index]
+        index += 1
+    if index < len(starts) and (end is None or starts[index] < end):
+        end = starts[index]
+    if end is not None and end <= start:
+        return False
+    entry['start_time'], entry['end_time'] = start, end
+    return True
@@ -1,8 +1,38 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.utils import timezone
+from ..repositories.user_repository import UserRepository
 from ..repositories.workspace_repository import WorkspaceRepository
+from .events import entry_payload
+from .rollup_service import split_by_day
+
+def running_seconds_on(entry, day, current_time):
+    # Seconds an open entry has run so far on `day` (local time); not yet in the rollups
+    return sum(seconds for segment_day, seconds in split_by_day(entry.start_time, current_time) if segment_day == day)
+
+def parse_member_targets(data):
+    # Returns (user_ids, emails, error); emails are compared case-insensitively
+    if not isinstance(data, dict):
+        return None, None, 'Expected an object with user_ids and/or emails'
+    user_ids = data.get('user_ids') or []
+    emails = data.get('emails') or []
+    if not isinstance(user_ids, list) or not all(isinstance(user_id, int) and not isinstance(user_id, bool)
+                                                 for user_id in user_ids):
+        return None, None, 'user_ids must be a list of integers'
+    if not isinstance(emails, list) or not all(isinstance(email, str) and email for email in emails):
+        return None, None, 'emails must be a list of addresses'
+    if not user_ids and not emails:
+        return None, None, 'Provide user_ids or emails'
+    if len(user_ids) + len(emails) > WorkspaceService.MAX_BULK_MEMBERS:
+        return None, None, f'At most {WorkspaceService.MAX_BULK_MEMBERS} users per request'
+    return user_ids, [email.lower() for email in emails], None
 
 class WorkspaceService:
-    def __init__(self):
-        self.workspace_repo = WorkspaceRepository()
+    MAX_BULK_MEMBERS = 5000
+
+    def __init__(self, workspace_repo=None, user_repo=None):
+        self.workspace_repo = workspace_repo or WorkspaceRepository()
+        self.user_repo = user_repo or UserRepository()
 
     def get_user_workspaces(self, user):
         return self.workspace_repo.get_user_workspaces(user)
@@ -12,4 +42,103 @@ class WorkspaceService:
         if not workspace:
             return {'error': 'Workspace not found', 'status': 404}
         self.workspace_repo.add_member_to_workspace(workspace, user)
-        return {'message': 'Joined workspace successfully'}
\ No newline at end of file
+        return {'message': 'Joined workspace successfully'}
+
+    def add_members(self, workspace_id, requested_by, data):
+        return self._change_members(workspace_id, requested_by, data, add=True)
+
+    def remove_members(self, workspace_id, requested_by, data):
+        return self._change_members(workspace_id, requested_by, data, add=False)
+
+    def _change_members(self, workspace_id, requested_by, data, add):
+        """
+        Add or remove users, given by id or email, as one transaction: users
+        are resolved in one query and memberships are written in bulk. Returns
+        a result per requested user (added, already_member, removed,
+        not_member, not_found or ambiguous) and a count per result.
+        """
+        workspace = self.workspace_repo.get_workspace_by_id(workspace_id)
+        if not workspace or (workspace.owner_id != requested_by
+                             and not self.workspace_repo.user_can_access(workspace_id, requested_by)):
+            return {'error': 'Workspace not found', 'status': 404}
+        if workspace.owner_id != requested_by:
+            return {'error': 'Only the workspace owner can manage members', 'status': 403}
+        user_ids, emails, error = parse_member_targets(data)
+        if error:
+            return {'error': error, 'status': 400}
+
+        with transaction.atomic():
+            found_ids = set()
+            ids_by_email = defaultdict(set)
+            for user_id, email in self.user_repo.resolve_users(user_ids, emails):
+                found_ids.add(user_id)
+                if email:
+                    ids_by_email[email].add(user_id)
+
+            results = []
+            for user_id in user_ids:
+                results.append({'user_id': user_id, 'status': None if user_id in found_ids else 'not_found'})
+            for email in emails:
+                matches = ids_by_email.get(email, ())
+                if len(matches) == 1:
+                    results.append({'email': email, 'user_id': next(iter(matches)), 'status': None})
+                else:
+                    results.append({'email': email, 'status': 'ambiguous' if matches else 'not_found'})
+
+            targets = {result['user_id'] for result in results if result['status'] is None}
+            members = self.workspace_repo.get_member_ids(workspace.id, targets)
+            if add:
+                self.workspace_repo.add_members(workspace.id, targets - members)
+            else:
+                self.workspace_repo.remove_members(workspace.id, members)
+
+        for result in results:
+            if result['status'] is None:
+                is_member = result['user_id'] in members
+                if add:
+                    result['status'] = 'already_member' if is_member else 'added'
+                else:
+                    result['status'] = 'removed' if is_member else 'not_member'
+        return {'workspace_id': workspace.id, 'results': results,
+                'summary': dict(Counter(result['status'] for result in results))}
+
+    def get_dashboard(self, user_id):
+        """
+        Every workspace of the user with its members, what each member is
+        working on, and today's time per member and activity.
+        Today's totals combine the closed-entry rollups with the time open
+        entries have run so far.
+        """
+        current_time = timezone.now()
+        today = timezone.localdate(current_time)
+        workspaces = []
+        for workspace in self.workspace_repo.get_dashboard_workspaces(user_id, today):
+            members = []
+            for member in workspace.member_list:
+                activities = defaultdict(int)
+                for rollup in member.day_rollups:
+                    activities[rollup.activity] += rollup.total_seconds
+                entry = member.active_entries[0] if member.active_entries else None
+                if entry:
+                    running = running_seconds_on(entry, today, current_time)
+                    if running:
+                        activities[entry.activity] += running
+                members.append({
+                    'id': member.id,
+                    'username': member.username,
+                    'active_context': entry_payload(entry) if entry else None,
+                    'today_seconds': sum(activities.values()),
+                    'today_activities': dict(activities),
+                })
+            workspaces.append({
+                'id': workspace.id,
+                'name': workspace.name,
+                'owner': {'id': workspace.owner.id, 'username': workspace.owner.username},
+                'member_count': workspace.member_count,
+                'active_count': sum(1 for member in members if member['active_context']),
+                'today_seconds': sum(member['today_seconds'] for member in members),
+                'members': members,
+            })
+        return {'date': today, 'workspaces': workspaces}
+
+workspace_service = WorkspaceService()
@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_save, post_delete
+from .models import APIKey
+from .services.caches import api_key_cache, token_cache
+
+def invalidate_tokens_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        token_cache.invalidate_user(user.id)
+
+def invalidate_tokens_on_user_change(sender, instance, **kwargs):
+    # Password changes and deactivation must not be masked by a cached user
+    token_cache.invalidate_user(instance.id)
+    api_key_cache.invalidate_user(instance.id)
+
+def invalidate_api_key(sender, instance, **kwargs):
+    api_key_cache.delete(instance.key_digest)
+
+def invalidate_tokens_on_blacklist(sender, instance, **kwargs):
+    user_id = instance.token.user_id
+    if user_id is not None:
+        token_cache.invalidate_user(user_id)
+
+def connect_signals():
+    user_logged_out.connect(invalidate_tokens_on_logout, dispatch_uid='token_cache_logout')
+    post_save.connect(invalidate_tokens_on_user_change, sender=User, dispatch_uid='token_cache_user_save')
+    post_delete.connect(invalidate_tokens_on_user_change, sender=User, dispatch_uid='token_cache_user_delete')
+    post_save.connect(invalidate_api_key, sender=APIKey, dispatch_uid='api_key_cache_save')
+    post_delete.connect(invalidate_api_key, sender=APIKey, dispatch_uid='api_key_cache_delete')
+    if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        post_save.connect(invalidate_tokens_on_blacklist, sender=BlacklistedToken, dispatch_uid='token_cache_blacklist')
@@ -1,19 +1,55 @@
-from django.test import TestCase
+from django.test import Client, SimpleTestCase, TestCase, override_settings
 from unittest.mock import patch, MagicMock
 import jwt
 from context_tracker.services.auth_service import AuthService
-from context_tracker.models import APIKey
-from context_tracker.services.context_service import ContextService
-from context_tracker.models import ContextEntry
+from context_tracker.models import APIKey, Activity, ArchivedContextEntry, ContextEntry, DailyActivityRollup, User, Workspace
+from context_tracker.services.context_service import ContextService, context_service
 from context_tracker.services.workspace_service import WorkspaceService
-from context_tracker.models import Workspace
 from context_tracker.middleware import AuthenticationMiddleware
 from django.http import HttpRequest, JsonResponse
 from context_tracker.repositories.context_entry_repository import ContextEntryRepository
 from context_tracker.repositories.workspace_repository import WorkspaceRepository
-from context_tracker.models import User
+from django.db import IntegrityError, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from context_tracker.services.caches import TTLCache, token_cache
 import json
-from rest_framework.test import APIClient
+import subprocess
+import sys
+import sqlite3
+from contextlib import closing
+from django.conf import settings
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.utils.timezone import localtime, now
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from context_tracker.services.activity_dictionary import ActivityPrefixIndex, activity_index_cache
+from django.apps import apps as django_apps
+from importlib import import_module
+from context_tracker.services.rollup_service import LocalDays, split_by_day
+from rest_framework.test import APIClient, APITestCase
+from context_tracker.services.events import ContextEventPublisher, InProcessBroker, event_broker
+import threading
+from django.contrib.auth.signals import user_login_failed
+import csv
+import gzip
+import os
+import tempfile
+import shutil
+import time
+from pathlib import Path
+from unittest import skipUnless
+from context_tracker.services import export_service as export_module
+from decimal import Decimal
+from rest_framework.renderers import JSONRenderer
+from context_tracker.renderers import FastJSONRenderer
+from context_tracker.metrics import registry as metrics_registry
+from context_tracker.db_routers import ReadReplicaRouter
+from context_tracker.repositories.rollup_repository import RollupRepository
+from django.contrib.auth.hashers import make_password
+from context_tracker.services.account_service import account_service
+from context_tracker.services.password_hashing import HashingPoolBusy, PasswordHashingPool
 from rest_framework import status
 
 class AuthServiceTestCase(TestCase):
@@ -44,12 +80,29 @@ class AuthServiceTestCase(TestCase):
         self.assertEqual(result['error'], 'Unauthorized: Invalid token')
         self.assertEqual(result['status'], 401)
 
-    @patch.object(APIKey.objects, 'filter')
-    def test_validate_credentials_with_valid_api_key(self, mock_filter):
-        mock_filter.return_value.exists.return_value = True
-        headers = {'X-API-KEY': 'valid_api_key'}
+    def test_validate_credentials_with_valid_api_key(self):
+        user = User.objects.create_user(username='keyowner', password='password')
+        api_key = APIKey.objects.create(user=user)
+        headers = {'X-API-KEY': api_key.raw_key}
         result = self.auth_service.validate_credentials(headers)
         self.assertTrue(result['is_valid'])
+        self.assertEqual(result['user_id'], user.id)
+
+    def test_validate_credentials_with_invalid_api_key(self):
+        result = self.auth_service.validate_credentials({'X-API-KEY': 'not-a-key'})
+        self.assertFalse(result['is_valid'])
+        self.assertEqual(result['error'], 'Unauthorized: Invalid API key')
+
+    def test_api_key_lookups_are_cached(self):
+        user = User.objects.create_user(username='keyowner', password='password')
+        api_key = APIKey.objects.create(user=user)
+        self.assertNotEqual(api_key.key_digest, api_key.raw_key)
+        headers = {'X-API-KEY': api_key.raw_key}
+        self.auth_service.validate_credentials(headers)
+        self.auth_service.validate_credentials({'X-API-KEY': 'bad'})
+        with self.assertNumQueries(0):
+            self.assertTrue(self.auth_service.validate_credentials(headers)['is_valid'])
+            self.assertFalse(self.auth_service.validate_credentials({'X-API-KEY': 'bad'})['is_valid'])
 
     def test_validate_credentials_with_missing_credentials(self):
         headers = {}
@@ -65,9 +118,9 @@ class ContextServiceTestCase(TestCase):
             user_id='test_user', activity='Test Activity', note='Test Note', start_time='2025-04-07T12:00:00Z'
         )
         self.mock_context_entry_repo.create_context_entry.return_value = MagicMock(id='123')
-        self.mock_context_entry_repo.end_active_contexts.return_value = 1
         self.context_service = ContextService(self.mock_context_entry_repo)
         self.user_id = 'test_user'
+        cache.clear()
 
     @patch.object(ContextEntry.objects, 'filter')
     @patch.object(ContextEntry.objects, 'create')
@@ -88,7 +141,7 @@ class ContextServiceTestCase(TestCase):
 
     @patch.object(ContextEntry.objects, 'filter')
     def test_stop_user_context_without_active_context(self, mock_filter):
-        self.mock_context_entry_repo.end_active_contexts.return_value = 0  # Ensure no active contexts are ended
+        self.mock_context_entry_repo.close_active_contexts.return_value = []  # Ensure no active contexts are ended
 
         result = self.context_service.stop_user_context(self.user_id)
         self.assertEqual(result['message'], 'No active context to stop')
@@ -196,6 +249,31 @@ class AuthenticationMiddlewareTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(json.loads(response.content), {'message': 'Success'})
 
+    def test_route_policies_come_from_view_permissions(self):
+        self.assertTrue(self.middleware.requires_auth('/log/'))
+        self.assertTrue(self.middleware.requires_auth('/log/42/'))
+        self.assertFalse(self.middleware.requires_auth('/login/'))
+        self.assertFalse(self.middleware.requires_auth('/log/not-an-id/'))
+
+    def test_protected_request_decodes_token_once(self):
+        token_cache.clear()
+        user = User.objects.create_user(username='middlewareuser', password='password')
+        token = str(RefreshToken.for_user(user).access_token)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with patch('jwt.decode', wraps=jwt.decode) as mock_decode:
+            response = client.get('/log/', {'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_decode.call_count, 1)
+        self.assertIn('auth;dur=', response['Server-Timing'])
+
+    def test_refresh_token_is_not_accepted_as_bearer(self):
+        user = User.objects.create_user(username='middlewareuser', password='password')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user)}')
+        response = client.get('/log/', {'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
 class ContextEntryRepositoryTestCase(TestCase):
     def setUp(self):
         self.repo = ContextEntryRepository()
@@ -219,11 +297,25 @@ class ContextEntryRepositoryTestCase(TestCase):
         self.assertEqual(active_entry.id, entry.id)
 
     def test_get_all_contexts(self):
-        ContextEntry.objects.create(user=self.user, workspace=self.workspace, activity='Task 1')
+        ContextEntry.objects.create(user=self.user, workspace=self.workspace, activity='Task 1', end_time=datetime.now(dt_timezone.utc))
         ContextEntry.objects.create(user=self.user, workspace=self.workspace, activity='Task 2')
         entries = self.repo.get_all_contexts(self.user.id)
         self.assertEqual(len(entries), 2)
 
+    def test_switch_context_closes_previous_entry(self):
+        previous = ContextEntry.objects.create(user=self.user, workspace=self.workspace, activity='Active Task')
+        entry, closed = self.repo.switch_context(self.user.id, 'Next Task', 'Note')
+        self.assertEqual([c.id for c in closed], [previous.id])
+        previous.refresh_from_db()
+        self.assertEqual(previous.end_time, entry.start_time)
+        self.assertIsNone(entry.end_time)
+        self.assertEqual(self.repo.get_active_context(self.user.id).id, entry.id)
+
+    def test_only_one_open_context_per_user(self):
+        ContextEntry.objects.create(user=self.user, workspace=self.workspace, activity='Active Task')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ContextEntry.objects.create(user=self.user, workspace=self.workspace, activity='Second Task')
+
 class WorkspaceRepositoryTestCase(TestCase):
     def setUp(self):
         self.repo = WorkspaceRepository()
@@ -300,10 +392,6 @@ class UserAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data["message"], "User registered successfully")
 
-from rest_framework.test import APITestCase
-from rest_framework import status
-from .models import User
-
 class CustomTokenObtainPairViewTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -341,3 +429,1238 @@ class CustomTokenObtainPairViewTests(APITestCase):
         response = self.client.post(self.login_url, data)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertIn("error", response.data)
+
+class LogContextHistoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="historyuser", password="password")
+        self.client.force_authenticate(user=self.user)
+        base = datetime(2025, 4, 7, 12, 0, tzinfo=dt_timezone.utc)
+        for i in range(5):
+            # Two entries share a start_time to exercise the id tie-breaker
+            start_time = base + timedelta(minutes=min(i, 3))
+            ContextEntry.objects.create(user=self.user, activity=f'Task {i}', start_time=start_time, end_time=start_time)
+        other = User.objects.create_user(username="otheruser", password="password")
+        ContextEntry.objects.create(user=other, activity='Not mine')
+
+    def test_get_streams_full_history(self):
+        response = self.client.get("/log/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        entries = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([e['activity'] for e in entries], ['Task 4', 'Task 3', 'Task 2', 'Task 1', 'Task 0'])
+        self.assertEqual(entries[-1]['start_time'], '2025-04-07T12:00:00Z')
+
+    def test_get_paginates_with_cursor(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get("/log/", params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(e['activity'] for e in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, ['Task 4', 'Task 3', 'Task 2', 'Task 1', 'Task 0'])
+
+    def test_get_rejects_invalid_cursor_and_limit(self):
+        response = self.client.get("/log/", {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/log/", {'limit': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ContextBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="batchuser", password="password")
+        self.client.force_authenticate(user=self.user)
+
+    def test_batch_closes_open_entry_and_clips_overlaps(self):
+        open_entry = ContextEntry.objects.create(
+            user=self.user, activity='Online', start_time=datetime(2025, 4, 7, 8, 0, tzinfo=dt_timezone.utc)
+        )
+        payload = [
+            {'idempotency_key': 'b', 'activity': 'Review', 'start_time': '2025-04-07T10:00:00Z'},
+            {'idempotency_key': 'a', 'activity': 'Email', 'start_time': '2025-04-07T09:00:00Z',
+             'end_time': '2025-04-07T10:30:00Z'},
+            {'idempotency_key': 'c', 'activity': 'Broken'},
+        ]
+        response = self.client.post("/log/batch/", payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'created', 'invalid'])
+
+        open_entry.refresh_from_db()
+        self.assertEqual(open_entry.end_time, datetime(2025, 4, 7, 9, 0, tzinfo=dt_timezone.utc))
+        email = ContextEntry.objects.get(user=self.user, idempotency_key='a')
+        self.assertEqual(email.end_time, datetime(2025, 4, 7, 10, 0, tzinfo=dt_timezone.utc))
+        review = ContextEntry.objects.get(user=self.user, idempotency_key='b')
+        self.assertIsNone(review.end_time)
+
+        # Replaying the same batch is a no-op
+        response = self.client.post("/log/batch/", payload[:2], format='json')
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual([r['status'] for r in response.data['results']], ['duplicate', 'duplicate'])
+
+    def test_batch_trims_against_existing_closed_entries(self):
+        ContextEntry.objects.create(
+            user=self.user, activity='Meeting',
+            start_time=datetime(2025, 4, 7, 9, 0, tzinfo=dt_timezone.utc),
+            end_time=datetime(2025, 4, 7, 10, 0, tzinfo=dt_timezone.utc),
+        )
+        body = '\n'.join(json.dumps(item) for item in [
+            {'idempotency_key': 'x', 'activity': 'Inside', 'start_time': '2025-04-07T09:15:00Z',
+             'end_time': '2025-04-07T09:45:00Z'},
+            {'idempotency_key': 'y', 'activity': 'After', 'start_time': '2025-04-07T09:30:00Z',
+             'end_time': '2025-04-07T11:00:00Z'},
+        ])
+        response = self.client.post("/log/batch/", body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['status'] for r in response.data['results']], ['skipped', 'created'])
+        after = ContextEntry.objects.get(user=self.user, idempotency_key='y')
+        self.assertEqual(after.start_time, datetime(2025, 4, 7, 10, 0, tzinfo=dt_timezone.utc))
+
+    def test_batch_rejects_non_list_body(self):
+        response = self.client.post("/log/batch/", {'activity': 'Email'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username="cacheuser", password="password")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def test_ttl_cache_evicts_least_recently_used_and_expired(self):
+        clock = MagicMock(return_value=100)
+        cache = TTLCache(max_size=2, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2, expires_at=150)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        clock.return_value = 200
+        cache.set('d', 4, expires_at=150)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_validate_credentials_decodes_token_once(self):
+        auth_service = AuthService()
+        headers = {'Authorization': f'Bearer {self.token}'}
+        hits_before = token_cache.stats()['hits']
+        with patch('jwt.decode', wraps=jwt.decode) as mock_decode:
+            first = auth_service.validate_credentials(headers)
+            second = auth_service.validate_credentials(headers)
+        self.assertEqual(mock_decode.call_count, 1)
+        self.assertEqual(first['user_id'], second['user_id'])
+        self.assertEqual(token_cache.stats()['hits'] - hits_before, 1)
+
+    def test_repeat_requests_skip_user_lookup(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        client.get("/log/", {'limit': 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/log/", {'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('auth_user' in query['sql'] for query in queries.captured_queries))
+
+    def test_logout_invalidates_cached_tokens(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        client.get("/log/", {'limit': 1})
+        self.assertEqual(token_cache.stats()['size'], 1)
+        client.post("/logout/")
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_cached_tokens_expire_long_before_the_token(self):
+        # Other workers only drop a revoked token when the cap runs out
+        self.assertEqual(token_cache.max_ttl, settings.TOKEN_CACHE['MAX_TTL'])
+        self.assertLessEqual(token_cache.max_ttl, 300)
+        AuthService().validate_credentials({'Authorization': f'Bearer {self.token}'})
+        with patch.object(token_cache, 'clock', return_value=time.time() + token_cache.max_ttl + 1):
+            self.assertIsNone(token_cache.get_token(self.token))
+
+class DailyActivityRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="rollupuser", password="password")
+        self.service = ContextService(ContextEntryRepository())
+
+    def rollups(self):
+        return list(DailyActivityRollup.objects.filter(user=self.user).order_by('date', 'activity').values_list(
+            'date', 'activity', 'total_seconds', 'entry_count'
+        ))
+
+    def test_split_by_day_handles_midnight(self):
+        segments = split_by_day(
+            datetime(2025, 4, 7, 23, 30, tzinfo=dt_timezone.utc), datetime(2025, 4, 8, 1, 0, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(segments, [(date(2025, 4, 7), 1800), (date(2025, 4, 8), 3600)])
+        # Boundaries remembered from one split still give the right days for earlier entries
+        days = LocalDays()
+        self.assertEqual(split_by_day(datetime(2025, 4, 8, 1, tzinfo=dt_timezone.utc),
+                                      datetime(2025, 4, 8, 2, tzinfo=dt_timezone.utc), days), [(date(2025, 4, 8), 3600)])
+        self.assertEqual(split_by_day(datetime(2025, 4, 7, 22, tzinfo=dt_timezone.utc),
+                                      datetime(2025, 4, 9, 0, 30, tzinfo=dt_timezone.utc), days),
+                         [(date(2025, 4, 7), 7200), (date(2025, 4, 8), 86400), (date(2025, 4, 9), 1800)])
+
+    def test_rollups_follow_close_update_and_delete(self):
+        self.service.log_context(self.user.id, 'Email', '')
+        entry = ContextEntry.objects.get(user=self.user)
+        self.assertEqual(self.rollups(), [])
+
+        self.service.update_context(self.user.id, entry.id, {
+            'start_time': '2025-04-07T23:30:00Z', 'end_time': '2025-04-08T01:00:00Z'
+        })
+        self.assertEqual(self.rollups(), [
+            (date(2025, 4, 7), 'Email', 1800, 1),
+            (date(2025, 4, 8), 'Email', 3600, 1),
+        ])
+
+        self.service.update_context(self.user.id, entry.id, {'activity': 'Standup'})
+        self.assertEqual([row[1] for row in self.rollups()], ['Standup', 'Standup'])
+
+        self.service.delete_context(self.user.id, entry.id)
+        self.assertEqual(self.rollups(), [])
+
+    def test_rebuild_matches_incremental_rollups_and_stats_endpoint(self):
+        self.service.ingest_contexts(self.user.id, [
+            {'idempotency_key': '1', 'activity': 'Email', 'start_time': '2025-04-07T09:00:00Z', 'end_time': '2025-04-07T09:30:00Z'},
+            {'idempotency_key': '2', 'activity': 'Email', 'start_time': '2025-04-07T10:00:00Z', 'end_time': '2025-04-07T10:15:00Z'},
+            {'idempotency_key': '3', 'activity': 'Review', 'start_time': '2025-04-08T10:00:00Z', 'end_time': '2025-04-08T11:00:00Z'},
+        ])
+        incremental = self.rollups()
+        self.assertEqual(incremental[0], (date(2025, 4, 7), 'Email', 2700, 2))
+        call_command('rebuild_activity_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/stats/', {'from': '2025-04-08'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(d['activity'], d['total_seconds']) for d in response.data['days']], [('Review', 3600)])
+
+    def test_stop_counts_only_the_entry_it_closed(self):
+        stopped_at = datetime(2025, 4, 7, 12, tzinfo=dt_timezone.utc)
+        # A batch entry clipped at the same instant the open entry is stopped
+        ContextEntry.objects.create(user=self.user, activity='Email', start_time=stopped_at - timedelta(hours=1),
+                                    end_time=stopped_at)
+        ContextEntry.objects.create(user=self.user, activity='Review', start_time=stopped_at - timedelta(minutes=30))
+        with patch('context_tracker.services.context_service.now', return_value=stopped_at):
+            self.service.stop_user_context(self.user.id)
+        self.assertEqual(self.rollups(), [(date(2025, 4, 7), 'Review', 1800, 1)])
+
+    def test_personal_rollups_are_unique_and_edits_lock_the_timeline(self):
+        DailyActivityRollup.objects.create(user=self.user, date=date(2025, 4, 7), activity='Email', total_seconds=60, entry_count=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyActivityRollup.objects.create(user=self.user, date=date(2025, 4, 7), activity='Email', total_seconds=60, entry_count=1)
+
+        self.service.log_context(self.user.id, 'Email', '')
+        entry = ContextEntry.objects.get(user=self.user)
+        with patch.object(self.service.context_entry_repo, 'lock_user_timeline') as lock:
+            self.service.update_context(self.user.id, entry.id, {'activity': 'Review'})
+            self.service.delete_context(self.user.id, entry.id)
+        self.assertEqual(lock.call_count, 2)
+
+    def test_deltas_are_written_in_bulk(self):
+        repo = RollupRepository()
+        day = date(2025, 4, 7)
+        repo.apply_deltas(self.user.id, None, {(day, 'Email'): (600, 1), (day, 'Review'): (300, 1)})
+        deltas = {(day, 'Email'): (900, 1), (day, 'Review'): (-300, -1)}
+        deltas.update({(day + timedelta(days=offset), 'Coding'): (60, 1) for offset in range(1, 251)})
+        # Three batches: the first reads, updates, creates and deletes; the others read and create
+        with self.assertNumQueries(4 + 2 * 2):
+            repo.apply_deltas(self.user.id, None, deltas)
+        self.assertEqual(self.rollups()[0], (day, 'Email', 1500, 2))
+        self.assertEqual(len(self.rollups()), 251)
+
+class StatusCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="statususer", password="password")
+        self.client.force_authenticate(user=self.user)
+
+    def test_status_polls_are_served_from_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/log/', {'activity': 'Email', 'note': 'Inbox'}, format='json')
+        with self.assertNumQueries(0):
+            result = context_service.get_user_status(self.user.id)
+        self.assertEqual(result['activity'], 'Email')
+
+        response = self.client.get('/status/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['note'], 'Inbox')
+
+    def test_read_through_fill_keeps_a_newer_status(self):
+        self.client.post('/log/', {'activity': 'Email'}, format='json')
+        cache.clear()
+        stale = ContextEntry.objects.get(user=self.user)
+
+        def read_then_switch(user_id):
+            # The writer commits between the reader's query and its fill
+            with self.captureOnCommitCallbacks(execute=True):
+                context_service.log_context(user_id, 'Review', '')
+            return stale
+
+        with patch.object(context_service.context_entry_repo, 'get_active_context', side_effect=read_then_switch):
+            self.assertEqual(context_service.get_user_status(self.user.id)['activity'], 'Email')
+        self.assertEqual(self.client.get('/status/').data['activity'], 'Review')
+
+    def test_stop_updates_cached_status(self):
+        self.client.post('/log/', {'activity': 'Email'}, format='json')
+        self.assertEqual(self.client.get('/status/').data['activity'], 'Email')
+
+        response = self.client.post('/stop/')
+        self.assertEqual(response.data['message'], 'Context stopped')
+        self.assertEqual(self.client.get('/status/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post('/stop/').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_edits_invalidate_cached_status(self):
+        self.client.post('/log/', {'activity': 'Email'}, format='json')
+        entry = ContextEntry.objects.get(user=self.user)
+        self.client.get('/status/')
+        self.client.put(f'/log/{entry.id}/', {'activity': 'Review'}, format='json')
+        self.assertEqual(self.client.get('/status/').data['activity'], 'Review')
+
+class BenchmarkAPICommandTests(TestCase):
+    def test_reports_every_scenario_without_errors(self):
+        stdout = StringIO()
+        call_command(
+            'benchmark_api', users=2, entries=10, requests=4, concurrency='1',
+            interfaces='wsgi', query_samples=1, stdout=stdout, stderr=StringIO(),
+        )
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(set(report['scenarios']), {'login', 'log_post', 'log_page', 'log_stream', 'log_put', 'log_delete'})
+        for scenario, results in report['scenarios'].items():
+            self.assertEqual(results['wsgi']['1']['errors'], 0, scenario)
+            self.assertEqual(results['wsgi']['1']['requests'], 4)
+
+class BenchmarkIngestCommandTests(TestCase):
+    def test_reports_steps_and_enforces_budget(self):
+        stdout = StringIO()
+        call_command('benchmark_ingest', entries=300, repeat=1, budget=60, stdout=stdout, stderr=StringIO())
+        report = json.loads(stdout.getvalue())
+        run, = report['runs']
+        self.assertEqual(run['created'], 300)
+        self.assertEqual(set(run['steps']), {'entries', 'activities', 'rollups', 'journal', 'search_index'})
+        self.assertFalse(ContextEntry.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_ingest', entries=300, repeat=1, budget=0, stdout=StringIO(), stderr=StringIO())
+
+@override_settings(ROOT_URLCONF='focusflow_api.asgi_urls')
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="asyncuser", password="password")
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def test_log_page_and_status(self):
+        response = self.client.post('/log/', {'activity': 'Email', 'note': 'Inbox'}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        entry_id = response.json()['entry_id']
+        self.client.post('/log/', {'activity': 'Review'}, content_type='application/json', **self.auth)
+
+        page = self.client.get('/log/', {'limit': 1}, **self.auth).json()
+        self.assertEqual([row['activity'] for row in page['results']], ['Review'])
+        page = self.client.get('/log/', {'limit': 1, 'cursor': page['next_cursor']}, **self.auth).json()
+        self.assertEqual([row['id'] for row in page['results']], [entry_id])
+        self.assertIsNone(page['next_cursor'])
+        self.assertEqual(self.client.get('/status/', **self.auth).json()['activity'], 'Review')
+
+    def test_edit_delete_and_stop(self):
+        self.client.post('/log/', {'activity': 'Email'}, content_type='application/json', **self.auth)
+        entry = ContextEntry.objects.get(user=self.user)
+
+        response = self.client.put(f'/log/{entry.id}/', {'note': 'Edited'}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post('/stop/', **self.auth).json(), {'message': 'Context stopped'})
+        self.assertEqual(self.client.get('/status/', **self.auth).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.assertEqual(self.client.delete(f'/log/{entry.id}/', **self.auth).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(f'/log/{entry.id}/', **self.auth).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requests_without_credentials_are_rejected(self):
+        self.assertEqual(self.client.get('/status/').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/log/', 'not json', content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_middleware_chain_and_stream(self):
+        headers = {'Authorization': self.auth['HTTP_AUTHORIZATION']}
+        response = await self.async_client.get('/status/', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('auth;dur=', response['Server-Timing'])
+        response = await self.async_client.get('/status/', headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        await self.async_client.post('/log/', {'activity': 'Email'}, content_type='application/json', headers=headers)
+        await self.async_client.post('/log/', {'activity': 'Review'}, content_type='application/json', headers=headers)
+        response = await self.async_client.get('/log/', headers=headers)
+        streamed = json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual([row['activity'] for row in streamed], ['Review', 'Email'])
+
+class ContextEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="eventuser", password="password")
+        self.broker = InProcessBroker()
+        self.service = ContextService(ContextEntryRepository(), events=ContextEventPublisher(self.broker))
+
+    def test_writes_publish_deltas_on_commit(self):
+        start = self.broker.events_after(self.user.id, None)['last_event_id']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.log_context(self.user.id, 'Email', '')
+            self.assertEqual(self.broker.events_after(self.user.id, start)['events'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = self.service.log_context(self.user.id, 'Review', '')
+            self.service.stop_user_context(self.user.id)
+            self.service.delete_context(self.user.id, entry['entry_id'])
+        result = self.broker.events_after(self.user.id, start)
+        self.assertEqual(
+            [(event['type'], event['entry'].get('activity')) for event in result['events']],
+            [('created', 'Email'), ('ended', 'Email'), ('created', 'Review'), ('ended', 'Review'), ('deleted', None)]
+        )
+        self.assertEqual(result['last_event_id'], result['events'][-1]['id'])
+
+    def test_broker_resets_readers_that_fell_behind(self):
+        self.broker = InProcessBroker(buffer_size=3)
+        self.broker.publish(self.user.id, [{'type': 'created', 'entry': {'id': str(i)}} for i in range(5)])
+        self.assertTrue(self.broker.events_after(self.user.id, 1)['reset'])
+        self.assertEqual([e['entry']['id'] for e in self.broker.events_after(self.user.id, 2)['events']], ['2', '3', '4'])
+        self.assertTrue(self.broker.events_after(self.user.id, 99)['reset'])
+
+    def test_broker_keeps_buffers_for_recent_users_only(self):
+        self.broker = InProcessBroker(max_users=2)
+        event = [{'type': 'created', 'entry': {'id': '1'}}]
+        for user_id in (1, 2, 1, 3):
+            self.broker.publish(user_id, event)
+        # User 2 published least recently and was evicted; its readers must reload
+        self.assertEqual(len(self.broker._buffers), 2)
+        self.assertTrue(self.broker.events_after(2, 0)['reset'])
+        self.assertEqual(len(self.broker.events_after(1, 0)['events']), 2)
+        self.assertFalse(self.broker.events_after(2, 4)['reset'])
+        self.broker.publish(2, event)
+        self.assertTrue(self.broker.events_after(2, 0)['reset'])
+        self.assertEqual([e['id'] for e in self.broker.events_after(2, 4)['events']], [5])
+
+    def test_wait_returns_when_an_event_is_published(self):
+        after = self.broker.events_after(self.user.id, None)['last_event_id']
+        timer = threading.Timer(0.05, self.broker.publish, (self.user.id, [{'type': 'created', 'entry': {'id': '1'}}]))
+        timer.start()
+        result = self.broker.wait(self.user.id, after, timeout=5)
+        timer.join()
+        self.assertEqual([event['type'] for event in result['events']], ['created'])
+        self.assertEqual(self.broker.wait(self.user.id, result['last_event_id'], timeout=0)['events'], [])
+
+    def test_long_poll_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        after = client.get('/log/events/', {'timeout': 0}).data['last_event_id']
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/log/', {'activity': 'Email'}, format='json')
+        response = client.get('/log/events/', {'after': after, 'timeout': 0})
+        self.assertEqual([event['type'] for event in response.data['events']], ['created'])
+        self.assertEqual(client.get('/log/events/', {'after': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ROOT_URLCONF='focusflow_api.asgi_urls')
+    async def test_event_stream(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = await self.async_client.get('/log/events/stream/', headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = response.streaming_content.__aiter__()
+        self.assertIn(b'event: ready', await chunks.__anext__())
+        event_broker.publish(self.user.id, [{'type': 'created', 'entry': {'id': '7', 'activity': 'Email'}}])
+        message = await chunks.__anext__()
+        self.assertIn(b'event: created', message)
+        self.assertIn(b'"activity":"Email"', message)
+        await chunks.aclose()
+
+class ChangeJournalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="syncuser", password="password")
+        self.client.force_authenticate(user=self.user)
+
+    def changes(self, since, **params):
+        response = self.client.get('/log/changes/', {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_changes_since_returns_latest_state_and_tombstones(self):
+        email_id = self.client.post('/log/', {'activity': 'Email'}, format='json').data['entry_id']
+        review_id = self.client.post('/log/', {'activity': 'Review'}, format='json').data['entry_id']
+
+        initial = self.changes(0)
+        self.assertEqual([(c['operation'], c['entry']['id']) for c in initial['changes']], [('upsert', email_id), ('upsert', review_id)])
+        self.assertIsNotNone(initial['changes'][0]['entry']['end_time'])
+        self.assertEqual(initial['next_since'], 3)
+
+        self.client.put(f'/log/{review_id}/', {'note': 'Edited'}, format='json')
+        self.client.delete(f'/log/{email_id}/')
+        self.client.post('/stop/')
+        delta = self.changes(initial['next_since'])
+        self.assertEqual(
+            [(c['operation'], c.get('id') or c['entry']['id']) for c in delta['changes']],
+            [('delete', email_id), ('upsert', review_id)]
+        )
+        self.assertEqual(delta['changes'][1]['entry']['note'], 'Edited')
+        self.assertEqual(self.changes(delta['next_since'])['changes'], [])
+
+    def test_batch_ingest_is_journaled_and_paged(self):
+        items = [
+            {'idempotency_key': f'k{i}', 'activity': 'Offline', 'start_time': f'2025-04-07T0{i}:00:00Z', 'end_time': f'2025-04-07T0{i}:30:00Z'}
+            for i in range(3)
+        ]
+        self.client.post('/log/batch/', items, format='json')
+        page = self.changes(0, limit=2)
+        self.assertEqual(len(page['changes']), 2)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(len(self.changes(page['next_since'])['changes']), 1)
+
+    def test_invalid_and_foreign_positions(self):
+        self.assertEqual(self.client.get('/log/changes/', {'since': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.post('/log/', {'activity': 'Email'}, format='json')
+        result = self.changes(50)
+        self.assertTrue(result['reset'])
+        self.assertEqual(result['next_since'], 1)
+
+class FastJSONRendererTests(TestCase):
+    def test_output_matches_drf_json_renderer(self):
+        data = {
+            'results': [{'id': '1', 'note': 'caf\u00e9', 'start_time': datetime(2025, 4, 7, 9, 0, 0, 123456, tzinfo=dt_timezone.utc)}],
+            'total': Decimal('1.5'),
+            'next_cursor': None,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_list_endpoint_uses_fast_renderer(self):
+        user = User.objects.create_user(username="renderuser", password="password")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.post('/log/', {'activity': 'Email'}, format='json')
+        response = client.get('/log/', {'limit': 10})
+        self.assertEqual(response.accepted_renderer.__class__.__name__, 'FastJSONRenderer')
+        self.assertEqual(json.loads(response.content)['results'][0]['activity'], 'Email')
+
+class ContextExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="exportuser", password="password")
+        self.other = User.objects.create_user(username="otheruser", password="password")
+        self.workspace = Workspace.objects.create(name="Analytics", owner=self.other)
+        self.client.force_authenticate(user=self.user)
+        for day, activity in [(6, 'Email'), (7, 'Review'), (8, 'Deploy')]:
+            start = datetime(2025, 4, day, 9, 0, tzinfo=dt_timezone.utc)
+            ContextEntry.objects.create(
+                user=self.user, workspace=self.workspace, activity=activity,
+                note='a, "quoted" note', start_time=start, end_time=start + timedelta(hours=1)
+            )
+
+    def download(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_with_date_range(self):
+        response, body = self.download('/log/export/csv/', **{'from': '2025-04-07', 'to': '2025-04-08'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'user-{self.user.id}-timeline.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(body.decode().splitlines()))
+        self.assertEqual([row['activity'] for row in rows], ['Review', 'Deploy'])
+        self.assertEqual(rows[0]['note'], 'a, "quoted" note')
+        self.assertEqual(rows[0]['start_time'], '2025-04-07T09:00:00+00:00')
+
+    def test_gzipped_ndjson_export(self):
+        response, body = self.download('/log/export/ndjson/', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = [json.loads(line) for line in gzip.decompress(body).splitlines()]
+        self.assertEqual([line['activity'] for line in lines], ['Email', 'Review', 'Deploy'])
+        self.assertEqual(lines[0]['workspace_id'], self.workspace.id)
+
+    def test_workspace_export_requires_membership(self):
+        response = self.client.get('/log/export/csv/', {'workspace': self.workspace.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.workspace.members.add(self.user)
+        _, body = self.download('/log/export/csv/', workspace=self.workspace.id)
+        self.assertEqual(len(body.decode().splitlines()), 4)
+
+    def test_unknown_or_unavailable_formats(self):
+        self.assertEqual(self.client.get('/log/export/xlsx/').status_code, status.HTTP_400_BAD_REQUEST)
+        if export_module.pyarrow is None:
+            self.assertEqual(self.client.get('/log/export/parquet/').status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(export_module.pyarrow, 'pyarrow is not installed')
+    def test_parquet_export(self):
+        import pyarrow.parquet
+        _, body = self.download('/log/export/parquet/')
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(body))
+        self.assertEqual(table.column('activity').to_pylist(), ['Email', 'Review', 'Deploy'])
+
+    def test_export_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'timeline.csv.gz')
+            call_command('export_contexts', user=self.user.id, gzip=True, output=path, stdout=StringIO())
+            with gzip.open(path, 'rt') as handle:
+                self.assertEqual(len(handle.read().splitlines()), 4)
+
+    @override_settings(ROOT_URLCONF='focusflow_api.asgi_urls')
+    async def test_asgi_export_streams_asynchronously(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = await self.async_client.get('/log/export/ndjson/', headers=headers)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 3)
+
+class WorkspaceDashboardTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username="lead", password="password")
+        self.client.force_authenticate(user=self.owner)
+        self.workspaces = [
+            Workspace.objects.create(name=f"Team {index}", owner=self.owner) for index in range(2)
+        ]
+        self.member_count = 0
+        self.add_members(2)
+
+    def add_members(self, count):
+        for _ in range(count):
+            self.member_count += 1
+            member = User.objects.create_user(username=f"member{self.member_count}", password="password")
+            for workspace in self.workspaces:
+                workspace.members.add(member)
+                started = localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+                ContextEntry.objects.create(
+                    user=member, workspace=workspace, activity="Review",
+                    start_time=started, end_time=started + timedelta(minutes=10)
+                )
+            ContextEntry.objects.create(user=member, workspace=self.workspaces[0], activity="Coding")
+
+    def dashboard(self):
+        response = self.client.get('/workspaces/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_dashboard_lists_members_activity_and_totals(self):
+        DailyActivityRollup.objects.all().delete()
+        call_command('rebuild_activity_rollups', stdout=StringIO())
+        dashboard = self.dashboard()
+        self.assertEqual([workspace['name'] for workspace in dashboard['workspaces']], ['Team 0', 'Team 1'])
+        team, other_team = dashboard['workspaces']
+        self.assertEqual(team['owner']['username'], 'lead')
+        self.assertEqual(team['member_count'], 2)
+        # A member's open entry and totals show in each of their workspaces
+        self.assertEqual(team['active_count'], 2)
+        self.assertEqual(other_team['active_count'], 2)
+        member = team['members'][0]
+        self.assertEqual(member['username'], 'member1')
+        self.assertEqual(member['active_context']['activity'], 'Coding')
+        self.assertEqual(other_team['members'][0]['active_context']['activity'], 'Coding')
+        self.assertEqual(other_team['members'][0]['today_activities']['Review'], 1200)
+        self.assertGreaterEqual(other_team['today_seconds'], 2400)
+        self.assertGreaterEqual(member['today_seconds'], 1200)
+
+    def test_dashboard_reflects_entries_written_through_the_api(self):
+        member = User.objects.create_user(username="apimember", password="password")
+        self.workspaces[1].members.add(member)
+        client = APIClient()
+        client.force_authenticate(user=member)
+        started = localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        response = client.post('/log/batch/', [
+            {'idempotency_key': '1', 'activity': 'Planning', 'start_time': started.isoformat(),
+             'end_time': (started + timedelta(minutes=30)).isoformat()},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        client.post('/log/', {'activity': 'Writing'}, format='json')
+
+        team = self.dashboard()['workspaces'][1]
+        listed = next(entry for entry in team['members'] if entry['username'] == 'apimember')
+        self.assertEqual(listed['active_context']['activity'], 'Writing')
+        self.assertEqual(listed['today_activities']['Planning'], 1800)
+        self.assertEqual(team['active_count'], 3)
+
+    def test_query_count_does_not_grow_with_membership(self):
+        with CaptureQueriesContext(connection) as small:
+            self.dashboard()
+        self.add_members(5)
+        other_owner = User.objects.create_user(username="outsider", password="password")
+        shared = Workspace.objects.create(name="Shared", owner=other_owner)
+        shared.members.add(self.owner, other_owner)
+        with CaptureQueriesContext(connection) as large:
+            dashboard = self.dashboard()
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len(dashboard['workspaces']), 3)
+        self.assertEqual(dashboard['workspaces'][0]['member_count'], 2)
+        self.assertEqual(dashboard['workspaces'][1]['member_count'], 7)
+
+class WorkspaceMembershipBulkTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username="owner", password="password")
+        self.workspace = Workspace.objects.create(name="Org", owner=self.owner)
+        self.client.force_authenticate(user=self.owner)
+        self.users = User.objects.bulk_create([
+            User(username=f"hire{index}", email=f"hire{index}@example.com") for index in range(50)
+        ])
+        User.objects.bulk_create([User(username="twin1", email="twin@example.com"),
+                                  User(username="twin2", email="twin@example.com")])
+
+    def members_url(self, workspace_id=None):
+        return f'/workspaces/{workspace_id or self.workspace.id}/members/'
+
+    def test_bulk_add_reports_each_user_in_constant_queries(self):
+        self.workspace.members.add(self.users[0])
+        ids = [user.id for user in self.users[:40]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.members_url(), {
+                'user_ids': ids + [999999],
+                'emails': ['HIRE45@example.com', 'twin@example.com', 'nobody@example.com'],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(response.data['summary'],
+                         {'added': 40, 'already_member': 1, 'not_found': 2, 'ambiguous': 1})
+        self.assertEqual(response.data['results'][0], {'user_id': ids[0], 'status': 'already_member'})
+        self.assertEqual(response.data['results'][-3]['user_id'], self.users[45].id)
+        self.assertEqual(self.workspace.members.count(), 41)
+
+    def test_bulk_remove(self):
+        self.workspace.members.add(*self.users[:5])
+        response = self.client.delete(self.members_url(), {
+            'user_ids': [user.id for user in self.users[:3]], 'emails': ['hire10@example.com']
+        }, format='json')
+        self.assertEqual(response.data['summary'], {'removed': 3, 'not_member': 1})
+        self.assertEqual(set(self.workspace.members.values_list('id', flat=True)),
+                         {self.users[3].id, self.users[4].id})
+
+    def test_only_the_owner_can_manage_members(self):
+        member = self.users[0]
+        self.workspace.members.add(member)
+        self.client.force_authenticate(user=member)
+        response = self.client.post(self.members_url(), {'user_ids': [self.users[1].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.users[2])
+        response = self.client.post(self.members_url(), {'user_ids': [self.users[1].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_payload(self):
+        for payload in ({}, {'user_ids': ['1']}, {'emails': 'a@example.com'}):
+            response = self.client.post(self.members_url(), payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.workspace.members.count(), 0)
+
+@override_settings(REQUEST_METRICS={'ENABLED': True, 'ALLOWED_IPS': ['127.0.0.1']})
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        cache.clear()
+        self.user = User.objects.create_user(username="metricsuser", password="password")
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        ContextEntry.objects.create(user=self.user, activity="Coding")
+
+    def logged_record(self, logs):
+        return json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_log_line_and_histograms(self):
+        with self.assertLogs('context_tracker.requests', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/status/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        record = self.logged_record(logs)
+        self.assertEqual(record['route'], 'status/')
+        self.assertEqual(record['db_queries'], len(queries))
+        self.assertEqual(record['response_bytes'], len(response.content))
+        self.assertGreater(record['auth_ms'], 0)
+        self.assertGreater(record['serialization_ms'], 0)
+        timing = response['Server-Timing']
+        self.assertTrue(timing.startswith('auth;dur='))
+        self.assertIn(f'db;dur={record["db_ms"]:.3f};desc="{len(queries)} queries"', timing)
+
+        with self.assertLogs('context_tracker.requests', 'INFO'):
+            exposition = self.client.get('/metrics/')
+        self.assertEqual(exposition.status_code, 200)
+        text = exposition.content.decode()
+        self.assertIn('# TYPE focusflow_request_db_queries histogram', text)
+        self.assertIn('focusflow_responses_total{method="GET",route="status/",status="200"} 1', text)
+        self.assertIn('focusflow_request_duration_seconds_count{method="GET",route="status/"} 1', text)
+
+    @override_settings(ROOT_URLCONF='focusflow_api.asgi_urls')
+    async def test_queries_in_async_views_are_counted(self):
+        with self.assertLogs('context_tracker.requests', 'INFO') as logs:
+            response = await self.async_client.get('/status/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        record = self.logged_record(logs)
+        self.assertEqual(record['route'], 'status/')
+        self.assertGreater(record['db_queries'], 0)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_is_local_only(self):
+        with self.assertLogs('context_tracker.requests', 'INFO'):
+            self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='10.0.0.8').status_code, 404)
+
+    def test_disabled_by_default(self):
+        with override_settings(REQUEST_METRICS={'ENABLED': False}):
+            response = Client().get('/status/', headers=self.headers)
+            self.assertNotIn('db;dur=', response['Server-Timing'])
+            self.assertEqual(Client().get('/metrics/').status_code, 404)
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.user = User.objects.create_user(username="profileduser", password="password")
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def profiling(self, **overrides):
+        config = {'ENABLED': True, 'SAMPLE_RATE': 0.0, 'SLOW_THRESHOLD_MS': None,
+                  'SAMPLING_INTERVAL_MS': 1, 'DIRECTORY': self.directory, 'MAX_FILES_PER_ROUTE': 200}
+        config.update(overrides)
+        return override_settings(REQUEST_PROFILING=config)
+
+    def profiles(self, suffix):
+        return sorted(Path(self.directory).glob(f'*/*{suffix}'))
+
+    def test_sampled_requests_dump_pstats(self):
+        with self.profiling(SAMPLE_RATE=1.0):
+            self.assertEqual(Client().get('/status/', headers=self.headers).status_code, 404)
+        [profile] = self.profiles('.pstats')
+        self.assertEqual(profile.parent.name, 'status')
+        output = StringIO()
+        call_command('aggregate_profiles', directory=self.directory, pstats=True, stdout=output, stderr=StringIO())
+        self.assertIn('get_user_status', output.getvalue())
+
+    def test_slow_requests_keep_sampled_stacks(self):
+        def slow_status(user_id):
+            time.sleep(0.05)
+            return {'message': 'No active context', 'status': 404}
+
+        with self.profiling(SLOW_THRESHOLD_MS=30), \
+                patch.object(context_service, 'get_user_status', side_effect=slow_status):
+            Client().get('/status/', headers=self.headers)
+        with self.profiling(SLOW_THRESHOLD_MS=1000):
+            Client().get('/status/', headers=self.headers)
+        [profile] = self.profiles('.collapsed')
+        self.assertIn('slow_status', profile.read_text())
+
+        output = StringIO()
+        call_command('aggregate_profiles', directory=self.directory, route=['status/'], stdout=output, stderr=StringIO())
+        lines = output.getvalue().splitlines()
+        self.assertTrue(all(line.startswith('status;') for line in lines))
+        self.assertTrue(any('slow_status' in line for line in lines))
+
+    def test_disabled_by_default(self):
+        Client().get('/status/', headers=self.headers)
+        self.assertEqual(list(Path(self.directory).iterdir()), [])
+
+class ReadReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter(replicas=['replica_1'])
+        self.user = User.objects.create_user(username="replicauser", password="password")
+
+    def test_only_opted_in_reads_outside_transactions_use_replicas(self):
+        with patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(self.router.db_for_read(ContextEntry, replica_ok=True), 'replica_1')
+            self.assertIsNone(self.router.db_for_read(ContextEntry))
+        self.assertEqual(self.router.db_for_read(ContextEntry, replica_ok=True), 'default')
+        self.assertEqual(self.router.db_for_write(ContextEntry), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_1', 'context_tracker'))
+        self.assertTrue(self.router.allow_migrate('default', 'context_tracker'))
+        self.assertIsNone(ReadReplicaRouter(replicas=[]).db_for_read(ContextEntry, replica_ok=True))
+
+    def test_history_and_stats_reads_are_routed(self):
+        repo = ContextEntryRepository()
+        with override_settings(DATABASE_ROUTERS=[self.router]), \
+                patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(repo.get_all_contexts(self.user.id).db, 'replica_1')
+            self.assertEqual(repo.contexts_page_queryset(self.user.id).db, 'replica_1')
+            self.assertEqual(RollupRepository().get_rollups(self.user.id).db, 'replica_1')
+            self.assertEqual(ContextEntry.objects.filter(user=self.user).db, 'default')
+
+    def test_connection_benchmark_command(self):
+        output = StringIO()
+        call_command('benchmark_db_connections', requests=3, concurrency=1, stdout=output, stderr=StringIO())
+        report = json.loads(output.getvalue())
+        self.assertEqual(set(report['modes']), {'per_request', 'persistent', 'persistent_health_checks'})
+        self.assertEqual(report['modes']['persistent']['status']['errors'], 0)
+        self.assertEqual(report['modes']['per_request']['log_page']['requests'], 3)
+
+@override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000})
+class PasswordHashingPoolTests(TestCase):
+    def setUp(self):
+        self.pool = PasswordHashingPool(workers=1, max_pending=1, timeout=5)
+        patcher = patch.object(account_service, 'hashing_pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, username, password):
+        return self.client.post('/login/', {'username': username, 'password': password}, content_type='application/json')
+
+    def test_login_upgrades_hashes_to_the_configured_cost(self):
+        user = User.objects.create(username="hasheduser", password=make_password("secret", hasher='pbkdf2_sha1'))
+        response = self.login("hasheduser", "secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json())
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(self.login("hasheduser", "wrong").status_code, 401)
+
+    def test_unknown_and_inactive_users_are_rejected(self):
+        User.objects.create(username="inactive", password=make_password("secret"), is_active=False)
+        failures = []
+        handler = lambda sender, credentials, **kwargs: failures.append(credentials['username'])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.assertEqual(self.login("nobody", "secret").status_code, 401)
+        self.assertEqual(self.login("inactive", "secret").status_code, 401)
+        self.assertEqual(failures, ['nobody', 'inactive'])
+
+    def test_register_hashes_in_the_pool(self):
+        response = self.client.post('/register/', {
+            'username': 'newcomer', 'password': 'secret', 'email': 'New@Example.COM', 'firstName': 'New'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(id=response.json()['user_id'])
+        self.assertTrue(user.check_password('secret'))
+        self.assertEqual(user.email, 'New@example.com')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_saturated_pool_answers_503(self):
+        User.objects.create(username="burstuser", password=make_password("secret"))
+        release = threading.Event()
+        worker = threading.Thread(target=self.pool.run, args=(release.wait,))
+        worker.start()
+        try:
+            response = self.login("burstuser", "secret")
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.login("burstuser", "secret").status_code, 200)
+
+    def test_slow_hashes_time_out(self):
+        pool = PasswordHashingPool(workers=1, max_pending=2, timeout=0.01)
+        with self.assertRaises(HashingPoolBusy):
+            pool.run(time.sleep, 0.2)
+
+class ContextRangeQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="rangeuser", password="password")
+        self.client.force_authenticate(user=self.user)
+        day = datetime(2025, 5, 6, tzinfo=dt_timezone.utc)
+        at = lambda hour, minute=0: day + timedelta(hours=hour, minutes=minute)
+        for activity, start, end in [
+            ('Email', at(10), at(11)),
+            ('Coding', at(11), at(13)),
+            ('Review', at(13, 30), at(14, 30)),
+            ('Oncall', at(8), at(20)),  # Edited to overlap the others
+            ('Writing', at(15), None),
+        ]:
+            ContextEntry.objects.create(user=self.user, activity=activity, start_time=start, end_time=end)
+        other = User.objects.create_user(username="otherrange", password="password")
+        ContextEntry.objects.create(user=other, activity='Elsewhere', start_time=at(12), end_time=at(13))
+
+    def activities(self, **params):
+        response = self.client.get('/log/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [entry['activity'] for entry in response.json()['results']]
+
+    def test_entries_overlapping_the_window(self):
+        self.assertEqual(self.activities(**{'from': '2025-05-06T12:00:00Z', 'to': '2025-05-06T14:00:00Z'}),
+                         ['Oncall', 'Coding', 'Review'])
+        self.assertEqual(self.activities(**{'from': '2025-05-06T21:00:00Z', 'to': '2025-05-06T22:00:00Z'}),
+                         ['Writing'])
+        self.assertEqual(self.activities(**{'from': '2025-05-06T07:00:00Z', 'to': '2025-05-06T08:00:00Z'}), [])
+        self.assertEqual(self.activities(**{'from': '2025-05-06T14:30:00Z'}), ['Oncall', 'Writing'])
+        self.assertEqual(self.activities(**{'from': '2025-05-06', 'to': '2025-05-06'}),
+                         ['Oncall', 'Email', 'Coding', 'Review', 'Writing'])
+
+    def test_range_is_one_query(self):
+        repo = ContextEntryRepository()
+        start = datetime(2025, 5, 6, 12, tzinfo=dt_timezone.utc)
+        with self.assertNumQueries(1):
+            rows = repo.get_context_rows_in_range(self.user.id, start, start + timedelta(hours=2))
+        self.assertEqual([row[1] for row in rows], ['Oncall', 'Coding', 'Review'])
+        self.assertEqual([entry.activity for entry in repo.get_contexts_in_range(self.user.id, start)],
+                         ['Oncall', 'Coding', 'Review', 'Writing'])
+
+    def test_invalid_and_oversized_ranges(self):
+        for params in ({'to': '2025-05-06'}, {'from': 'yesterday'},
+                       {'from': '2025-05-06T12:00:00Z', 'to': '2025-05-06T11:00:00Z'}):
+            self.assertEqual(self.client.get('/log/', params).status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.object(ContextService, 'MAX_RANGE_ENTRIES', 2):
+            response = self.client.get('/log/', {'from': '2025-05-06'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ROOT_URLCONF='focusflow_api.asgi_urls')
+    async def test_async_range(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = await self.async_client.get(
+            '/log/', {'from': '2025-05-06T12:00:00Z', 'to': '2025-05-06T14:00:00Z'}, headers=headers
+        )
+        self.assertEqual([entry['activity'] for entry in json.loads(response.content)['results']],
+                         ['Oncall', 'Coding', 'Review'])
+
+    def test_benchmark_command(self):
+        output = StringIO()
+        call_command('benchmark_range_queries', entries=300, ages='0,1', repeat=1, stdout=output, stderr=StringIO())
+        report = json.loads(output.getvalue())
+        for window in report['windows'].values():
+            self.assertEqual(window['union']['rows'], window['or']['rows'])
+            self.assertGreater(window['union']['rows'], 0)
+
+class ContextArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="archiveuser", password="password")
+        self.client.force_authenticate(user=self.user)
+        context_service.ingest_contexts(self.user.id, [
+            {'idempotency_key': 'old-1', 'activity': 'Planning', 'start_time': '2024-01-10T09:00:00Z', 'end_time': '2024-01-10T10:00:00Z'},
+            {'idempotency_key': 'old-2', 'activity': 'Review', 'start_time': '2024-01-10T10:00:00Z', 'end_time': '2024-01-10T12:00:00Z'},
+            {'idempotency_key': 'recent', 'activity': 'Email',
+             'start_time': now() - timedelta(hours=2), 'end_time': now() - timedelta(hours=1)},
+        ])
+        context_service.log_context(self.user.id, 'Coding', '')
+
+    def archive(self, *args):
+        output = StringIO()
+        call_command('archive_contexts', *args, stdout=output)
+        return output.getvalue()
+
+    def history(self, **params):
+        params = params or {'limit': 100}
+        return [entry['activity'] for entry in self.client.get('/log/', params).json()['results']]
+
+    def rollups(self):
+        return list(DailyActivityRollup.objects.filter(user=self.user).order_by('activity')
+                    .values_list('activity', 'total_seconds'))
+
+    def test_archives_old_entries_and_reads_through(self):
+        rollups = self.rollups()
+        self.assertIn('2 entries', self.archive('--dry-run'))
+        self.assertIn('Archived 2 entries', self.archive('--batch-size', '1'))
+        self.assertEqual(ContextEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(ArchivedContextEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.rollups(), rollups)
+
+        self.assertEqual(self.history(), ['Coding', 'Email', 'Review', 'Planning'])
+        first_page = self.client.get('/log/', {'limit': 2}).json()
+        second_page = self.client.get('/log/', {'limit': 2, 'cursor': first_page['next_cursor']}).json()
+        self.assertEqual([entry['activity'] for entry in second_page['results']], ['Review', 'Planning'])
+        self.assertEqual(self.history(**{'from': '2024-01-10T11:00:00Z', 'to': '2024-01-11'}), ['Review'])
+
+        response = self.client.get('/log/export/csv/', {'to': '2024-12-31'})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['activity'] for row in rows], ['Planning', 'Review'])
+
+        call_command('rebuild_activity_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_archived_entries_stay_editable_and_deduplicated(self):
+        self.archive()
+        planning = ArchivedContextEntry.objects.get(activity='Planning')
+        self.assertEqual(self.client.put(f'/log/{planning.id}/', {'note': 'Edited'}, format='json').status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(ArchivedContextEntry.objects.get(id=planning.id).note, 'Edited')
+        self.assertEqual(self.client.delete(f'/log/{planning.id}/').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.history(), ['Coding', 'Email', 'Review'])
+        self.assertEqual([activity for activity, _ in self.rollups()], ['Email', 'Review'])
+
+        response = context_service.ingest_contexts(self.user.id, [
+            {'idempotency_key': 'old-2', 'activity': 'Review', 'start_time': '2024-01-10T10:00:00Z', 'end_time': '2024-01-10T12:00:00Z'},
+            {'idempotency_key': 'late', 'activity': 'Call', 'start_time': '2024-01-10T11:00:00Z', 'end_time': '2024-01-10T13:00:00Z'},
+        ])
+        self.assertEqual([result['status'] for result in response['results']], ['duplicate', 'created'])
+        # Trimmed against the archived Review entry
+        self.assertEqual(ContextEntry.objects.get(activity='Call').start_time,
+                         datetime(2024, 1, 10, 12, tzinfo=dt_timezone.utc))
+
+class ContextSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="searchuser", password="password")
+        self.client.force_authenticate(user=self.user)
+        context_service.ingest_contexts(self.user.id, [
+            {'idempotency_key': '1', 'activity': 'Support', 'note': 'Reproduced the billing bug for ACME',
+             'start_time': '2024-01-10T09:00:00Z', 'end_time': '2024-01-10T10:00:00Z'},
+            {'idempotency_key': '2', 'activity': 'Billing bug fix', 'note': 'Rounding in invoices',
+             'start_time': '2025-03-03T09:00:00Z', 'end_time': '2025-03-03T11:00:00Z'},
+            {'idempotency_key': '3', 'activity': 'Standup', 'note': None,
+             'start_time': '2025-03-04T09:00:00Z', 'end_time': '2025-03-04T09:15:00Z'},
+        ])
+        context_service.log_context(self.user.id, 'Code review', 'Billing service refactor')
+        other = User.objects.create_user(username="othersearch", password="password")
+        context_service.log_context(other.id, 'Billing bug', 'Not yours')
+
+    def search(self, q, **params):
+        response = self.client.get('/log/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def activities(self, q, **params):
+        return [entry['activity'] for entry in self.search(q, **params)['results']]
+
+    def test_ranked_prefix_matches_scoped_to_user(self):
+        self.assertEqual(self.activities('billing bug'), ['Billing bug fix', 'Support'])
+        self.assertEqual(set(self.activities('bill')), {'Billing bug fix', 'Support', 'Code review'})
+        self.assertEqual(self.activities('invoices'), ['Billing bug fix'])
+        self.assertEqual(self.activities('yours'), [])
+        self.assertEqual(self.activities('"billing" (bug*'), ['Billing bug fix', 'Support'])
+        # Terms never match the per-user owner token
+        self.assertEqual(self.activities('u'), [])
+        self.assertEqual(self.activities(f'u{self.user.id}'), [])
+
+        page = self.search('billing', limit=2)
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(page['next_offset'], 2)
+        last = self.search('billing', limit=2, offset=2)
+        self.assertEqual(len(last['results']), 1)
+        self.assertIsNone(last['next_offset'])
+
+        for params in ({'q': ''}, {'q': '!!!'}, {'q': 'bug', 'limit': 'x'}):
+            self.assertEqual(self.client.get('/log/search/', params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_edits_deletes_and_archive(self):
+        standup = ContextEntry.objects.get(activity='Standup')
+        self.client.put(f'/log/{standup.id}/', {'note': 'Discussed the outage'}, format='json')
+        self.assertEqual(self.activities('outage'), ['Standup'])
+        self.client.delete(f'/log/{standup.id}/')
+        self.assertEqual(self.activities('outage'), [])
+
+        call_command('archive_contexts', stdout=StringIO())
+        self.assertTrue(ArchivedContextEntry.objects.filter(activity='Support').exists())
+        self.assertEqual(self.activities('acme'), ['Support'])
+
+    def test_rebuild_indexes_entries_written_directly(self):
+        ContextEntry.objects.create(user=self.user, activity='Migration dry run', start_time=datetime(2023, 5, 1, tzinfo=dt_timezone.utc),
+                                    end_time=datetime(2023, 5, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.activities('migration'), [])
+        output = StringIO()
+        call_command('rebuild_search_index', stdout=output)
+        self.assertIn('Indexed 6 entries', output.getvalue())
+        self.assertEqual(self.activities('migration'), ['Migration dry run'])
+        self.assertEqual(self.activities('billing bug'), ['Billing bug fix', 'Support'])
+
+class ActivityDictionaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        activity_index_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="activityuser", password="password")
+        self.client.force_authenticate(user=self.user)
+
+    def log(self, *activities):
+        with self.captureOnCommitCallbacks(execute=True):
+            for activity in activities:
+                context_service.log_context(self.user.id, activity, '')
+
+    def suggest(self, q, **params):
+        response = self.client.get('/activities/suggest/', {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.json()['results']]
+
+    def counts(self):
+        return dict(Activity.objects.filter(user=self.user).values_list('name', 'usage_count'))
+
+    def test_write_paths_maintain_the_dictionary(self):
+        self.log('Email', 'Code review', 'Email')
+        self.assertEqual(self.counts(), {'Email': 2, 'Code review': 1})
+        email = Activity.objects.get(user=self.user, name='Email')
+        self.assertEqual(ContextEntry.objects.filter(activity_ref=email).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            context_service.ingest_contexts(self.user.id, [
+                {'idempotency_key': 'a', 'activity': 'Standup', 'start_time': '2025-01-06T09:00:00Z', 'end_time': '2025-01-06T09:15:00Z'},
+                {'idempotency_key': 'b', 'activity': 'Email', 'start_time': '2025-01-06T09:15:00Z', 'end_time': '2025-01-06T10:00:00Z'},
+            ])
+            review = ContextEntry.objects.get(activity='Code review')
+            context_service.update_context(self.user.id, review.id, {'activity': 'Standup'})
+            standup = ContextEntry.objects.get(idempotency_key='a')
+            context_service.delete_context(self.user.id, standup.id)
+        self.assertEqual(self.counts(), {'Email': 3, 'Code review': 0, 'Standup': 1})
+        self.assertEqual(ContextEntry.objects.get(id=review.id).activity_ref.name, 'Standup')
+        self.assertEqual(self.suggest(''), ['Email', 'Standup'])
+
+    def test_suggestions_come_from_the_cached_prefix_index(self):
+        self.log('Email', 'Code review', 'Email', 'Coding')
+        self.assertEqual(self.suggest('co'), ['Coding', 'Code review'])
+        self.assertEqual(self.suggest('REV'), ['Code review'])
+        self.assertEqual(self.suggest('e', limit=1), ['Email'])
+        self.assertEqual(self.suggest('x'), [])
+        with self.assertNumQueries(0):
+            context_service.suggest_activities(self.user.id, 'cod')
+        self.log('Deploy')
+        self.assertEqual(self.suggest('dep'), ['Deploy'])
+        self.assertEqual(self.client.get('/activities/suggest/', {'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ranking_decays_frequency_with_age(self):
+        at = datetime(2025, 6, 1, tzinfo=dt_timezone.utc)
+        index = ActivityPrefixIndex([
+            ('Reading', 40, at - timedelta(days=90)),
+            ('Research', 3, at - timedelta(hours=1)),
+            ('Retro', 3, at - timedelta(days=2)),
+        ], half_life_days=14)
+        self.assertEqual([item['name'] for item in index.suggest('re', 3, at=at)], ['Research', 'Retro', 'Reading'])
+
+    def test_data_migration_builds_dictionary_for_existing_rows(self):
+        workspace = Workspace.objects.create(name='Ops', owner=self.user)
+        start = datetime(2024, 2, 1, 9, tzinfo=dt_timezone.utc)
+        for offset, (activity, workspace_id) in enumerate([('Email', None), ('Email', None), ('Email', workspace.id), ('Oncall', workspace.id)]):
+            ContextEntry.objects.create(user=self.user, workspace_id=workspace_id, activity=activity,
+                                        start_time=start + timedelta(hours=offset), end_time=start + timedelta(hours=offset, minutes=30))
+        ArchivedContextEntry.objects.create(id=10_000, user=self.user, activity='Email', start_time=start - timedelta(days=400),
+                                            end_time=start - timedelta(days=400) + timedelta(hours=1))
+        import_module('context_tracker.migrations.0010_activity_dictionary').build_activity_dictionary(django_apps, None)
+
+        rows = set(Activity.objects.values_list('workspace_id', 'name', 'usage_count'))
+        self.assertEqual(rows, {(None, 'Email', 3), (workspace.id, 'Email', 1), (workspace.id, 'Oncall', 1)})
+        self.assertFalse(ContextEntry.objects.filter(activity_ref__isnull=True).exists())
+        personal = Activity.objects.get(workspace__isnull=True, name='Email')
+        self.assertEqual(ArchivedContextEntry.objects.get(id=10_000).activity_ref, personal)
+        self.assertEqual(personal.last_used_at, start + timedelta(hours=1))
+
+class ScratchDatabaseTestCase(SimpleTestCase):
+    """Runs management commands in a subprocess against a fresh SQLite file."""
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, 'db.sqlite3')
+        self.manage('migrate', '-v0')
+
+    def manage(self, *args):
+        env = {**os.environ, 'DB_ENGINE': 'django.db.backends.sqlite3', 'DB_NAME': self.database}
+        return subprocess.run([sys.executable, 'manage.py', *args], env=env, cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout
+
+class ContextSwitchConcurrencyTests(ScratchDatabaseTestCase):
+    def test_concurrent_switches_on_a_sqlite_file(self):
+        # Each switch must take SQLite's write lock before its first read, or
+        # competing writers fail with "database is locked" instead of waiting
+        report = json.loads(self.manage('loadtest_context_switch', '--threads', '8', '--switches', '10'))
+        self.assertEqual(report['errors'], 0, report['sample_errors'])
+        self.assertEqual(report['switches'], 80)
+        self.assertTrue(report['consistent'])
+
+class ContextIndexBenchmarkTests(ScratchDatabaseTestCase):
+    def indexes(self):
+        with closing(sqlite3.connect(self.database)) as db:
+            return sorted(name for name, in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'context_tracker_contextentry'"
+            ))
+
+    def test_indexes_are_dropped_and_restored(self):
+        before = self.indexes()
+        output = self.manage('benchmark_context_indexes', '--rows', '200', '--users', '4', '--repeat', '1')
+        report = json.loads(output[output.index('{'):])
+        self.assertIn('ctx_entry_user_start_idx', report['with_indexes']['get_all_contexts (first page)']['plan'])
+        self.assertNotIn('ctx_entry_user_start_idx', report['without_indexes']['get_all_contexts (first page)']['plan'])
+        self.assertEqual(self.indexes(), before)
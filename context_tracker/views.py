@@ -1,18 +1,106 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view
 from rest_framework import status
-from .models import ContextEntry
-from django.utils.timezone import now
-from django.contrib.auth import authenticate, logout
+from rest_framework.parsers import JSONParser
+from django.contrib.auth import logout
 from rest_framework_simplejwt.tokens import RefreshToken
 import json
-from datetime import datetime
-import logging
+import time
 from .services.context_service import context_service
+from .services.events import CONTEXT_EVENTS_SETTINGS
+from .services.export_service import export_service
+from .services.workspace_service import workspace_service
+from .services.account_service import account_service
+from asgiref.sync import sync_to_async
+from .parsers import NDJSONParser
+from .renderers import dumps
+from .metrics import metrics_settings, registry as metrics_registry, timed_serialization
+
+STREAM_BATCH_SIZE = 500
+
+def stream_json_array(rows, batch_size=STREAM_BATCH_SIZE):
+    # Encode rows as one JSON array, yielding a chunk every `batch_size` rows
+    yield b'['
+    batch = []
+    first = True
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            # dumps() of the batch is '[...]'; drop the brackets to splice it in
+            yield (b'' if first else b',') + dumps(batch)[1:-1]
+            first = False
+            batch = []
+    if batch:
+        yield (b'' if first else b',') + dumps(batch)[1:-1]
+    yield b']'
+
+async def astream_json_array(rows, batch_size=STREAM_BATCH_SIZE):
+    # Async twin of stream_json_array, for async iterators under ASGI
+    yield b'['
+    batch = []
+    first = True
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield (b'' if first else b',') + dumps(batch)[1:-1]
+            first = False
+            batch = []
+    if batch:
+        yield (b'' if first else b',') + dumps(batch)[1:-1]
+    yield b']'
+
+async def aiterate(iterable):
+    # Pull a sync iterator one chunk at a time in the ORM's thread, so ASGI streams it without buffering
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        chunk = await sync_to_async(next)(iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+def event_position(request):
+    # Last event id seen by the client; EventSource resends it as Last-Event-ID on reconnect
+    return request.GET.get('after') or request.headers.get('Last-Event-ID')
+
+def sse_message(event_type, data, event_id=None):
+    header = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{header}event: {event_type}\ndata: '.encode('utf-8') + dumps(data) + b'\n\n'
+
+async def stream_context_events(user_id, after):
+    """
+    Server-sent events for one user's context changes. A `reset` event means
+    events were missed and the client should reload its history. The stream
+    ends after SSE_MAX_DURATION; EventSource then reconnects with Last-Event-ID.
+    """
+    heartbeat = CONTEXT_EVENTS_SETTINGS.get('SSE_HEARTBEAT', 15)
+    deadline = time.monotonic() + CONTEXT_EVENTS_SETTINGS.get('SSE_MAX_DURATION', 300)
+    result = await context_service.await_events(user_id, after, 0)
+    yield sse_message('ready', {'last_event_id': result['last_event_id']}, result['last_event_id'])
+    while True:
+        if result['reset']:
+            yield sse_message('reset', {}, result['last_event_id'])
+        for event in result['events']:
+            yield sse_message(event['type'], event['entry'], event['id'])
+        after = result['last_event_id']
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        result = await context_service.await_events(user_id, after, min(heartbeat, remaining))
+        if not (result['events'] or result['reset']):
+            yield b': keep-alive\n\n'
+
+def api_response(data, status=status.HTTP_200_OK):
+    # JSON body encoded the way FastJSONRenderer does it
+    with timed_serialization():
+        body = dumps(data)
+    return HttpResponse(body, status=status, content_type='application/json')
 
 class LogContextView(APIView):
     permission_classes = [IsAuthenticated]
@@ -24,8 +112,24 @@ class LogContextView(APIView):
         return Response(response)
 
     def get(self, request):
-        entries = context_service.get_user_contexts(request.user.id)
-        return Response(entries)
+        params = request.query_params
+        if 'from' in params or 'to' in params:
+            response = context_service.get_user_contexts_in_range(request.user.id, params.get('from'), params.get('to'))
+            if 'error' in response:
+                return Response({'error': response['error']}, status=response['status'])
+            return Response(response)
+
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit')
+        if cursor is not None or limit is not None:
+            response = context_service.get_user_contexts_page(request.user.id, cursor=cursor, limit=limit)
+            if 'error' in response:
+                return Response({'error': response['error']}, status=response['status'])
+            return Response(response)
+
+        # Without pagination parameters, stream the full history in chunks
+        entries = context_service.iter_user_contexts(request.user.id)
+        return StreamingHttpResponse(stream_json_array(entries), content_type='application/json')
 
     def delete(self, request, log_id):
         response = context_service.delete_context(request.user.id, log_id)
@@ -37,6 +141,267 @@ class LogContextView(APIView):
         status_code = status.HTTP_200_OK if 'message' in response else status.HTTP_404_NOT_FOUND
         return Response(response, status=status_code)
 
+class ContextBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        response = context_service.ingest_contexts(request.user.id, request.data)
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response, status=status.HTTP_201_CREATED)
+
+class ContextChangesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        response = context_service.get_user_changes(
+            request.user.id, since=request.query_params.get('since'), limit=request.query_params.get('limit')
+        )
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response)
+
+class ContextSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        response = context_service.search_user_contexts(
+            request.user.id, params.get('q'), limit=params.get('limit'), offset=params.get('offset')
+        )
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response)
+
+class ActivitySuggestView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        response = context_service.suggest_activities(request.user.id, params.get('q'), limit=params.get('limit'))
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response)
+
+class ContextExportView(APIView):
+    """
+    Streams the user's timeline, or a workspace's with ?workspace=<id>, as a
+    file download. Supports ?from=/?to= (dates or timestamps, on start_time)
+    and ?gzip=1.
+    """
+    permission_classes = [IsAuthenticated]
+    # Set by the ASGI URLconf so the sync generator is not buffered by the ASGI handler
+    stream_async = False
+
+    def get(self, request, export_format):
+        params = request.query_params
+        response = export_service.export(
+            export_format,
+            user_id=request.user.id,
+            workspace_id=params.get('workspace'),
+            date_from=params.get('from'),
+            date_to=params.get('to'),
+            compress=params.get('gzip') in ('1', 'true'),
+            requested_by=request.user.id,
+        )
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        chunks = aiterate(response['chunks']) if self.stream_async else response['chunks']
+        streaming = StreamingHttpResponse(chunks, content_type=response['content_type'])
+        streaming['Content-Disposition'] = f'attachment; filename="{response["filename"]}"'
+        return streaming
+
+class ContextEventsView(APIView):
+    """
+    Long-poll for context changes: returns as soon as there are events after
+    `after`, or an empty list when `timeout` seconds pass first.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        response = context_service.wait_for_events(
+            request.user.id, after=event_position(request), timeout=request.query_params.get('timeout')
+        )
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response)
+
+class StatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        response = context_service.get_user_status(request.user.id)
+        if 'status' in response:
+            return Response({'message': response['message']}, status=response['status'])
+        return Response(response)
+
+class StopContextView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        response = context_service.stop_user_context(request.user.id)
+        if 'status' in response:
+            return Response({'message': response['message']}, status=response['status'])
+        return Response(response)
+
+class StatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        response = context_service.get_user_stats(
+            request.user.id,
+            date_from=request.query_params.get('from'),
+            date_to=request.query_params.get('to'),
+            workspace_id=request.query_params.get('workspace'),
+        )
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response)
+
+class WorkspaceDashboardView(APIView):
+    """
+    Members, their open context and today's totals for all of the user's workspaces.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(workspace_service.get_dashboard(request.user.id))
+
+class WorkspaceMembersView(APIView):
+    """
+    Bulk membership changes. POST adds and DELETE removes the users listed by
+    `user_ids` and/or `emails`, answering with a result per user.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, workspace_id):
+        return self.respond(workspace_service.add_members(workspace_id, request.user.id, request.data))
+
+    def delete(self, request, workspace_id):
+        return self.respond(workspace_service.remove_members(workspace_id, request.user.id, request.data))
+
+    def respond(self, response):
+        if 'error' in response:
+            return Response({'error': response['error']}, status=response['status'])
+        return Response(response)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of APIView for the ASGI URLconf.
+
+    Credentials are checked by context_tracker.middleware.AuthenticationMiddleware,
+    which derives the route policy from permission_classes as it does for DRF
+    views; requests it lets through without a user are rejected here. JSON
+    and form bodies are exposed as request.data.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = getattr(request, 'authenticated_user', None)
+        if user is None:
+            response = api_response({'detail': 'Authentication credentials were not provided.'}, status.HTTP_401_UNAUTHORIZED)
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+        request.user = user
+        if request.content_type != 'application/json':
+            request.data = request.POST.dict()
+        else:
+            try:
+                request.data = json.loads(request.body) if request.body else {}
+            except ValueError as exc:
+                return api_response({'detail': f'JSON parse error - {exc}'}, status.HTTP_400_BAD_REQUEST)
+            if not isinstance(request.data, dict):
+                return api_response({'detail': 'Expected a JSON object'}, status.HTTP_400_BAD_REQUEST)
+        return await super().dispatch(request, *args, **kwargs)
+
+class AsyncLogContextView(AsyncAPIView):
+    async def post(self, request):
+        activity = request.data.get('activity')
+        note = request.data.get('note', '')
+        response = await context_service.alog_context(request.user.id, activity, note)
+        return api_response(response)
+
+    async def get(self, request):
+        params = request.GET
+        if 'from' in params or 'to' in params:
+            response = await context_service.aget_user_contexts_in_range(request.user.id, params.get('from'), params.get('to'))
+            if 'error' in response:
+                return api_response({'error': response['error']}, response['status'])
+            return api_response(response)
+
+        cursor = request.GET.get('cursor')
+        limit = request.GET.get('limit')
+        if cursor is not None or limit is not None:
+            response = await context_service.aget_user_contexts_page(request.user.id, cursor=cursor, limit=limit)
+            if 'error' in response:
+                return api_response({'error': response['error']}, response['status'])
+            return api_response(response)
+
+        entries = context_service.aiter_user_contexts(request.user.id)
+        return StreamingHttpResponse(astream_json_array(entries), content_type='application/json')
+
+    async def delete(self, request, log_id):
+        response = await context_service.adelete_context(request.user.id, log_id)
+        status_code = status.HTTP_200_OK if 'message' in response else status.HTTP_404_NOT_FOUND
+        return api_response(response, status_code)
+
+    async def put(self, request, log_id):
+        response = await context_service.aupdate_context(request.user.id, log_id, request.data)
+        status_code = status.HTTP_200_OK if 'message' in response else status.HTTP_404_NOT_FOUND
+        return api_response(response, status_code)
+
+class AsyncContextEventsView(AsyncAPIView):
+    async def get(self, request):
+        response = await context_service.await_events(
+            request.user.id, after=event_position(request), timeout=request.GET.get('timeout')
+        )
+        if 'error' in response:
+            return api_response({'error': response['error']}, response['status'])
+        return api_response(response)
+
+class ContextEventStreamView(AsyncAPIView):
+    async def get(self, request):
+        after = event_position(request)
+        if after is not None and not str(after).isdigit():
+            return api_response({'error': 'Invalid event position or timeout'}, status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            stream_context_events(request.user.id, int(after) if after is not None else None),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class AsyncStatusView(AsyncAPIView):
+    async def get(self, request):
+        response = await context_service.aget_user_status(request.user.id)
+        if 'status' in response:
+            return api_response({'message': response['message']}, response['status'])
+        return api_response(response)
+
+class AsyncStopContextView(AsyncAPIView):
+    async def post(self, request):
+        response = await context_service.astop_user_context(request.user.id)
+        if 'status' in response:
+            return api_response({'message': response['message']}, response['status'])
+        return api_response(response)
+
+def metrics_view(request):
+    # Prometheus text exposition of this process's request histograms; local scrapers only
+    config = metrics_settings()
+    if not config.get('ENABLED', False) or request.META.get('REMOTE_ADDR') not in config.get('ALLOWED_IPS', ()):
+        return HttpResponse(status=404)
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def account_error(response):
+    # 503s from a saturated hashing pool tell clients when to retry
+    error = JsonResponse({'error': response['error']}, status=response['status'])
+    if 'retry_after' in response:
+        error['Retry-After'] = str(response['retry_after'])
+    return error
+
 @csrf_exempt
 @api_view(['POST'])
 def api_login(request):
@@ -44,21 +409,21 @@ def api_login(request):
     username = data.get('username')
     password = data.get('password')
 
-    user = authenticate(request, username=username, password=password)
-    if user is not None:
-        refresh = RefreshToken.for_user(user)
-        return JsonResponse({
-            'message': 'Login successful',
-            'token': str(refresh.access_token),
-            'refresh': str(refresh),
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email
-            }
-        })
-    else:
-        return JsonResponse({'error': 'Invalid credentials'}, status=401)
+    response = account_service.login(username, password, request)
+    if 'error' in response:
+        return account_error(response)
+    user = response['user']
+    refresh = RefreshToken.for_user(user)
+    return JsonResponse({
+        'message': 'Login successful',
+        'token': str(refresh.access_token),
+        'refresh': str(refresh),
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email
+        }
+    })
 
 @csrf_exempt
 @api_view(['POST'])
@@ -76,11 +441,8 @@ def user_register(request):
     last_name = data.get('lastName')
     email = data.get('email')
 
-    if not all([username, password, email]):
-        return JsonResponse({'error': 'All fields are required'}, status=400)
-
-    if User.objects.filter(username=username).exists():
-        return JsonResponse({'error': 'Username already exists'}, status=400)
-
-    user = User.objects.create_user(username=username, password=password, email=email, first_name=first_name, last_name=last_name)
+    response = account_service.register(username, password, email, first_name, last_name)
+    if 'error' in response:
+        return account_error(response)
+    user = response['user']
     return JsonResponse({'message': 'User registered successfully', 'user_id': user.id})
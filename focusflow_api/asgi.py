@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "focusflow_api.settings")
+os.environ.setdefault("ROOT_URLCONF", "focusflow_api.asgi_urls")
+# Persistent connections are per thread and not reliably closed under ASGI
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
@@ -0,0 +1,31 @@
+"""
+URL configuration for the ASGI application.
+
+Same routes as focusflow_api.urls, but the context logging, events, status
+and stop endpoints are served by native async views so they are not pushed
+onto the sync thread pool. Server-sent events (log/events/stream/) are only
+offered here, where an open stream does not hold a worker thread.
+"""
+from django.urls import path
+from context_tracker.views import ActivitySuggestView, AsyncContextEventsView, AsyncLogContextView, AsyncStatusView, ContextEventStreamView, AsyncStopContextView, ContextBatchView, ContextChangesView, ContextExportView, ContextSearchView, StatsView, WorkspaceDashboardView, WorkspaceMembersView, metrics_view, user_logout, api_login, user_register
+
+urlpatterns = [
+    path('login/', api_login, name='login'),
+    path('logout/', user_logout, name='logout'),
+    path('register/', user_register, name='register'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('log/', AsyncLogContextView.as_view(), name='log-context'),
+    path('log/batch/', ContextBatchView.as_view(), name='log-context-batch'),
+    path('log/changes/', ContextChangesView.as_view(), name='log-context-changes'),
+    path('log/search/', ContextSearchView.as_view(), name='log-context-search'),
+    path('log/export/<str:export_format>/', ContextExportView.as_view(stream_async=True), name='log-context-export'),
+    path('log/events/', AsyncContextEventsView.as_view(), name='log-context-events'),
+    path('log/events/stream/', ContextEventStreamView.as_view(), name='log-context-event-stream'),
+    path('log/<int:log_id>/', AsyncLogContextView.as_view(), name='log-context-detail'),
+    path('activities/suggest/', ActivitySuggestView.as_view(), name='activity-suggest'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('status/', AsyncStatusView.as_view(), name='status'),
+    path('stop/', AsyncStopContextView.as_view(), name='stop'),
+    path('workspaces/dashboard/', WorkspaceDashboardView.as_view(), name='workspace-dashboard'),
+    path('workspaces/<int:workspace_id>/members/', WorkspaceMembersView.as_view(), name='workspace-members'),
+]
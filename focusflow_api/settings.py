@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import django
+from django.core.exceptions import ImproperlyConfigured
 from corsheaders.defaults import default_headers
 from datetime import timedelta
 import os
@@ -49,17 +51,23 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its counts include the other middleware; inactive unless REQUEST_METRICS is enabled
+    'context_tracker.middleware.RequestMetricsMiddleware',
+    # Inactive unless REQUEST_PROFILING is enabled
+    'context_tracker.middleware.RequestProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    'context_tracker.middleware.AuthenticationMiddleware',
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "focusflow_api.urls"
+# focusflow_api/asgi.py switches this to the URLconf with native async views
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', "focusflow_api.urls")
 
 TEMPLATES = [
     {
@@ -80,17 +88,90 @@ TEMPLATES = [
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite by default. For PostgreSQL set DB_ENGINE=django.db.backends.postgresql
+# and DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT. Connections persist for
+# DB_CONN_MAX_AGE seconds and are health-checked before reuse (asgi.py turns
+# persistence off; use DB_POOL or PgBouncer there). Behind PgBouncer in
+# transaction mode, set DB_DISABLE_SERVER_SIDE_CURSORS=True.
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+
+def database_config(host=None, port=None):
+    config = {
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': host if host is not None else os.getenv('DB_HOST', ''),
+        'PORT': port if port is not None else os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
+        'OPTIONS': {},
+    }
+    if os.getenv('DB_POOL', 'False') == 'True':
+        # psycopg_pool integration needs Django 5.1+; pooled connections must not also persist
+        if django.VERSION < (5, 1) or 'postgresql' not in DB_ENGINE:
+            raise ImproperlyConfigured('DB_POOL needs Django 5.1+ with PostgreSQL; use PgBouncer otherwise')
+        config['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        }
+        config['CONN_MAX_AGE'] = 0
+    return config
+
 DATABASES = {
+    'default': database_config(),
+}
+
+# Read replicas, as comma-separated host[:port] entries in DB_REPLICA_HOSTS. Only
+# reads that opt in (history, stats and exports) are sent to them, and never
+# inside a transaction; see context_tracker.db_routers.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**database_config(replica_host, replica_port), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['context_tracker.db_routers.ReadReplicaRouter']
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# (e.g. Redis) cache so status writes are visible to every worker.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'focusflow'),
     }
 }
 
+# Seconds a cached "current status" record may be served before it is re-read
+STATUS_CACHE_TIMEOUT = int(os.getenv('STATUS_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
+# Login and registration hash passwords on a pool of WORKERS threads. Beyond
+# MAX_PENDING queued or running hashes they answer 503 immediately, and a hash
+# not finished within TIMEOUT seconds also gives 503. PBKDF2_ITERATIONS
+# overrides Django's default cost; existing hashes are upgraded on login.
+PASSWORD_HASHING = {
+    'WORKERS': int(os.getenv('PASSWORD_HASH_WORKERS', 2)),
+    'MAX_PENDING': int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16)),
+    'TIMEOUT': float(os.getenv('PASSWORD_HASH_TIMEOUT', 5)),
+    'PBKDF2_ITERATIONS': int(os.getenv('PBKDF2_ITERATIONS', 0)) or None,
+}
+
+PASSWORD_HASHERS = [
+    'context_tracker.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -134,7 +215,14 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'context_tracker.authentication.MiddlewareAuthentication',
+        'context_tracker.authentication.CachedJWTAuthentication',
+        'context_tracker.authentication.APIKeyAuthentication',
+    ),
+    # orjson-backed when installed, stdlib JSON otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'context_tracker.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
@@ -145,6 +233,73 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Per-process cache of verified access tokens; entries expire with the token's `exp`,
+# capped by MAX_TTL. Logout, password changes and deactivation only invalidate the
+# cache of the worker that handled them, so other workers keep accepting the token
+# for up to MAX_TTL seconds.
+TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('TOKEN_CACHE_MAX_SIZE', 10000)),
+    'MAX_TTL': int(os.getenv('TOKEN_CACHE_MAX_TTL', 300)),
+}
+
+# Per-process cache of API-key digest -> owner; unknown keys are cached for NEGATIVE_TTL
+API_KEY_CACHE = {
+    'MAX_SIZE': int(os.getenv('API_KEY_CACHE_MAX_SIZE', 10000)),
+    'TTL': 300,
+    'NEGATIVE_TTL': 30,
+}
+
+# Live context-change channel (long-poll and SSE). The in-process broker only
+# reaches clients connected to the same worker; multi-worker deployments plug in
+# a shared EventBroker implementation here.
+CONTEXT_EVENTS = {
+    'BROKER': os.getenv('CONTEXT_EVENTS_BROKER', 'context_tracker.services.events.InProcessBroker'),
+    'OPTIONS': {
+        'buffer_size': int(os.getenv('CONTEXT_EVENTS_BUFFER_SIZE', 100)),
+        'max_users': int(os.getenv('CONTEXT_EVENTS_MAX_USERS', 10000)),
+    },
+    'LONG_POLL_TIMEOUT': 25,
+    'MAX_LONG_POLL_TIMEOUT': 60,
+    'SSE_HEARTBEAT': 15,
+    'SSE_MAX_DURATION': 300,
+}
+
+# Retention: `manage.py archive_contexts` moves entries that ended more than
+# HORIZON_DAYS ago into the archive table, which history, range and export
+# reads still include.
+CONTEXT_ARCHIVE = {
+    'HORIZON_DAYS': int(os.getenv('CONTEXT_ARCHIVE_HORIZON_DAYS', 365)),
+    'BATCH_SIZE': 1000,
+}
+
+# Autocomplete for activity names: per-process prefix indexes, one per user,
+# rebuilt after the user's writes and at least every TTL seconds. Ranking decays
+# usage counts with a half-life of RECENCY_HALF_LIFE_DAYS since last use.
+ACTIVITY_SUGGESTIONS = {
+    'MAX_SIZE': int(os.getenv('ACTIVITY_SUGGESTIONS_MAX_SIZE', 10000)),
+    'TTL': 300,
+    'RECENCY_HALF_LIFE_DAYS': 14,
+}
+
+# Per-request query/timing instrumentation, Server-Timing headers and /metrics.
+# /metrics answers only to ALLOWED_IPS; histograms are per process.
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS', 'False') == 'True',
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+# Profiles a sampled fraction of requests with cProfile (.pstats) and, via a
+# stack sampler, any request slower than SLOW_THRESHOLD_MS (.collapsed), one
+# directory per route. Merge them with `manage.py aggregate_profiles`.
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING', 'False') == 'True',
+    'SAMPLE_RATE': float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0.01)),
+    'SLOW_THRESHOLD_MS': float(os.getenv('REQUEST_PROFILING_SLOW_MS', 500)),  # None disables the sampler
+    'SAMPLING_INTERVAL_MS': 5,
+    'DIRECTORY': os.getenv('REQUEST_PROFILING_DIR', BASE_DIR / 'profiles'),
+    'MAX_FILES_PER_ROUTE': 200,
+}
+
 # Turning Logging off for now
 # LOGGING = {
 #     'version': 1,
@@ -189,3 +344,21 @@ SIMPLE_JWT = {
 #         },
 #     },
 # }
+
+# Only the request-metrics logger is configured: one JSON line per instrumented request
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'request_metrics': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'context_tracker.requests': {
+            'handlers': ['request_metrics'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
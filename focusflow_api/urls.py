@@ -16,12 +16,24 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from context_tracker.views import LogContextView, user_logout, api_login, user_register
+from context_tracker.views import ActivitySuggestView, LogContextView, ContextBatchView, ContextChangesView, ContextExportView, ContextSearchView, ContextEventsView, StatsView, StatusView, StopContextView, WorkspaceDashboardView, WorkspaceMembersView, metrics_view, user_logout, api_login, user_register
 
 urlpatterns = [
     path('login/', api_login, name='login'),
     path('logout/', user_logout, name='logout'),
     path('register/', user_register, name='register'),
+    path('metrics/', metrics_view, name='metrics'),
     path('log/', LogContextView.as_view(), name='log-context'),
+    path('log/batch/', ContextBatchView.as_view(), name='log-context-batch'),
+    path('log/changes/', ContextChangesView.as_view(), name='log-context-changes'),
+    path('log/search/', ContextSearchView.as_view(), name='log-context-search'),
+    path('log/export/<str:export_format>/', ContextExportView.as_view(), name='log-context-export'),
+    path('log/events/', ContextEventsView.as_view(), name='log-context-events'),
     path('log/<int:log_id>/', LogContextView.as_view(), name='log-context-detail'),
+    path('activities/suggest/', ActivitySuggestView.as_view(), name='activity-suggest'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('status/', StatusView.as_view(), name='status'),
+    path('stop/', StopContextView.as_view(), name='stop'),
+    path('workspaces/dashboard/', WorkspaceDashboardView.as_view(), name='workspace-dashboard'),
+    path('workspaces/<int:workspace_id>/members/', WorkspaceMembersView.as_view(), name='workspace-members'),
 ]